@@ -2,8 +2,12 @@
 Authentication utilities for JWT and password management
 """
 import os
+import time
+import hashlib
+import secrets
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -11,6 +15,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 
 from models import TokenData
+from database import is_token_revoked
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +25,14 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here-change-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours default
 
+# Verified token cache: repeated requests with the same bearer token skip the
+# HS256 verification. Entries live until the token's exp or the TTL,
+# whichever comes first (0 entries disables the cache). Revocation needs no
+# purge: every hit is checked with is_token_revoked(), which sees logouts
+# from all workers, and a revoked entry is dropped on its next use.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -76,17 +89,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
     to_encode.update({
         "exp": expire,
-        "iat": datetime.utcnow()
+        "iat": datetime.utcnow(),
+        # Identifies the token in revoked_tokens after logout
+        "jti": secrets.token_hex(16)
     })
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+# Keyed by a digest of the token, so raw tokens are not kept in memory:
+# digest -> (expiry as epoch seconds, TokenData)
+_token_cache: "OrderedDict[bytes, Tuple[float, TokenData]]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "purged": 0}
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _cached_token(digest: bytes) -> Optional[TokenData]:
+    """Look up a verified token, dropping it once expired"""
+    entry = _token_cache.get(digest)
+    if entry is None:
+        _token_cache_stats["misses"] += 1
+        return None
+    expires_at, token_data = entry
+    if expires_at <= time.time():
+        del _token_cache[digest]
+        _token_cache_stats["expired"] += 1
+        _token_cache_stats["misses"] += 1
+        return None
+    _token_cache.move_to_end(digest)
+    _token_cache_stats["hits"] += 1
+    return token_data
+
+
+def _cache_token(digest: bytes, payload: dict, token_data: TokenData):
+    """Remember a verified token until its exp (or the TTL)"""
+    expires_at = time.time() + TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    _token_cache[digest] = (expires_at, token_data)
+    _token_cache.move_to_end(digest)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+        _token_cache_stats["evictions"] += 1
+
+
+def get_token_cache_stats() -> Dict[str, int]:
+    """
+    Get verified token cache counters
+
+    Returns:
+        dict: Hits, misses (including expired entries), evictions, revoked
+        entries dropped (purged) and current size
+    """
+    return {**_token_cache_stats, "size": len(_token_cache), "max_size": TOKEN_CACHE_SIZE}
+
+
 def decode_token(token: str) -> TokenData:
     """
     Decode and verify a JWT token
 
+    Tokens verified before are served from the cache until they expire.
+    Revoked tokens are rejected by an in-memory check, without a query.
+
     Args:
         token: JWT token string
 
@@ -102,15 +171,33 @@ def decode_token(token: str) -> TokenData:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    digest = None
+    if TOKEN_CACHE_SIZE > 0:
+        digest = _token_digest(token)
+        token_data = _cached_token(digest)
+        if token_data is not None:
+            if is_token_revoked(token_data.jti):
+                del _token_cache[digest]
+                _token_cache_stats["purged"] += 1
+                raise credentials_exception
+            return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         email: str = payload.get("email")
 
-        if user_id is None:
+        if user_id is None or is_token_revoked(payload.get("jti")):
             raise credentials_exception
 
-        token_data = TokenData(user_id=user_id, email=email)
+        token_data = TokenData(
+            user_id=user_id,
+            email=email,
+            jti=payload.get("jti"),
+            exp=payload.get("exp")
+        )
+        if digest is not None:
+            _cache_token(digest, payload, token_data)
         return token_data
 
     except JWTError:
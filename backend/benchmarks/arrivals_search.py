@@ -0,0 +1,110 @@
+"""
+Arrivals search benchmark
+
+Times the substring (ILIKE) and fuzzy (word_similarity) arrivals searches
+against a temporary copy of the flights schema with trigram indexes, to check
+type-ahead latency at a million rows. Requires the pg_trgm extension.
+
+Usage (from backend/):
+    python -m benchmarks.arrivals_search [--flights 1000000] [--searches 200]
+"""
+import argparse
+import asyncio
+import time
+import asyncpg
+
+from database.db_client import DATABASE_URL
+
+CITIES = [
+    "Paris CDG", "Frankfurt FRA", "Dubai DXB", "New York JFK", "Madrid MAD",
+    "Amsterdam AMS", "Rome FCO", "Istanbul IST", "Singapore SIN", "Tokyo HND",
+    "Algiers ALG", "Casablanca CMN", "Tunis TUN", "Doha DOH", "Montreal YUL"
+]
+
+SETUP_SQL = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE TEMP TABLE bench_flights (
+        id SERIAL PRIMARY KEY,
+        flight_number VARCHAR(20) NOT NULL,
+        origin VARCHAR(100),
+        arrival_time TIMESTAMP WITH TIME ZONE
+    );
+"""
+
+INDEX_SQL = """
+    CREATE INDEX ON bench_flights USING GIN (origin gin_trgm_ops);
+    CREATE INDEX ON bench_flights USING GIN (flight_number gin_trgm_ops);
+    CREATE INDEX ON bench_flights (arrival_time) WHERE arrival_time IS NOT NULL;
+    ANALYZE bench_flights;
+"""
+
+QUERIES = {
+    "contains": """
+        SELECT * FROM bench_flights
+        WHERE arrival_time IS NOT NULL AND flight_number ILIKE $1
+        ORDER BY arrival_time ASC LIMIT 20
+    """,
+    "fuzzy": """
+        SELECT * FROM bench_flights
+        WHERE arrival_time IS NOT NULL AND $1 <% flight_number
+        ORDER BY word_similarity($1, flight_number) DESC, arrival_time ASC LIMIT 20
+    """
+}
+
+
+async def main(flights: int, searches: int):
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        print("=" * 50)
+        print(f"Loading {flights} flights...")
+        print("=" * 50)
+        await conn.execute(SETUP_SQL)
+        await conn.execute(
+            """
+            INSERT INTO bench_flights (flight_number, origin, arrival_time)
+            SELECT
+                chr(65 + n % 26) || chr(65 + (n / 26) % 26) || (n % 100000)::text,
+                ($2::text[])[1 + n % array_length($2::text[], 1)],
+                NOW() + (n % 10000) * INTERVAL '1 minute'
+            FROM generate_series(1, $1) AS n
+            """,
+            flights, CITIES
+        )
+        await conn.execute(INDEX_SQL)
+
+        # Type-ahead: every prefix of a few flight numbers, as typed
+        targets = await conn.fetch(
+            "SELECT flight_number FROM bench_flights ORDER BY random() LIMIT $1",
+            max(1, searches // 4)
+        )
+        typed = [
+            row["flight_number"][:length]
+            for row in targets
+            for length in range(3, len(row["flight_number"]) + 1)
+        ][:searches]
+
+        print("=" * 50)
+        print(f"Timing {len(typed)} keystrokes per mode...")
+        print("=" * 50)
+        for mode, query in QUERIES.items():
+            statement = await conn.prepare(query)
+            latencies = []
+            for term in typed:
+                param = f"%{term}%" if mode == "contains" else term
+                start = time.perf_counter()
+                await statement.fetch(param)
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{mode:10s} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--searches", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.flights, args.searches))
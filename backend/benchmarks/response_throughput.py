@@ -0,0 +1,128 @@
+"""
+Response throughput benchmark
+
+Measures requests/sec for one worker on the flight board and /api info
+endpoints, before and after pre-encoded payloads: the "before" app builds
+response models and renders them with FastAPI's default JSONResponse, the
+"after" app serves orjson-encoded bytes from a PayloadCache. Requests are
+driven straight through the ASGI interface, so the numbers are server-side
+CPU only (no sockets, no HTTP client). Does not need a database.
+
+Usage (from backend/):
+    python -m benchmarks.response_throughput [--flights 500] [--seconds 3]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+from fastapi import FastAPI, Query
+from fastapi.responses import ORJSONResponse
+
+from main import API_INFO, API_INFO_BODY
+from models import FlightResponse
+from serialization import FLIGHT_ENCODER, PayloadCache, json_response
+from benchmarks.row_encoding import make_rows
+
+PATHS = [("/api", b""), ("/api/flights", b"limit=50")]
+
+
+def build_before_app(flights: List[dict]) -> FastAPI:
+    """Handlers as they were: response models plus default JSONResponse"""
+    app = FastAPI()
+
+    @app.get("/api")
+    async def api_info():
+        return API_INFO
+
+    @app.get("/api/flights", response_model=List[FlightResponse])
+    async def get_all_flights(limit: int = Query(50)):
+        return [FlightResponse(**flight) for flight in flights[:limit]]
+
+    return app
+
+
+def build_after_app(flights: List[dict]) -> FastAPI:
+    """Handlers serving pre-encoded bytes"""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    payloads = PayloadCache("bench")
+
+    @app.get("/api")
+    async def api_info():
+        return json_response(API_INFO_BODY.plain)
+
+    @app.get("/api/flights", response_model=List[FlightResponse])
+    async def get_all_flights(limit: int = Query(50)):
+        body = payloads.get(1, limit)
+        if body is None:
+            body = FLIGHT_ENCODER(flights[:limit])
+            payloads.put(1, limit, body)
+        return json_response(body)
+
+    return app
+
+
+async def request(app: FastAPI, path: str, query: bytes) -> int:
+    """Run one GET request through the ASGI app and return the status code"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80)
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def requests_per_second(app: FastAPI, path: str, query: bytes, seconds: float) -> float:
+    """Send requests back to back for a fixed time"""
+    if await request(app, path, query) != 200:
+        raise SystemExit(f"{path} did not return 200, aborting")
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            await request(app, path, query)
+        count += 50
+    return count / (time.perf_counter() - start)
+
+
+async def main(flight_count: int, seconds: float):
+    flights = make_rows(flight_count)
+    apps = {"before": build_before_app(flights), "after": build_after_app(flights)}
+
+    print("=" * 50)
+    print(f"Requests/sec, one worker, {seconds:g}s per endpoint...")
+    print("=" * 50)
+    for path, query in PATHS:
+        rates = {name: await requests_per_second(app, path, query, seconds) for name, app in apps.items()}
+        print(
+            f"{path:14s} before {rates['before']:8.0f}   after {rates['after']:8.0f}"
+            f"   ({rates['after'] / rates['before']:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flights", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.flights, args.seconds))
@@ -0,0 +1,114 @@
+"""
+Row encoding benchmark
+
+Times turning a page of flight rows into a JSON response body, comparing the
+previous path (build FlightResponse per row, then FastAPI's response_model
+validation and JSONResponse rendering) with the precompiled row encoder in
+serialization.py. Does not need a database; with --database the encoders are
+first checked against rows fetched from the flights table.
+
+Usage (from backend/):
+    python -m benchmarks.row_encoding [--rows 100] [--pages 2000] [--database]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+import asyncpg
+from asyncpg.pgproto.pgproto import UUID as RecordUUID
+from pydantic import TypeAdapter
+
+from models import FlightResponse
+from serialization import FLIGHT_ENCODER, encode_rows
+from database.db_client import DATABASE_DIRECT_URL
+
+STATUSES = ["On Time", "Delayed", "Boarding", "Departed", "Landed"]
+
+_page_adapter = TypeAdapter(List[FlightResponse])
+
+
+def make_rows(count: int) -> List[dict]:
+    """Build flight rows shaped like the flights table (and typed like asyncpg's)"""
+    base = datetime(2024, 6, 1, 8, 0, tzinfo=timezone.utc)
+    return [
+        {
+            # asyncpg's own UUID type, which orjson does not encode natively
+            "id": RecordUUID(uuid.uuid4().bytes),
+            "flight_number": f"AF{1000 + i}",
+            "airline": "Air France",
+            "origin": "Paris CDG",
+            "destination": "Algiers ALG",
+            "departure_time": base + timedelta(minutes=5 * i),
+            "arrival_time": base + timedelta(minutes=5 * i + 150),
+            "gate": f"B{i % 40}",
+            "terminal": "2",
+            "status": STATUSES[i % len(STATUSES)],
+            "boarding_time": base + timedelta(minutes=5 * i - 30),
+            "baggage_claim": None,
+            "created_at": base - timedelta(days=1),
+            "updated_at": None
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_encode(rows: List[dict]) -> bytes:
+    """Previous list handler path: models per row, then response_model serialization"""
+    flights = [FlightResponse(**dict(row)) for row in rows]
+    content = _page_adapter.dump_python(_page_adapter.validate_python(flights), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def time_per_page(encode, rows: List[dict], pages: int) -> float:
+    """Average microseconds to encode one page"""
+    start = time.perf_counter()
+    for _ in range(pages):
+        encode(rows)
+    return (time.perf_counter() - start) / pages * 1_000_000
+
+
+async def fetch_records(limit: int) -> List[asyncpg.Record]:
+    """Flight rows as asyncpg returns them"""
+    conn = await asyncpg.connect(DATABASE_DIRECT_URL)
+    try:
+        return await conn.fetch("SELECT * FROM flights ORDER BY departure_time, id LIMIT $1", limit)
+    finally:
+        await conn.close()
+
+
+def check_encoders(rows) -> None:
+    if json.loads(legacy_encode(rows)) != json.loads(encode_rows(FLIGHT_ENCODER, rows)):
+        raise SystemExit("Encoders disagree, aborting")
+
+
+def main(row_count: int, pages: int, database: bool):
+    if database:
+        records = asyncio.run(fetch_records(row_count))
+        check_encoders(records)
+        print(f"Encoders agree on {len(records)} rows from the flights table")
+
+    rows = make_rows(row_count)
+    check_encoders(rows)
+
+    print("=" * 50)
+    print(f"Encoding {pages} pages of {row_count} flights...")
+    print("=" * 50)
+    legacy = time_per_page(legacy_encode, rows, pages)
+    fast = time_per_page(lambda page: encode_rows(FLIGHT_ENCODER, page), rows, pages)
+    print(f"{'response_model':16s} {legacy:9.1f} us/page")
+    print(f"{'row encoder':16s} {fast:9.1f} us/page   ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument(
+        "--database", action="store_true",
+        help="Also check the encoders on rows fetched from the flights table"
+    )
+    args = parser.parse_args()
+    main(args.rows, args.pages, args.database)
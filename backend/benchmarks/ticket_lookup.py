@@ -0,0 +1,104 @@
+"""
+Ticket lookup benchmark
+
+Compares the old `flight_number ILIKE '%ticket%'` scan with the indexed
+ticket_flights point read over 100k flights. Runs against DATABASE_URL using
+temporary tables only, so it does not touch application data.
+
+Usage (from backend/):
+    python -m benchmarks.ticket_lookup [--flights 100000] [--lookups 500]
+"""
+import argparse
+import asyncio
+import random
+import time
+import asyncpg
+
+from database.db_client import DATABASE_URL
+
+SETUP_SQL = """
+    CREATE TEMP TABLE bench_flights (
+        id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+        flight_number VARCHAR(20) UNIQUE NOT NULL,
+        airline VARCHAR(100) NOT NULL
+    );
+    CREATE TEMP TABLE bench_ticket_flights (
+        ticket_number VARCHAR(50) PRIMARY KEY,
+        flight_id UUID NOT NULL REFERENCES bench_flights(id)
+    );
+"""
+
+SCAN_QUERY = "SELECT * FROM bench_flights WHERE flight_number ILIKE $1 LIMIT 1"
+
+POINT_QUERY = """
+    SELECT f.* FROM bench_ticket_flights t
+    JOIN bench_flights f ON f.id = t.flight_id
+    WHERE t.ticket_number = $1
+"""
+
+
+def print_header(title: str):
+    print("=" * 50)
+    print(title)
+    print("=" * 50)
+
+
+async def time_lookups(conn, query: str, params: list) -> float:
+    """Run one lookup per parameter and return the mean latency in ms"""
+    statement = await conn.prepare(query)
+    start = time.perf_counter()
+    for param in params:
+        await statement.fetchrow(param)
+    return (time.perf_counter() - start) * 1000 / len(params)
+
+
+async def main(flights: int, lookups: int):
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        print_header(f"Loading {flights} flights...")
+        await conn.execute(SETUP_SQL)
+        await conn.execute(
+            """
+            INSERT INTO bench_flights (flight_number, airline)
+            SELECT 'BF' || lpad(n::text, 7, '0'), 'Bench Air'
+            FROM generate_series(1, $1) AS n
+            """,
+            flights
+        )
+        await conn.execute(
+            """
+            INSERT INTO bench_ticket_flights (ticket_number, flight_id)
+            SELECT flight_number, id FROM bench_flights
+            """
+        )
+        await conn.execute("ANALYZE bench_flights; ANALYZE bench_ticket_flights")
+
+        tickets = [f"BF{random.randint(1, flights):07d}" for _ in range(lookups)]
+
+        print_header(f"Timing {lookups} lookups...")
+        scan_ms = await time_lookups(conn, SCAN_QUERY, [f"%{ticket}%" for ticket in tickets])
+        point_ms = await time_lookups(conn, POINT_QUERY, tickets)
+
+        print(f"ILIKE scan:        {scan_ms:8.3f} ms/lookup")
+        print(f"ticket_flights:    {point_ms:8.3f} ms/lookup")
+        print(f"Speed-up:          {scan_ms / point_ms:8.1f}x")
+
+        print_header("Plans")
+        for name, query, param in (
+            ("ILIKE scan", SCAN_QUERY, f"%{tickets[0]}%"),
+            ("ticket_flights", POINT_QUERY, tickets[0])
+        ):
+            plan = await conn.fetch(f"EXPLAIN {query}", param)
+            print(f"{name}:")
+            for row in plan:
+                print(f"  {row[0]}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.flights, args.lookups))
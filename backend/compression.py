@@ -0,0 +1,260 @@
+"""
+Response compression (gzip, and brotli when the `brotli` package is installed)
+
+CompressionMiddleware compresses complete response bodies above a minimum
+size whose content type is worth compressing, picking the coding from
+Accept-Encoding. Streaming responses (the live flight board) are passed
+through untouched.
+
+Cached payloads are wrapped in EncodedBody, which keeps each compressed
+variant next to the plain bytes, so a cached page is compressed once per
+data change instead of once per request. Responses built from it already
+carry Content-Encoding and are left alone by the middleware.
+"""
+import os
+import gzip
+from typing import Optional, Dict, Tuple
+from fastapi import Request, Response
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Load environment variables
+load_dotenv()
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Per-request compression favours speed; cached variants are compressed once
+# per data change and can afford a higher level
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+PRECOMPRESSION_GZIP_LEVEL = 9
+PRECOMPRESSION_BROTLI_QUALITY = 9
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/"
+)
+# Compressing would buffer events until the stream ends
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_stats = {"compressed": 0, "precompressed_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content coding for a client
+
+    Args:
+        accept_encoding: Accept-Encoding request header
+
+    Returns:
+        Optional[str]: "br", "gzip", or None to send the body as-is
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    # Server preference order among acceptable codings
+    for coding in SUPPORTED_ENCODINGS:
+        if weights.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Whether a content type is worth compressing"""
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    if content_type.startswith(UNCOMPRESSIBLE_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    """
+    Compress a body
+
+    Args:
+        body: Plain bytes
+        encoding: "br" or "gzip"
+        precompress: Use the (slower, smaller) level for cached variants
+
+    Returns:
+        bytes: Compressed body
+    """
+    if encoding == "br":
+        quality = PRECOMPRESSION_BROTLI_QUALITY if precompress else COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = PRECOMPRESSION_GZIP_LEVEL if precompress else COMPRESSION_GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class EncodedBody:
+    """A cached response body with its compressed variants, built on demand"""
+    __slots__ = ("plain", "_variants")
+
+    def __init__(self, plain: bytes):
+        self.plain = plain
+        self._variants: Dict[str, bytes] = {}
+
+    def for_client(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Get the body to send to a client
+
+        Args:
+            accept_encoding: Accept-Encoding request header
+
+        Returns:
+            tuple: (body, content coding or None)
+        """
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None or len(self.plain) < COMPRESSION_MIN_SIZE:
+            return self.plain, None
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = compress(self.plain, encoding, precompress=True)
+        else:
+            _stats["precompressed_hits"] += 1
+        return variant, encoding
+
+
+def encoded_response(
+    request: Request,
+    body: EncodedBody,
+    media_type: str = "application/json",
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Build a response from a cached body in the coding the client accepts
+
+    Args:
+        request: Incoming request
+        body: Cached body
+        media_type: Content type
+        headers: Optional extra response headers
+
+    Returns:
+        Response: Response with Content-Encoding set when compressed
+    """
+    content, encoding = body.for_client(request.headers.get("accept-encoding"))
+    response = Response(content=content, media_type=media_type, headers=headers)
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def _weaken_etag(headers: list) -> list:
+    """A compressed body is a different representation: weaken its ETag"""
+    return [
+        (name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value)
+        for name, value in headers
+    ]
+
+
+def _vary_on_encoding(headers: list) -> list:
+    """Add Accept-Encoding to Vary unless it is already listed"""
+    vary = [value for name, value in headers if name == b"vary"]
+    listed = {token.strip().lower() for value in vary for token in value.split(b",")}
+    if b"accept-encoding" in listed or b"*" in listed:
+        return list(headers)
+    headers = [(name, value) for name, value in headers if name != b"vary"]
+    headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+    return headers
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses above a size threshold"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {name: value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming response: send it as-is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = _vary_on_encoding(start_message.get("headers", []))
+            if len(body) >= COMPRESSION_MIN_SIZE:
+                compressed = compress(body, encoding)
+                _stats["compressed"] += 1
+                _stats["bytes_in"] += len(body)
+                _stats["bytes_out"] += len(compressed)
+                body = compressed
+                headers = [(name, value) for name, value in headers if name != b"content-length"]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode())
+                ]
+                headers = _weaken_etag(headers)
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, compressing_send)
+
+
+def get_compression_stats() -> dict:
+    """
+    Get compression counters
+
+    Returns:
+        dict: Responses compressed per request, cached variant hits, and
+        bytes before/after per-request compression
+    """
+    return {**_stats, "encodings": list(SUPPORTED_ENCODINGS)}
@@ -0,0 +1,93 @@
+"""
+Conditional GET support (ETag / If-None-Match)
+
+Read endpoints derive a strong ETag from the data version of the table they
+serve (see database/data_versions.py; the flight board's comes from the
+board cache) plus the query parameters, without
+rendering the body. A client sending that ETag back in If-None-Match gets an
+empty 304 Not Modified, so a kiosk polling an unchanged board costs one
+version lookup and no payload.
+"""
+import hashlib
+from typing import Optional, Hashable
+from fastapi import Request, Response, status
+
+# Always revalidate, but allow the stored copy to be reused on 304
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(resource: str, version: Optional[Hashable], request: Request) -> Optional[str]:
+    """
+    Build the ETag of a response
+
+    Args:
+        resource: Name of the data set (e.g. the table)
+        version: Current data version, or None when unknown
+        request: Incoming request (query parameters are part of the tag)
+
+    Returns:
+        Optional[str]: Quoted strong ETag, or None if the version is unknown
+    """
+    if version is None:
+        return None
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    digest = hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+    return f'"{resource}-{version}-{digest}"'
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    """
+    Check If-None-Match against the current ETag
+
+    Args:
+        request: Incoming request
+        etag: Current ETag (None never matches)
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build a 304 Not Modified response
+
+    Carries the same Vary as the full (possibly compressed) response, so
+    caches keep the representations apart.
+
+    Args:
+        etag: Current ETag
+
+    Returns:
+        Response: Empty 304 response
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    )
+
+
+def set_etag(response: Response, etag: Optional[str]):
+    """
+    Attach the ETag to a full response
+
+    A compressed body is a different representation of the same data, so
+    its tag is sent weak (If-None-Match compares weakly anyway).
+
+    Args:
+        response: Outgoing response
+        etag: Current ETag, or None to leave the response untagged
+    """
+    if etag:
+        if response.headers.get("content-encoding"):
+            etag = "W/" + etag
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
@@ -6,13 +6,65 @@ from .db_client import (
     close_db,
     get_pool,
     get_db_connection,
+    add_warm_statement,
     execute_query,
     insert,
+    insert_on_conflict,
     select,
     update,
     delete,
     execute_raw,
-    transaction
+    transaction,
+    get_query_cache_stats,
+    get_pool_stats,
+    get_replica_stats,
+    pin_primary,
+    add_acquire_observer,
+    add_query_observer,
+    begin_query_usage,
+    end_query_usage,
+    QueryDeadlineExceeded,
+    set_query_deadline,
+    reset_query_deadline
+)
+from .flight_cache import (
+    start_flight_cache,
+    stop_flight_cache,
+    invalidate_flights_cache,
+    get_cached_flights,
+    get_cached_flight,
+    get_flight_cache_stats,
+    get_flight_board_version,
+    get_flight_data_version,
+    add_flight_change_listener,
+    remove_flight_change_listener
+)
+from .token_revocations import (
+    start_token_revocations,
+    stop_token_revocations,
+    is_token_revoked,
+    revoke_token,
+    get_token_revocation_stats
+)
+from .user_profiles import (
+    start_user_profiles,
+    stop_user_profiles,
+    get_user_profile,
+    invalidate_user_profile,
+    get_user_profile_stats
+)
+from .data_versions import get_data_version
+from .ticket_flights import resolve_ticket_flight, link_ticket_flight
+from .pagination import (
+    encode_cursor,
+    decode_cursor,
+    encode_change_cursor,
+    decode_change_cursor,
+    order_clause,
+    keyset_clause,
+    split_page,
+    select_keyset,
+    select_page
 )
 
 __all__ = [
@@ -20,11 +72,56 @@ __all__ = [
     "close_db",
     "get_pool",
     "get_db_connection",
+    "add_warm_statement",
     "execute_query",
     "insert",
+    "insert_on_conflict",
     "select",
     "update",
     "delete",
     "execute_raw",
-    "transaction"
+    "transaction",
+    "get_query_cache_stats",
+    "get_pool_stats",
+    "get_replica_stats",
+    "pin_primary",
+    "add_acquire_observer",
+    "add_query_observer",
+    "begin_query_usage",
+    "end_query_usage",
+    "QueryDeadlineExceeded",
+    "set_query_deadline",
+    "reset_query_deadline",
+    "start_flight_cache",
+    "stop_flight_cache",
+    "invalidate_flights_cache",
+    "get_cached_flights",
+    "get_cached_flight",
+    "get_flight_cache_stats",
+    "get_flight_board_version",
+    "get_flight_data_version",
+    "get_data_version",
+    "start_token_revocations",
+    "stop_token_revocations",
+    "is_token_revoked",
+    "revoke_token",
+    "get_token_revocation_stats",
+    "start_user_profiles",
+    "stop_user_profiles",
+    "get_user_profile",
+    "invalidate_user_profile",
+    "get_user_profile_stats",
+    "add_flight_change_listener",
+    "remove_flight_change_listener",
+    "resolve_ticket_flight",
+    "link_ticket_flight",
+    "encode_cursor",
+    "decode_cursor",
+    "encode_change_cursor",
+    "decode_change_cursor",
+    "order_clause",
+    "keyset_clause",
+    "split_page",
+    "select_keyset",
+    "select_page"
 ]
@@ -0,0 +1,51 @@
+"""
+Per-table data versions
+
+`data_versions` holds a counter per table that every committed change bumps
+(see migrations/007_data_versions.sql). Flights are not versioned here: with
+their write rate the counter row became a lock every writer queued on, so
+the flight board is versioned by the cache (see flight_cache.py). Reading it is a primary-key lookup,
+so endpoints can tell whether their data changed without re-running the list
+query, and the value is the same on every worker.
+
+Read the version before the data it describes: a change committed in between
+then only costs an extra full response, never a stale 304. With read
+replicas the version is read from the same replica as the data (see the
+per-request replica affinity in db_client.py), unless primary=True.
+"""
+from typing import Optional
+import asyncpg
+
+from .db_client import execute_query, add_warm_statement
+
+_VERSION_QUERY = "SELECT version FROM data_versions WHERE table_name = $1"
+
+# Looked up by every conditional GET
+add_warm_statement(_VERSION_QUERY)
+
+# Cleared when the migration has not been applied, so versions are not
+# looked up (and failing) on every request
+_available = True
+
+
+async def get_data_version(table: str, primary: bool = False) -> Optional[int]:
+    """
+    Get the current change counter of a table
+
+    Args:
+        table: Table name ("services" or "spaces")
+        primary: Read from the primary (for data also read from the primary)
+
+    Returns:
+        Optional[int]: Version, or None if the table is not versioned
+    """
+    global _available
+    if not _available:
+        return None
+    try:
+        row = await execute_query(_VERSION_QUERY, table, fetch_one=True, prepared=True, replica=not primary)
+    except asyncpg.UndefinedTableError:
+        print("data_versions table missing (migration 007), conditional GETs disabled")
+        _available = False
+        return None
+    return row["version"] if row else None
@@ -2,8 +2,15 @@
 PostgreSQL database client configuration using asyncpg
 """
 import os
+import re
+import time
+import asyncio
+import collections
+import weakref
 import asyncpg
-from typing import Optional, List, Dict, Any
+import orjson
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any, Awaitable, Callable, Sequence, Tuple, Union
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 
@@ -23,31 +30,231 @@ if not DATABASE_URL:
 
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# PgBouncer support. DB_PGBOUNCER_MODE:
+#   off                   direct connections (default)
+#   transaction           transaction pooling without prepared statement
+#                         support: nothing is cached server-side, every
+#                         statement is parsed in the transaction that runs it
+#   transaction-prepared  transaction pooling with PgBouncer >= 1.21 and
+#                         max_prepared_statements > 0: statements stay cached
+#                         and PgBouncer maps their names onto server connections
+# Session features (LISTEN/NOTIFY) need a real session: DATABASE_DIRECT_URL
+# points past PgBouncer, at Postgres itself.
+DB_PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "off")
+if DB_PGBOUNCER_MODE not in ("off", "transaction", "transaction-prepared"):
+    raise ValueError(f"Invalid DB_PGBOUNCER_MODE: {DB_PGBOUNCER_MODE}")
+DATABASE_DIRECT_URL = os.getenv("DATABASE_DIRECT_URL") or DATABASE_URL
+# Statements can be prepared and reused across transactions on one connection
+STATEMENT_CACHING = DB_PGBOUNCER_MODE != "transaction"
+
+# Streaming replicas (optional, comma separated URLs) for read-only queries
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Replicas further behind the primary than this are skipped until they catch up
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+
+# Pool sizing, per worker (small on edge nodes, larger on central ones).
+# Replica pools use the same settings.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+# Idle connections above the minimum are closed after this long
+DB_POOL_MAX_INACTIVE_SECONDS = float(os.getenv("DB_POOL_MAX_INACTIVE_SECONDS", "300"))
+
+# Adaptive sizing: DB_POOL_MAX_SIZE becomes a ceiling and the number of
+# connections in use is limited to a value that grows while acquires wait
+# longer than DB_POOL_TARGET_WAIT_MS and shrinks while the pool is mostly idle
+DB_POOL_ADAPTIVE = os.getenv("DB_POOL_ADAPTIVE", "False") == "True"
+DB_POOL_TARGET_WAIT_MS = float(os.getenv("DB_POOL_TARGET_WAIT_MS", "5"))
+DB_POOL_RESIZE_INTERVAL = float(os.getenv("DB_POOL_RESIZE_INTERVAL", "10"))
+
 # Connection pool
 _pool: Optional[asyncpg.Pool] = None
 
 
+def _pool_options() -> Dict[str, Any]:
+    """Keyword arguments for asyncpg.create_pool"""
+    options = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "command_timeout": DB_COMMAND_TIMEOUT,
+        "max_inactive_connection_lifetime": DB_POOL_MAX_INACTIVE_SECONDS,
+        "init": _init_connection
+    }
+    if not STATEMENT_CACHING:
+        # asyncpg then uses unnamed statements only
+        options["statement_cache_size"] = 0
+    return options
+
+
 async def init_db():
     """Initialize database connection pool"""
     global _pool
     if _pool is None:
-        _pool = await asyncpg.create_pool(
-            DATABASE_URL,
-            min_size=5,
-            max_size=20,
-            command_timeout=60
+        # Opens (and warms) DB_POOL_MIN_SIZE connections before returning
+        _pool = await asyncpg.create_pool(DATABASE_URL, **_pool_options())
+        print(
+            f"Database pool ready: {_pool.get_size()} connections "
+            f"(max {DB_POOL_MAX_SIZE}), {len(_warm_statements) if STATEMENT_CACHING else 0} "
+            f"statements prepared on each, PgBouncer mode {DB_PGBOUNCER_MODE}"
         )
+        _start_pool_resizer()
+        await _start_replicas()
     return _pool
 
 
 async def close_db():
     """Close database connection pool"""
     global _pool
+    await _stop_replicas()
+    await _stop_pool_resizer()
     if _pool is not None:
         await _pool.close()
         _pool = None
 
 
+# Connection warm-up
+#
+# Every new pooled connection (the DB_POOL_MIN_SIZE opened at startup and any
+# opened later) gets the JSON codecs and the statements registered with
+# add_warm_statement() prepared before it serves a query, so the first
+# requests after a deploy pay neither connect nor parse/plan latency.
+_warm_statements: List[str] = []
+
+
+def add_warm_statement(query: str):
+    """
+    Prepare a hot statement on every new pooled connection
+
+    Register at import time, before init_db(). Statements run through
+    execute_query(..., prepared=True) with the same text use the prepared copy.
+
+    Args:
+        query: SQL query string
+    """
+    if query not in _warm_statements:
+        _warm_statements.append(query)
+
+
+def _encode_json(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Set up a new pooled connection before it is handed out"""
+    # json/jsonb columns decode to Python objects
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, encoder=_encode_json, decoder=orjson.loads, schema="pg_catalog"
+        )
+    if not STATEMENT_CACHING:
+        return
+    for query in list(_warm_statements):
+        try:
+            await _get_prepared(conn, query)
+        except asyncpg.PostgresError as e:
+            # e.g. a migration not applied yet: stop trying on every connection
+            print(f"Not preparing statement on connect ({e}): {_WHITESPACE.sub(' ', query).strip()}")
+            _warm_statements.remove(query)
+
+
+# Adaptive pool limit
+class _PoolLimit:
+    """Resizable limit on connections in use, waking waiters in FIFO order"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self._waiters: "collections.deque[asyncio.Future]" = collections.deque()
+
+    async def acquire(self):
+        if self.in_use < self.limit and not self._waiters:
+            self._take()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before the cancellation: pass the slot on
+                self.release()
+            raise
+
+    def _take(self):
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+
+    def release(self):
+        self.in_use -= 1
+        self._wake()
+
+    def resize(self, limit: int):
+        self.limit = limit
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+
+
+_pool_limit: Optional[_PoolLimit] = None
+_pool_resizer: Optional[asyncio.Task] = None
+# Acquires and acquires slower than DB_POOL_TARGET_WAIT_MS in this interval
+_resize_window = {"acquires": 0, "slow": 0}
+
+
+def _start_pool_resizer():
+    global _pool_limit, _pool_resizer
+    if DB_POOL_ADAPTIVE and _pool_resizer is None:
+        _pool_limit = _PoolLimit(DB_POOL_MIN_SIZE)
+        _pool_resizer = asyncio.create_task(_resize_pool())
+
+
+async def _stop_pool_resizer():
+    global _pool_limit, _pool_resizer
+    if _pool_resizer is not None:
+        _pool_resizer.cancel()
+        try:
+            await _pool_resizer
+        except asyncio.CancelledError:
+            pass
+        _pool_resizer = None
+    if _pool_limit is not None:
+        # Let anyone still queued through
+        _pool_limit.resize(DB_POOL_MAX_SIZE)
+        _pool_limit = None
+
+
+async def _resize_pool():
+    """Adjust the pool limit from the acquire waits of the last interval"""
+    while True:
+        await asyncio.sleep(DB_POOL_RESIZE_INTERVAL)
+        limit = _pool_limit
+        acquires, slow, peak = _resize_window["acquires"], _resize_window["slow"], limit.peak
+        _resize_window["acquires"] = _resize_window["slow"] = 0
+        limit.peak = limit.in_use
+
+        if acquires and slow > acquires * 0.05 and limit.limit < DB_POOL_MAX_SIZE:
+            # Grow fast: queued requests are paying for every interval
+            new_limit = min(DB_POOL_MAX_SIZE, limit.limit * 2)
+        elif not slow and peak < limit.limit // 2 and limit.limit > DB_POOL_MIN_SIZE:
+            # Shrink slowly; idle connections then expire after
+            # DB_POOL_MAX_INACTIVE_SECONDS
+            new_limit = max(DB_POOL_MIN_SIZE, limit.limit - 1)
+        else:
+            continue
+        print(
+            f"Database pool limit {limit.limit} -> {new_limit} "
+            f"({slow}/{acquires} acquires waited over {DB_POOL_TARGET_WAIT_MS:g} ms, peak {peak} in use)"
+        )
+        limit.resize(new_limit)
+
+
 async def get_pool() -> asyncpg.Pool:
     """Get database connection pool"""
     if _pool is None:
@@ -55,21 +262,661 @@ async def get_pool() -> asyncpg.Pool:
     return _pool
 
 
+def get_pool_stats() -> Dict[str, int]:
+    """
+    Get connection pool occupancy
+
+    Returns:
+        dict: Open connections (size), idle connections, configured
+        min/max sizes, and the adaptive limit on connections in use (the
+        max size when adaptive sizing is off); all 0 before init_db
+    """
+    if _pool is None:
+        return {"size": 0, "idle": 0, "min_size": 0, "max_size": 0, "limit": 0}
+    return {
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "limit": _pool_limit.limit if _pool_limit is not None else _pool.get_max_size()
+    }
+
+
+# Read replicas
+#
+# select(), execute_raw() and the keyset pagination helpers read from a
+# replica when one is configured, healthy, and no more than
+# DB_REPLICA_MAX_LAG_SECONDS behind; otherwise (and when a replica fails
+# mid-query) they fall back to the primary. Everything else runs on the
+# primary.
+#
+# Within one request (or task), reads stick to the replica they first used,
+# so a data version read before the data it describes stays consistent with
+# it. After a write the request reads from the primary, so it sees its own
+# changes. Callers that must see the latest committed state (uniqueness
+# checks, account data just changed by the user) pass primary=True.
+class _Replica:
+    """A replica pool and its last health check"""
+    __slots__ = ("url", "name", "pool", "healthy", "lag", "checked")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.name = url.rsplit("@", 1)[-1]
+        self.pool: Optional[asyncpg.Pool] = None
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked = False
+
+    def usable(self) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG_SECONDS
+
+
+# Replay lag in seconds: 0 when everything received has been replayed (an
+# idle primary does not make a replica look stale), NULL on a non-replica
+_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+"""
+
+# Errors after which a read is retried on the primary
+_REPLICA_FAILURES = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.CannotConnectNowError,
+    asyncpg.exceptions.AdminShutdownError,
+    asyncpg.exceptions.TooManyConnectionsError,
+    # Cancelled by a conflict with WAL replay
+    asyncpg.exceptions.SerializationError
+)
+
+_replicas: List[_Replica] = []
+_replica_monitor: Optional[asyncio.Task] = None
+_next_replica = 0
+_replica_stats = {"replica_reads": 0, "primary_reads": 0, "fallbacks": 0}
+
+_read_replica: ContextVar[Optional[_Replica]] = ContextVar("read_replica", default=None)
+_read_primary: ContextVar[bool] = ContextVar("read_primary", default=False)
+
+
+async def _check_replica(replica: _Replica):
+    """Connect to a replica if needed and refresh its health and lag"""
+    was_healthy, first_check = replica.healthy, not replica.checked
+    replica.checked = True
+    try:
+        if replica.pool is None:
+            replica.pool = await asyncpg.create_pool(replica.url, **_pool_options())
+        async with replica.pool.acquire(timeout=DB_REPLICA_CHECK_INTERVAL) as conn:
+            lag = await conn.fetchval(_LAG_QUERY, timeout=DB_REPLICA_CHECK_INTERVAL)
+        problem = None if lag is not None else "not in recovery"
+    except Exception as e:
+        lag, problem = None, str(e)
+
+    replica.healthy = problem is None
+    replica.lag = float(lag) if lag is not None else None
+    # Log state changes only, not every failed check
+    if problem and (was_healthy or first_check):
+        print(f"Replica {replica.name} not used for reads: {problem}")
+    elif not problem and not was_healthy:
+        print(f"Replica {replica.name} available ({replica.lag:.1f}s behind)")
+
+
+async def _monitor_replicas():
+    """Re-check every replica periodically"""
+    while True:
+        await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+        await asyncio.gather(*(_check_replica(replica) for replica in _replicas))
+
+
+async def _start_replicas():
+    """Open the configured replica pools and start health checks"""
+    global _replica_monitor
+    if not DATABASE_REPLICA_URLS or _replicas:
+        return
+    _replicas.extend(_Replica(url) for url in DATABASE_REPLICA_URLS)
+    await asyncio.gather(*(_check_replica(replica) for replica in _replicas))
+    _replica_monitor = asyncio.create_task(_monitor_replicas())
+
+
+async def _stop_replicas():
+    """Stop health checks and close the replica pools"""
+    global _replica_monitor
+    if _replica_monitor is not None:
+        _replica_monitor.cancel()
+        try:
+            await _replica_monitor
+        except asyncio.CancelledError:
+            pass
+        _replica_monitor = None
+    for replica in _replicas:
+        if replica.pool is not None:
+            await replica.pool.close()
+    _replicas.clear()
+
+
+def _choose_replica() -> Optional[_Replica]:
+    """Pick the replica for a read in the current context, or None for the primary"""
+    global _next_replica
+    if not _replicas or _read_primary.get():
+        return None
+    replica = _read_replica.get()
+    if replica is not None and replica.usable():
+        return replica
+    usable = [replica for replica in _replicas if replica.usable()]
+    if not usable:
+        return None
+    _next_replica = (_next_replica + 1) % len(usable)
+    replica = usable[_next_replica]
+    _read_replica.set(replica)
+    return replica
+
+
+def pin_primary():
+    """Send the rest of the current request's reads to the primary"""
+    _read_primary.set(True)
+
+
+def get_replica_stats() -> Dict[str, Any]:
+    """
+    Get replica health and read routing counters
+
+    Returns:
+        dict: Replica-eligible reads served by a replica or by the primary,
+        fallbacks after a replica failed mid-query, and per replica its name
+        (host/db), health, replay lag in seconds and pool occupancy
+    """
+    return {
+        **_replica_stats,
+        "replicas": [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "usable": replica.usable(),
+                "lag": replica.lag,
+                "size": replica.pool.get_size() if replica.pool else 0,
+                "idle": replica.pool.get_idle_size() if replica.pool else 0
+            }
+            for replica in _replicas
+        ]
+    }
+
+
+# Shared LISTEN connection
+#
+# LISTEN needs a session of its own, so it cannot go through the pool (or
+# PgBouncer). Every in-process cache registers its channels with
+# add_channel_listener() on one connection per worker to DATABASE_DIRECT_URL.
+# When it drops, each channel's on_disconnect runs (notifications may now be
+# missed) and the connection is retried every LISTENER_RETRY_SECONDS; once it
+# is back, every channel is listened to again and its on_connect runs.
+LISTENER_RETRY_SECONDS = 5
+
+NotificationCallback = Callable[[asyncpg.Connection, int, str, str], None]
+
+# channel -> (callback, on_connect, on_disconnect)
+_channels: Dict[str, tuple] = {}
+_listener: Optional[asyncpg.Connection] = None
+_listener_lock: Optional[asyncio.Lock] = None
+_listener_reconnect: Optional[asyncio.Task] = None
+
+
+async def _run_on_connect(channel: str, on_connect: Optional[Callable[[], Awaitable[None]]]):
+    if on_connect is None:
+        return
+    try:
+        await on_connect()
+    except Exception as e:
+        print(f"Listener setup for {channel} failed: {e}")
+
+
+def _on_listener_terminated(connection):
+    """Tell every channel notifications may be missed, and reconnect"""
+    global _listener, _listener_reconnect
+    _listener = None
+    for channel, (_, _, on_disconnect) in list(_channels.items()):
+        if on_disconnect is not None:
+            try:
+                on_disconnect()
+            except Exception as e:
+                print(f"Listener shutdown for {channel} failed: {e}")
+    if _channels and (_listener_reconnect is None or _listener_reconnect.done()):
+        _listener_reconnect = asyncio.get_event_loop().create_task(_reconnect_listener())
+
+
+async def _connect_listener():
+    """Open the LISTEN connection and listen on every registered channel"""
+    global _listener
+    connection = await asyncpg.connect(DATABASE_DIRECT_URL)
+    try:
+        for channel, (callback, _, _) in list(_channels.items()):
+            await connection.add_listener(channel, callback)
+    except Exception:
+        await connection.close()
+        raise
+    connection.add_termination_listener(_on_listener_terminated)
+    _listener = connection
+    for channel, (_, on_connect, _) in list(_channels.items()):
+        await _run_on_connect(channel, on_connect)
+
+
+async def _reconnect_listener():
+    """Retry the LISTEN connection until it succeeds"""
+    while _listener is None and _channels:
+        await asyncio.sleep(LISTENER_RETRY_SECONDS)
+        try:
+            async with _listener_lock:
+                if _listener is None and _channels:
+                    await _connect_listener()
+            print("Database listener reconnected")
+        except Exception as e:
+            print(f"Database listener reconnect failed: {e}")
+
+
+async def add_channel_listener(
+    channel: str,
+    callback: NotificationCallback,
+    on_connect: Optional[Callable[[], Awaitable[None]]] = None,
+    on_disconnect: Optional[Callable[[], None]] = None
+):
+    """
+    Listen on a notification channel over the shared LISTEN connection
+
+    The connection is opened by the first channel registered. If it cannot
+    be opened the channel stays registered and is listened to once a retry
+    succeeds.
+
+    Args:
+        channel: Channel name
+        callback: Called as callback(connection, pid, channel, payload) for
+            every notification; runs on the event loop and must not block
+        on_connect: Coroutine function run each time LISTEN on the channel
+            takes effect (notifications sent before may have been missed)
+        on_disconnect: Called when the connection drops
+    """
+    global _listener_lock
+    if _listener_lock is None:
+        _listener_lock = asyncio.Lock()
+    _channels[channel] = (callback, on_connect, on_disconnect)
+    async with _listener_lock:
+        try:
+            if _listener is None:
+                await _connect_listener()
+            else:
+                await _listener.add_listener(channel, callback)
+                await _run_on_connect(channel, on_connect)
+            return
+        except Exception as e:
+            print(f"Database listener unavailable, retrying every {LISTENER_RETRY_SECONDS}s: {e}")
+    if _listener is None:
+        _on_listener_terminated(None)
+
+
+async def remove_channel_listener(channel: str):
+    """
+    Stop listening on a channel; the connection closes with the last one
+
+    Args:
+        channel: Channel name passed to add_channel_listener
+    """
+    global _listener, _listener_reconnect
+    entry = _channels.pop(channel, None)
+    if entry is None:
+        return
+    if _channels:
+        if _listener is not None:
+            try:
+                await _listener.remove_listener(channel, entry[0])
+            except Exception as e:
+                print(f"Database listener UNLISTEN {channel} failed: {e}")
+        return
+    if _listener_reconnect is not None:
+        _listener_reconnect.cancel()
+        _listener_reconnect = None
+    if _listener is not None:
+        connection, _listener = _listener, None
+        connection.remove_termination_listener(_on_listener_terminated)
+        await connection.close()
+
+
+# Instrumentation hooks
+#
+# Observers are called synchronously after every pool acquire (with the wait
+# in seconds) and every execute_query call (with the SQL text, the seconds
+# spent on the connection, and whether it failed).
+_acquire_observers: List[Callable[[float], None]] = []
+_query_observers: List[Callable[[str, float, bool], None]] = []
+
+
+# Per-request accounting and slow-query log
+#
+# A request (see db_timing.py) installs a QueryUsage in _query_usage; every
+# pool acquire and execute_query call made while handling it adds to it.
+# Queries slower than DB_SLOW_QUERY_MS are logged with their normalized SQL
+# and the types of their parameters (never the values).
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryUsage:
+    """Database work done on behalf of one request"""
+    __slots__ = ("queries", "seconds", "wait_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.wait_seconds = 0.0
+
+
+_query_usage: ContextVar[Optional[QueryUsage]] = ContextVar("query_usage", default=None)
+
+
+def begin_query_usage():
+    """
+    Start accounting database work for the current request
+
+    Returns:
+        tuple: (QueryUsage, token for end_query_usage)
+    """
+    usage = QueryUsage()
+    return usage, _query_usage.set(usage)
+
+
+def end_query_usage(token):
+    """Stop accounting started with begin_query_usage"""
+    _query_usage.reset(token)
+
+
+# Query deadlines
+#
+# A request can bound its database work (see deadlines.py): pool acquires and
+# queries started under the deadline get only the time left, and asyncpg
+# cancels a query on the server when its timeout expires, so the connection
+# goes back to the pool instead of running for DB_COMMAND_TIMEOUT.
+class QueryDeadlineExceeded(Exception):
+    """The database deadline of the current request has passed"""
+
+
+_query_deadline: ContextVar[Optional[float]] = ContextVar("query_deadline", default=None)
+
+
+def set_query_deadline(seconds: Optional[float]):
+    """
+    Bound the database work of the current request (or task)
+
+    Args:
+        seconds: Time allowed from now, or None/0 for no deadline
+
+    Returns:
+        Token for reset_query_deadline
+    """
+    return _query_deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def reset_query_deadline(token):
+    """Restore the deadline replaced by set_query_deadline"""
+    _query_deadline.reset(token)
+
+
+def _time_left() -> Optional[float]:
+    """
+    Seconds left before the current deadline
+
+    Returns:
+        Optional[float]: Time left, or None without a deadline
+
+    Raises:
+        QueryDeadlineExceeded: If the deadline has already passed
+    """
+    deadline = _query_deadline.get()
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise QueryDeadlineExceeded("Database deadline exceeded")
+    return left
+
+
+def _param_shape(value: Any) -> str:
+    """Describe a parameter without revealing it"""
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _log_slow_query(query: str, args: tuple, elapsed: float):
+    shapes = ", ".join(f"${i}: {_param_shape(arg)}" for i, arg in enumerate(args, 1))
+    print(
+        f"Slow query ({elapsed * 1000:.1f} ms): {_WHITESPACE.sub(' ', query).strip()}"
+        + (f" [{shapes}]" if shapes else "")
+    )
+
+
+def add_acquire_observer(callback: Callable[[float], None]):
+    """Register a callback receiving each pool acquire wait time"""
+    if callback not in _acquire_observers:
+        _acquire_observers.append(callback)
+
+
+def add_query_observer(callback: Callable[[str, float, bool], None]):
+    """Register a callback receiving (query, seconds, failed) for each query"""
+    if callback not in _query_observers:
+        _query_observers.append(callback)
+
+
+@asynccontextmanager
+async def _acquire(pool: asyncpg.Pool):
+    """Acquire a connection from a pool, recording the wait"""
+    limit = _pool_limit if pool is _pool else None
+    start = time.perf_counter()
+    if limit is not None:
+        try:
+            await asyncio.wait_for(limit.acquire(), _time_left())
+        except asyncio.TimeoutError:
+            raise QueryDeadlineExceeded("Database deadline exceeded waiting for a connection") from None
+    try:
+        try:
+            connection = await pool.acquire(timeout=_time_left())
+        except asyncio.TimeoutError:
+            raise QueryDeadlineExceeded("Database deadline exceeded waiting for a connection") from None
+        try:
+            waited = time.perf_counter() - start
+            if limit is not None:
+                _resize_window["acquires"] += 1
+                if waited * 1000 > DB_POOL_TARGET_WAIT_MS:
+                    _resize_window["slow"] += 1
+            usage = _query_usage.get()
+            if usage is not None:
+                usage.wait_seconds += waited
+            for callback in _acquire_observers:
+                callback(waited)
+            yield connection
+        finally:
+            await pool.release(connection)
+    finally:
+        if limit is not None:
+            limit.release()
+
+
 @asynccontextmanager
 async def get_db_connection():
-    """Get a database connection from the pool"""
-    pool = await get_pool()
-    async with pool.acquire() as connection:
+    """Get a database connection from the primary pool"""
+    pin_primary()
+    async with _acquire(await get_pool()) as connection:
         yield connection
 
 
+# Compiled query cache
+#
+# The generic helpers below build their SQL from the *shape* of a call
+# (table, column set, where keys, order_by, whether a LIMIT is present), so
+# the text is compiled once per shape and reused. The resulting statements
+# are also prepared explicitly, once per physical connection, so repeated
+# calls skip both string building and Postgres parse/plan work.
+PREPARED_CACHE_SIZE = int(os.getenv("DB_PREPARED_CACHE_SIZE", "256"))
+
+_query_cache: Dict[tuple, str] = {}
+_prepared_statements: "weakref.WeakKeyDictionary[asyncpg.Connection, collections.OrderedDict[str, Any]]" = weakref.WeakKeyDictionary()
+_query_cache_stats = {
+    "sql_hits": 0,
+    "sql_misses": 0,
+    "prepared_hits": 0,
+    "prepared_misses": 0
+}
+
+
+def _compile(key: tuple, build: Callable[[], str]) -> str:
+    """
+    Return the cached SQL text for a query shape, building it on first use
+
+    Args:
+        key: Query shape
+        build: Function producing the SQL text for that shape
+
+    Returns:
+        str: SQL text
+    """
+    query = _query_cache.get(key)
+    if query is None:
+        _query_cache_stats["sql_misses"] += 1
+        query = _query_cache[key] = build()
+    else:
+        _query_cache_stats["sql_hits"] += 1
+    return query
+
+
+def _columns_sql(columns: Union[str, Sequence[str]]) -> str:
+    """Render a column list given either as SQL text or as a list of names"""
+    return columns if isinstance(columns, str) else ", ".join(columns)
+
+
+async def _get_prepared(conn, query: str):
+    """
+    Get a prepared statement for a query on a connection, preparing it once
+
+    Args:
+        conn: Pooled connection
+        query: SQL query string
+
+    Returns:
+        asyncpg PreparedStatement
+    """
+    # Pool hands out a new proxy on every acquire; cache on the real connection
+    raw_conn = getattr(conn, "_con", None) or conn
+    statements = _prepared_statements.get(raw_conn)
+    if statements is None:
+        statements = _prepared_statements[raw_conn] = collections.OrderedDict()
+
+    statement = statements.get(query)
+    if statement is not None:
+        # Least recently used statements are evicted first
+        statements.move_to_end(query)
+        _query_cache_stats["prepared_hits"] += 1
+        return statement
+
+    _query_cache_stats["prepared_misses"] += 1
+    if len(statements) >= PREPARED_CACHE_SIZE:
+        statements.popitem(last=False)
+    statement = statements[query] = await conn.prepare(query)
+    return statement
+
+
+def _forget_prepared(conn, query: str):
+    """Drop a prepared statement that the server no longer accepts"""
+    raw_conn = getattr(conn, "_con", None) or conn
+    _prepared_statements.get(raw_conn, {}).pop(query, None)
+
+
+async def _run_prepared(
+    conn,
+    query: str,
+    args: tuple,
+    fetch_one: bool,
+    fetch_all: bool,
+    timeout: Optional[float]
+) -> Any:
+    """Execute a query through the connection's prepared statement cache"""
+    for attempt in range(2):
+        statement = await _get_prepared(conn, query)
+        try:
+            if fetch_one:
+                return await statement.fetchrow(*args, timeout=timeout)
+            rows = await statement.fetch(*args, timeout=timeout)
+            return rows if fetch_all else statement.get_statusmsg()
+        except (asyncpg.exceptions.InvalidCachedStatementError,
+                asyncpg.exceptions.FeatureNotSupportedError):
+            # Schema changed under the statement: re-prepare once
+            _forget_prepared(conn, query)
+            if attempt:
+                raise
+
+
+def get_query_cache_stats() -> Dict[str, int]:
+    """
+    Get compiled query cache counters
+
+    Returns:
+        dict: SQL text and prepared statement hit/miss counters
+    """
+    return {**_query_cache_stats, "compiled_queries": len(_query_cache)}
+
+
 # Helper functions for database operations
 
+async def _execute(
+    pool: asyncpg.Pool,
+    query: str,
+    args: tuple,
+    fetch_one: bool,
+    fetch_all: bool,
+    prepared: bool
+) -> Optional[Any]:
+    """Run one query on a connection from the given pool"""
+    async with _acquire(pool) as conn:
+        # None leaves asyncpg's command_timeout in charge
+        timeout = _time_left()
+        if timeout is not None and timeout >= DB_COMMAND_TIMEOUT:
+            timeout = None
+        start = time.perf_counter()
+        failed = True
+        try:
+            if prepared and STATEMENT_CACHING:
+                result = await _run_prepared(conn, query, args, fetch_one, fetch_all, timeout)
+            elif fetch_one:
+                result = await conn.fetchrow(query, *args, timeout=timeout)
+            elif fetch_all:
+                result = await conn.fetch(query, *args, timeout=timeout)
+            else:
+                result = await conn.execute(query, *args, timeout=timeout)
+            failed = False
+            return result
+        except asyncio.TimeoutError:
+            if timeout is not None:
+                raise QueryDeadlineExceeded("Database deadline exceeded, query cancelled") from None
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            usage = _query_usage.get()
+            if usage is not None:
+                usage.queries += 1
+                usage.seconds += elapsed
+            if DB_SLOW_QUERY_MS and elapsed * 1000 >= DB_SLOW_QUERY_MS:
+                _log_slow_query(query, args, elapsed)
+            for callback in _query_observers:
+                callback(query, elapsed, failed)
+
+
 async def execute_query(
     query: str,
     *args,
     fetch_one: bool = False,
-    fetch_all: bool = False
+    fetch_all: bool = False,
+    prepared: bool = False,
+    replica: bool = False
 ) -> Optional[Any]:
     """
     Execute a database query
@@ -79,17 +926,28 @@ async def execute_query(
         *args: Query parameters
         fetch_one: Return single row
         fetch_all: Return all rows
+        prepared: Reuse an explicitly prepared statement for this query
+            (ignored in DB_PGBOUNCER_MODE=transaction)
+        replica: Read-only query that may run on a replica
 
     Returns:
         Query result or None
     """
-    async with get_db_connection() as conn:
-        if fetch_one:
-            return await conn.fetchrow(query, *args)
-        elif fetch_all:
-            return await conn.fetch(query, *args)
-        else:
-            return await conn.execute(query, *args)
+    if replica:
+        target = _choose_replica()
+        if target is not None:
+            try:
+                result = await _execute(target.pool, query, args, fetch_one, fetch_all, prepared)
+                _replica_stats["replica_reads"] += 1
+                return result
+            except _REPLICA_FAILURES as e:
+                print(f"Replica {target.name} failed, reading from primary: {e}")
+                target.healthy = False
+                _replica_stats["fallbacks"] += 1
+        _replica_stats["primary_reads"] += 1
+    else:
+        pin_primary()
+    return await _execute(await get_pool(), query, args, fetch_one, fetch_all, prepared)
 
 
 async def insert(table: str, data: Dict[str, Any], returning: str = "*") -> Optional[Dict]:
@@ -104,63 +962,123 @@ async def insert(table: str, data: Dict[str, Any], returning: str = "*") -> Opti
     Returns:
         Inserted row as dictionary
     """
-    columns = ", ".join(data.keys())
-    placeholders = ", ".join(f"${i+1}" for i in range(len(data)))
-    values = list(data.values())
+    keys = tuple(data)
 
-    query = f"""
-        INSERT INTO {table} ({columns})
-        VALUES ({placeholders})
-        RETURNING {returning}
-    """
+    def build() -> str:
+        placeholders = ", ".join(f"${i+1}" for i in range(len(keys)))
+        return f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({placeholders}) RETURNING {returning}"
 
-    row = await execute_query(query, *values, fetch_one=True)
+    query = _compile(("insert", table, keys, returning), build)
+
+    row = await execute_query(query, *data.values(), fetch_one=True, prepared=True)
     return dict(row) if row else None
 
 
+async def insert_on_conflict(
+    table: str,
+    data: Dict[str, Any],
+    conflict: Union[str, Sequence[str]],
+    update_columns: Optional[Sequence[str]] = None,
+    returning: str = "*"
+) -> Tuple[Optional[Dict], bool]:
+    """
+    Insert a row, or leave or update the row it conflicts with
+
+    One INSERT ... ON CONFLICT statement, so concurrent requests cannot both
+    pass a select-then-insert check:
+
+        user, created = await insert_on_conflict("users", data, "email")
+
+    Args:
+        table: Table name
+        data: Dictionary of column:value pairs
+        conflict: Conflict target, as SQL text or a list of column names
+        update_columns: Columns to overwrite from the new row on conflict
+            (default: leave the existing row as it is)
+        returning: Columns to return (default: *)
+
+    Returns:
+        tuple: (row, created). On conflict the row is the updated one when
+        update_columns is given, None otherwise.
+    """
+    keys = tuple(data)
+    target_key = conflict if isinstance(conflict, str) else tuple(conflict)
+    update_keys = tuple(update_columns) if update_columns else ()
+
+    def build() -> str:
+        placeholders = ", ".join(f"${i+1}" for i in range(len(keys)))
+        query = (
+            f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({placeholders})"
+            f" ON CONFLICT ({_columns_sql(conflict)})"
+        )
+        if not update_keys:
+            return f"{query} DO NOTHING RETURNING {returning}"
+        assignments = ", ".join(f"{key} = EXCLUDED.{key}" for key in update_keys)
+        # xmax is 0 only on a freshly inserted row version
+        return f"{query} DO UPDATE SET {assignments} RETURNING {returning}, (xmax = 0) AS _created"
+
+    query = _compile(("insert_on_conflict", table, keys, returning, target_key, update_keys), build)
+
+    row = await execute_query(query, *data.values(), fetch_one=True, prepared=True)
+    if row is None:
+        # DO NOTHING skipped the row
+        return None, False
+    row = dict(row)
+    if not update_keys:
+        return row, True
+    created = row.pop("_created")
+    return row, created
+
+
 async def select(
     table: str,
-    columns: str = "*",
+    columns: Union[str, Sequence[str]] = "*",
     where: Optional[Dict[str, Any]] = None,
     order_by: Optional[str] = None,
     limit: Optional[int] = None,
-    fetch_one: bool = False
+    fetch_one: bool = False,
+    primary: bool = False
 ) -> Optional[Any]:
     """
     Select rows from a table
 
     Args:
         table: Table name
-        columns: Columns to select (default: *)
+        columns: Columns to select, as SQL text or a list of names (default: *)
         where: Dictionary of column:value pairs for WHERE clause
         order_by: ORDER BY clause
         limit: LIMIT value
         fetch_one: Return only one row
+        primary: Read from the primary even when replicas are configured
 
     Returns:
         List of rows as dictionaries or single row
     """
-    query = f"SELECT {columns} FROM {table}"
-    values = []
+    column_key = columns if isinstance(columns, str) else tuple(columns)
+    where_keys = tuple(where) if where else ()
 
-    if where:
-        where_clauses = []
-        for i, (key, value) in enumerate(where.items(), 1):
-            where_clauses.append(f"{key} = ${i}")
-            values.append(value)
-        query += f" WHERE {' AND '.join(where_clauses)}"
+    def build() -> str:
+        query = f"SELECT {_columns_sql(columns)} FROM {table}"
+        if where_keys:
+            where_clauses = [f"{key} = ${i}" for i, key in enumerate(where_keys, 1)]
+            query += f" WHERE {' AND '.join(where_clauses)}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit:
+            query += f" LIMIT ${len(where_keys) + 1}"
+        return query
 
-    if order_by:
-        query += f" ORDER BY {order_by}"
+    query = _compile(("select", table, column_key, where_keys, order_by, bool(limit)), build)
 
+    values = list(where.values()) if where else []
     if limit:
-        query += f" LIMIT {limit}"
+        values.append(limit)
 
     if fetch_one:
-        row = await execute_query(query, *values, fetch_one=True)
+        row = await execute_query(query, *values, fetch_one=True, prepared=True, replica=not primary)
         return dict(row) if row else None
     else:
-        rows = await execute_query(query, *values, fetch_all=True)
+        rows = await execute_query(query, *values, fetch_all=True, prepared=True, replica=not primary)
         return [dict(row) for row in rows]
 
 
@@ -182,26 +1100,22 @@ async def update(
     Returns:
         Updated row as dictionary
     """
-    set_clauses = []
-    values = []
+    set_keys = tuple(data)
+    where_keys = tuple(where)
 
-    for i, (key, value) in enumerate(data.items(), 1):
-        set_clauses.append(f"{key} = ${i}")
-        values.append(value)
-
-    where_clauses = []
-    for key, value in where.items():
-        where_clauses.append(f"{key} = ${len(values) + 1}")
-        values.append(value)
+    def build() -> str:
+        set_clauses = [f"{key} = ${i}" for i, key in enumerate(set_keys, 1)]
+        where_clauses = [
+            f"{key} = ${i}" for i, key in enumerate(where_keys, len(set_keys) + 1)
+        ]
+        return (
+            f"UPDATE {table} SET {', '.join(set_clauses)} "
+            f"WHERE {' AND '.join(where_clauses)} RETURNING {returning}"
+        )
 
-    query = f"""
-        UPDATE {table}
-        SET {', '.join(set_clauses)}
-        WHERE {' AND '.join(where_clauses)}
-        RETURNING {returning}
-    """
+    query = _compile(("update", table, set_keys, where_keys, returning), build)
 
-    row = await execute_query(query, *values, fetch_one=True)
+    row = await execute_query(query, *data.values(), *where.values(), fetch_one=True, prepared=True)
     return dict(row) if row else None
 
 
@@ -216,34 +1130,39 @@ async def delete(table: str, where: Dict[str, Any]) -> bool:
     Returns:
         True if rows were deleted
     """
-    where_clauses = []
-    values = []
+    where_keys = tuple(where)
 
-    for i, (key, value) in enumerate(where.items(), 1):
-        where_clauses.append(f"{key} = ${i}")
-        values.append(value)
+    def build() -> str:
+        where_clauses = [f"{key} = ${i}" for i, key in enumerate(where_keys, 1)]
+        return f"DELETE FROM {table} WHERE {' AND '.join(where_clauses)}"
 
-    query = f"DELETE FROM {table} WHERE {' AND '.join(where_clauses)}"
+    query = _compile(("delete", table, where_keys), build)
 
-    result = await execute_query(query, *values)
+    result = await execute_query(query, *where.values(), prepared=True)
     return result is not None
 
 
-async def execute_raw(query: str, *args) -> Any:
+async def execute_raw(query: str, *args, primary: bool = False) -> Any:
     """
-    Execute a raw SQL query
+    Execute a raw read-only SQL query
 
     Args:
         query: SQL query string
         *args: Query parameters
+        primary: Read from the primary even when replicas are configured
 
     Returns:
         Query result
     """
-    return await execute_query(query, *args, fetch_all=True)
+    return await execute_query(query, *args, fetch_all=True, replica=not primary)
 
 
 # Transaction support
+#
+# Behind PgBouncer in transaction mode one server connection is held from
+# BEGIN to COMMIT, so anything done on `conn` inside the block is safe.
+# Session state must not outlive it: use SET LOCAL, not SET, and no LISTEN,
+# advisory session locks or temporary tables without ON COMMIT DROP.
 @asynccontextmanager
 async def transaction():
     """Context manager for database transactions"""
@@ -0,0 +1,391 @@
+"""
+In-process read-through cache of the flights table
+
+Each worker keeps the whole flight board in memory and serves reads from it.
+A trigger on `flights` publishes every insert/update/delete on the
+`flights_changed` channel (see migrations/001_flights_notify.sql); the
+worker's shared LISTEN connection (see db_client.add_channel_listener())
+invalidates the cache as soon as a change is committed, whether it came from
+the API or from direct SQL.
+
+Inserts, updates and deletes name their flight, so the next read re-fetches
+just those flights and patches them into the board; only TRUNCATE, RESYNC
+(bulk writes, reconnects) or more than MAX_PATCH_FLIGHTS pending changes
+reload the whole board. Loads run in a task shared by all readers, outside
+any request's deadline: a reader whose deadline passes stops waiting, and
+the load finishes for the next one.
+
+If the LISTEN connection is down the cache cannot be trusted, so reads fall
+through to the database until it reconnects.
+
+Other in-process consumers (e.g. the live flight board stream) can subscribe
+to the same notifications with add_flight_change_listener() instead of
+opening their own LISTEN connection. They are notified with
+FLIGHT_CACHE_ENABLED=False too; only reads stop being served from memory.
+"""
+import os
+import json
+import asyncio
+import bisect
+import hashlib
+import orjson
+from typing import Optional, List, Dict, Any, Callable, Set
+from dotenv import load_dotenv
+
+from .db_client import (
+    QueryDeadlineExceeded,
+    _time_left,
+    add_channel_listener,
+    remove_channel_listener,
+    execute_raw,
+    select,
+    set_query_deadline
+)
+from .pagination import select_keyset
+
+# Load environment variables
+load_dotenv()
+
+FLIGHT_CACHE_ENABLED = os.getenv("FLIGHT_CACHE_ENABLED", "True") == "True"
+FLIGHTS_CHANNEL = "flights_changed"
+# Reloads attempted while notifications keep arriving before the latest
+# snapshot is served anyway (and reloaded on the next read)
+MAX_LOAD_ATTEMPTS = 3
+# Pending changed flights past which the whole board is reloaded instead
+MAX_PATCH_FLIGHTS = 500
+
+_BOARD_QUERY = "SELECT * FROM flights ORDER BY departure_time ASC, id ASC"
+_PATCH_QUERY = "SELECT * FROM flights WHERE flight_number = ANY($1::varchar[])"
+
+_flights: List[Dict[str, Any]] = []
+_flights_by_number: Dict[str, Dict[str, Any]] = {}
+_flights_by_id: Dict[Any, Dict[str, Any]] = {}
+_loaded = False
+_generation = 0
+# Bumped by every full invalidation, so a load racing with one is not trusted
+_resyncs = 0
+# Flight numbers changed since the board was loaded or last patched
+_dirty: Set[str] = set()
+_board_digest: Optional[str] = None
+_load_task: Optional[asyncio.Task] = None
+
+# Whether notifications are being received (see _on_listener_connected)
+_listening = False
+_change_listeners: List[Callable[[str, Optional[str]], None]] = []
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0, "loads": 0, "patches": 0}
+
+
+def invalidate_flights_cache(flight_number: Optional[str] = None):
+    """
+    Mark cached flights stale so the next read refreshes them
+
+    Args:
+        flight_number: The flight that changed, or None to reload the
+            whole board
+    """
+    global _loaded, _generation, _resyncs
+    if flight_number is not None and len(_dirty) < MAX_PATCH_FLIGHTS:
+        _dirty.add(flight_number)
+    else:
+        _loaded = False
+        _resyncs += 1
+    _generation += 1
+    _stats["invalidations"] += 1
+
+
+def add_flight_change_listener(callback: Callable[[str, Optional[str]], None]):
+    """
+    Register a callback for committed flight changes
+
+    The callback receives the operation ("INSERT", "UPDATE", "DELETE",
+    "TRUNCATE", or "RESYNC" after the listener reconnects, when changes may
+    have been missed) and the flight number, if any. It runs on the event
+    loop and must not block.
+
+    Args:
+        callback: Function called as callback(op, flight_number)
+    """
+    _change_listeners.append(callback)
+
+
+def remove_flight_change_listener(callback: Callable[[str, Optional[str]], None]):
+    """Unregister a callback added with add_flight_change_listener"""
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+
+def _notify_change_listeners(op: str, flight_number: Optional[str]):
+    for callback in list(_change_listeners):
+        try:
+            callback(op, flight_number)
+        except Exception as e:
+            print(f"Flight change listener failed: {e}")
+
+
+def _on_flights_changed(connection, pid, channel, payload):
+    """LISTEN callback fired for every committed change to flights"""
+    try:
+        change = json.loads(payload)
+        op, flight_number = change.get("op", "RESYNC"), change.get("flight_number")
+    except ValueError:
+        op, flight_number = "RESYNC", None
+    if op in ("INSERT", "UPDATE", "DELETE") and flight_number is not None:
+        invalidate_flights_cache(flight_number)
+    else:
+        invalidate_flights_cache()
+    _notify_change_listeners(op, flight_number)
+
+
+async def _on_listener_connected():
+    global _listening
+    # Anything committed before LISTEN took effect must not be served
+    invalidate_flights_cache()
+    _listening = True
+    # Changes may have been missed while disconnected
+    _notify_change_listeners("RESYNC", None)
+
+
+def _on_listener_disconnected():
+    """Fall back to the database until the listener reconnects"""
+    global _listening
+    _listening = False
+    invalidate_flights_cache()
+
+
+async def start_flight_cache():
+    """
+    Start listening for flight changes (called on application startup)
+
+    The channel is listened to even with FLIGHT_CACHE_ENABLED=False, so
+    change listeners (the live board stream) still get every change.
+    """
+    await add_channel_listener(
+        FLIGHTS_CHANNEL,
+        _on_flights_changed,
+        on_connect=_on_listener_connected,
+        on_disconnect=_on_listener_disconnected
+    )
+
+
+async def stop_flight_cache():
+    """Stop listening for flight changes (called on application shutdown)"""
+    global _listening, _load_task
+    await remove_channel_listener(FLIGHTS_CHANNEL)
+    _listening = False
+    if _load_task is not None:
+        _load_task.cancel()
+        _load_task = None
+    invalidate_flights_cache()
+
+
+def is_flight_cache_active() -> bool:
+    """Whether reads can currently be served from memory"""
+    return FLIGHT_CACHE_ENABLED and _listening
+
+
+def get_flight_board_version() -> Optional[int]:
+    """
+    Get a version number that changes whenever the flight board changes
+
+    Returns:
+        Optional[int]: Cache generation, or None while changes are not
+        being tracked (listener down or cache disabled)
+    """
+    return _generation if is_flight_cache_active() else None
+
+
+def _board_key(flight: Dict[str, Any]) -> tuple:
+    """Sort key matching ORDER BY departure_time ASC NULLS LAST, id ASC"""
+    return (flight["departure_time"] is None, flight["departure_time"], flight["id"])
+
+
+async def _load_board():
+    """Replace the cached board with a fresh copy of the flights table"""
+    global _flights, _flights_by_number, _flights_by_id, _loaded, _board_digest
+    resyncs = _resyncs
+    # Changes from here on are patched in after the load
+    _dirty.clear()
+    # From the primary: a lagging replica would cache rows older than the
+    # notification that triggered the reload
+    rows = await execute_raw(_BOARD_QUERY, primary=True)
+    flights = [dict(row) for row in rows]
+    _flights = flights
+    _flights_by_number = {flight["flight_number"]: flight for flight in flights}
+    _flights_by_id = {flight["id"]: flight for flight in flights}
+    _board_digest = _digest(flights)
+    _stats["loads"] += 1
+    # Invalidated in full while loading: the snapshot may already be stale,
+    # so it is served but reloaded on the next read
+    _loaded = resyncs == _resyncs
+
+
+def _remove_flight(flight: Dict[str, Any]):
+    index = bisect.bisect_left(_flights, _board_key(flight), key=_board_key)
+    if index < len(_flights) and _flights[index] is flight:
+        del _flights[index]
+    _flights_by_id.pop(flight["id"], None)
+    if _flights_by_number.get(flight["flight_number"]) is flight:
+        del _flights_by_number[flight["flight_number"]]
+
+
+async def _patch_board():
+    """Re-fetch the changed flights and patch them into the cached board"""
+    global _board_digest
+    numbers = list(_dirty)
+    _dirty.clear()
+    rows = await execute_raw(_PATCH_QUERY, numbers, primary=True)
+    for number in numbers:
+        # Deleted flights are simply not fetched again
+        old = _flights_by_number.get(number)
+        if old is not None:
+            _remove_flight(old)
+    for row in rows:
+        flight = dict(row)
+        # Renamed flights are found by id
+        old = _flights_by_id.get(flight["id"])
+        if old is not None:
+            _remove_flight(old)
+        bisect.insort(_flights, flight, key=_board_key)
+        _flights_by_number[flight["flight_number"]] = flight
+        _flights_by_id[flight["id"]] = flight
+    _board_digest = _digest(_flights)
+    _stats["patches"] += 1
+
+
+async def _refresh_board():
+    """Bring the cached board up to date (one task shared by all readers)"""
+    # Not bound by the deadline of the request that happened to start it
+    set_query_deadline(None)
+    for _ in range(MAX_LOAD_ATTEMPTS):
+        if not _loaded:
+            await _load_board()
+        elif _dirty:
+            await _patch_board()
+        else:
+            return
+    # Under a steady stream of writes the latest board is served, and the
+    # next read refreshes it again
+
+
+async def _ensure_loaded() -> bool:
+    """
+    Load the flight board into memory, or patch it, if needed
+
+    Returns:
+        bool: True if the cache can serve the read, False to bypass it
+
+    Raises:
+        QueryDeadlineExceeded: If the request's deadline passes while the
+            board is loading (the load carries on for later reads)
+    """
+    global _load_task
+    if not is_flight_cache_active():
+        _stats["bypassed"] += 1
+        return False
+    refreshing = _load_task is not None and not _load_task.done()
+    if _loaded and not _dirty and not refreshing:
+        _stats["hits"] += 1
+        return True
+
+    _stats["misses"] += 1
+    if not refreshing:
+        _load_task = asyncio.get_running_loop().create_task(_refresh_board())
+    try:
+        await asyncio.wait_for(asyncio.shield(_load_task), _time_left())
+    except asyncio.TimeoutError:
+        raise QueryDeadlineExceeded("Database deadline exceeded")
+    return True
+
+
+def _digest(flights: List[Dict[str, Any]]) -> str:
+    """Content digest of a board snapshot, equal on workers holding the same rows"""
+    encoded = orjson.dumps(flights, default=str)
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+async def get_flight_data_version() -> Optional[str]:
+    """
+    Get a version of the flights table that is the same on every worker
+
+    The version is a digest of the cached board, computed once per load or
+    patch, so versioning flights takes no lock on the write path and workers
+    holding the same rows hand out the same ETag.
+
+    Returns:
+        Optional[str]: Version, or None while the board is not cached
+    """
+    if await _ensure_loaded():
+        return _board_digest
+    return None
+
+
+async def get_cached_flights(
+    where: Optional[Dict[str, Any]] = None,
+    limit: int = 50,
+    after: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get flights ordered by departure time, from memory when possible
+
+    Args:
+        where: Dictionary of column:value equality filters
+        limit: Maximum number of rows
+        after: Decoded pagination cursor (see database/pagination.py)
+
+    Returns:
+        List of flights as dictionaries
+    """
+    if not await _ensure_loaded():
+        return await select_keyset(
+            "flights",
+            where=where,
+            order_column="departure_time",
+            limit=limit,
+            after=after
+        )
+
+    flights = _flights
+    if where:
+        flights = [
+            flight for flight in flights
+            if all(flight.get(key) == value for key, value in where.items())
+        ]
+
+    start = 0
+    if after is not None:
+        position = (after.get("v") is None, after.get("v"), after["id"])
+        start = bisect.bisect_right(flights, position, key=_board_key)
+    # Copies, so callers cannot modify the cached rows
+    return [dict(flight) for flight in flights[start:start + limit]]
+
+
+async def get_cached_flight(flight_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a single flight by its number, from memory when possible
+
+    Args:
+        flight_number: Flight number
+
+    Returns:
+        Flight as dictionary or None
+    """
+    if not await _ensure_loaded():
+        return await select("flights", where={"flight_number": flight_number}, fetch_one=True)
+    flight = _flights_by_number.get(flight_number)
+    return dict(flight) if flight is not None else None
+
+
+def get_flight_cache_stats() -> Dict[str, Any]:
+    """
+    Get flight cache counters
+
+    Returns:
+        dict: Hit/miss/bypass counters and cache state
+    """
+    return {
+        **_stats,
+        "active": is_flight_cache_active(),
+        "loaded": _loaded,
+        "generation": _generation,
+        "size": len(_flights) if _loaded else 0
+    }
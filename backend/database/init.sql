@@ -4,6 +4,9 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Enable trigram matching for flight search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
     id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
@@ -38,7 +41,9 @@ CREATE TABLE IF NOT EXISTS flights (
     boarding_time TIMESTAMP WITH TIME ZONE,
     baggage_claim VARCHAR(50),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- Transaction that last wrote the row (flight changes feed cursor)
+    change_xid BIGINT NOT NULL DEFAULT 0
 );
 
 -- Messages/Chat history table
@@ -48,7 +53,7 @@ CREATE TABLE IF NOT EXISTS messages (
     session_id VARCHAR(100),
     sender VARCHAR(20) NOT NULL CHECK (sender IN ('user', 'bot')),
     message_text TEXT NOT NULL,
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
 
 -- Services table (shops, restaurants, lounges, etc.)
@@ -104,16 +109,59 @@ CREATE TABLE IF NOT EXISTS meet_greet (
     last_updated TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Ticket to flight mapping (filled in on ticket validation)
+CREATE TABLE IF NOT EXISTS ticket_flights (
+    ticket_number VARCHAR(50) PRIMARY KEY,
+    flight_id UUID NOT NULL REFERENCES flights(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Per-table data versions, bumped by every statement that changes the table
+-- (answers conditional GETs without re-running list queries). Flights are
+-- versioned by the workers' board cache instead, without a lock per write.
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (table_name) VALUES ('services'), ('spaces')
+ON CONFLICT (table_name) DO NOTHING;
+
+-- Revoked tokens (logout), kept until the token would have expired
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Login rate limit buckets shared by all workers (LOGIN_RATE_LIMIT_BACKEND=postgres)
+CREATE UNLOGGED TABLE IF NOT EXISTS login_rate_buckets (
+    bucket_key BYTEA PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-CREATE INDEX IF NOT EXISTS idx_users_ticket_number ON users(ticket_number);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_ticket_number_unique ON users(ticket_number);
 CREATE INDEX IF NOT EXISTS idx_flights_number ON flights(flight_number);
 CREATE INDEX IF NOT EXISTS idx_flights_status ON flights(status);
+CREATE INDEX IF NOT EXISTS idx_flights_origin_trgm ON flights USING GIN (origin gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_flights_number_trgm ON flights USING GIN (flight_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_flights_arrival_time ON flights(arrival_time) WHERE arrival_time IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_flights_departure_id ON flights(departure_time, id);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_flights_change_xid_id ON flights(change_xid, id);
+CREATE INDEX IF NOT EXISTS idx_flights_arrival_id ON flights(arrival_time, id) WHERE arrival_time IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages(user_id);
 CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id);
+CREATE INDEX IF NOT EXISTS idx_messages_session_timestamp_id ON messages(session_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_messages_user_timestamp_id ON messages(user_id, timestamp, id);
 CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
 CREATE INDEX IF NOT EXISTS idx_meet_greet_code ON meet_greet(tracking_code);
 CREATE INDEX IF NOT EXISTS idx_meet_greet_passenger ON meet_greet(passenger_id);
+CREATE INDEX IF NOT EXISTS idx_ticket_flights_flight_id ON ticket_flights(flight_id);
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -131,6 +179,77 @@ CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
 CREATE TRIGGER update_flights_updated_at BEFORE UPDATE ON flights
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Publish flight changes so API workers can invalidate their flight board cache.
+-- Bulk writers set aeroway.bulk_flight_write = 'on' for their transaction and
+-- publish a single RESYNC notification instead of one per row.
+CREATE OR REPLACE FUNCTION notify_flights_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_flight VARCHAR(20);
+BEGIN
+    IF current_setting('aeroway.bulk_flight_write', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        changed_flight := OLD.flight_number;
+    ELSIF TG_OP <> 'TRUNCATE' THEN
+        changed_flight := NEW.flight_number;
+    END IF;
+
+    PERFORM pg_notify(
+        'flights_changed',
+        json_build_object('op', TG_OP, 'flight_number', changed_flight)::text
+    );
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER flights_notify_changed AFTER INSERT OR UPDATE OR DELETE ON flights
+    FOR EACH ROW EXECUTE FUNCTION notify_flights_changed();
+
+CREATE TRIGGER flights_notify_truncated AFTER TRUNCATE ON flights
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_flights_changed();
+
+-- Stamp each written flight with its transaction ID (changes feed cursor)
+CREATE OR REPLACE FUNCTION stamp_flight_change_xid()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER flights_change_xid BEFORE INSERT OR UPDATE ON flights
+    FOR EACH ROW EXECUTE FUNCTION stamp_flight_change_xid();
+
+-- Bump data_versions in the same transaction as the change
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER services_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON services
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER spaces_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON spaces
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+-- Tell API workers about revoked tokens (in-memory revocation check)
+CREATE OR REPLACE FUNCTION notify_token_revoked()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('tokens_revoked', NEW.jti);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER revoked_tokens_notify AFTER INSERT ON revoked_tokens
+    FOR EACH ROW EXECUTE FUNCTION notify_token_revoked();
+
 -- Insert sample data for testing
 
 -- Sample flights
@@ -187,3 +306,7 @@ COMMENT ON TABLE services IS 'Airport services like shops and restaurants';
 COMMENT ON TABLE spaces IS 'Airport physical spaces and facilities';
 COMMENT ON TABLE notifications IS 'User notifications and alerts';
 COMMENT ON TABLE meet_greet IS 'Meet & Greet tracking system';
+COMMENT ON TABLE ticket_flights IS 'Ticket number to flight mapping, filled in on ticket validation';
+COMMENT ON TABLE data_versions IS 'Change counters for services and spaces (ETags)';
+COMMENT ON TABLE revoked_tokens IS 'JWT IDs revoked by logout, until their expiry';
+COMMENT ON TABLE login_rate_buckets IS 'Login attempt token buckets per client IP and per email';
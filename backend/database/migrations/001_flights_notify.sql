@@ -0,0 +1,31 @@
+-- AeroWay Migration 001: publish flight changes on the flights_changed channel
+-- Each API worker LISTENs on this channel to invalidate its in-process flight
+-- board cache (database/flight_cache.py), including for direct SQL writes.
+
+CREATE OR REPLACE FUNCTION notify_flights_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_flight VARCHAR(20);
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_flight := OLD.flight_number;
+    ELSIF TG_OP <> 'TRUNCATE' THEN
+        changed_flight := NEW.flight_number;
+    END IF;
+
+    PERFORM pg_notify(
+        'flights_changed',
+        json_build_object('op', TG_OP, 'flight_number', changed_flight)::text
+    );
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS flights_notify_changed ON flights;
+CREATE TRIGGER flights_notify_changed AFTER INSERT OR UPDATE OR DELETE ON flights
+    FOR EACH ROW EXECUTE FUNCTION notify_flights_changed();
+
+-- TRUNCATE has no row to report; publish a full invalidation
+DROP TRIGGER IF EXISTS flights_notify_truncated ON flights;
+CREATE TRIGGER flights_notify_truncated AFTER TRUNCATE ON flights
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_flights_changed();
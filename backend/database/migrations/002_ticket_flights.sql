@@ -0,0 +1,25 @@
+-- AeroWay Migration 002: exact ticket -> flight mapping
+-- Replaces the leading-wildcard `flight_number ILIKE '%ticket%'` scans with an
+-- indexed point read (see database/ticket_flights.py).
+
+CREATE TABLE IF NOT EXISTS ticket_flights (
+    ticket_number VARCHAR(50) PRIMARY KEY,
+    flight_id UUID NOT NULL REFERENCES flights(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_flights_flight_id ON ticket_flights(flight_id);
+
+-- Backfill tickets that were validated before this migration
+INSERT INTO ticket_flights (ticket_number, flight_id)
+SELECT DISTINCT ON (u.ticket_number) u.ticket_number, f.id
+FROM users u
+JOIN LATERAL (
+    SELECT id FROM flights
+    WHERE flight_number ILIKE '%' || u.ticket_number || '%'
+    LIMIT 1
+) f ON TRUE
+WHERE u.ticket_number IS NOT NULL
+ON CONFLICT (ticket_number) DO NOTHING;
+
+COMMENT ON TABLE ticket_flights IS 'Ticket number to flight mapping, filled in on ticket validation';
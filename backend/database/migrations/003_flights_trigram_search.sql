@@ -0,0 +1,15 @@
+-- AeroWay Migration 003: trigram indexes for arrivals search
+-- GIN trigram indexes serve both the substring search (`ILIKE '%x%'`) and the
+-- similarity search (`<%`) used by GET /api/flights/arrivals/search.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_flights_origin_trgm
+    ON flights USING GIN (origin gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_flights_number_trgm
+    ON flights USING GIN (flight_number gin_trgm_ops);
+
+-- Arrivals are always filtered on arrival_time IS NOT NULL and sorted by it
+CREATE INDEX IF NOT EXISTS idx_flights_arrival_time
+    ON flights(arrival_time) WHERE arrival_time IS NOT NULL;
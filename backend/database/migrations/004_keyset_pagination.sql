@@ -0,0 +1,15 @@
+-- AeroWay Migration 004: indexes for keyset (cursor) pagination
+-- Each list endpoint orders by its timestamp column plus id, so a page is an
+-- index range scan starting after the cursor.
+
+CREATE INDEX IF NOT EXISTS idx_flights_departure_id
+    ON flights(departure_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_flights_arrival_id
+    ON flights(arrival_time, id) WHERE arrival_time IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_messages_session_timestamp_id
+    ON messages(session_id, timestamp, id);
+
+CREATE INDEX IF NOT EXISTS idx_messages_user_timestamp_id
+    ON messages(user_id, timestamp, id);
@@ -0,0 +1,5 @@
+-- AeroWay Migration 005: index for the flight changes feed
+-- GET /api/flights/changes reads rows after an (updated_at, id) cursor.
+
+CREATE INDEX IF NOT EXISTS idx_flights_updated_at_id
+    ON flights(updated_at, id);
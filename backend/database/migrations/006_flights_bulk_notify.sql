@@ -0,0 +1,27 @@
+-- AeroWay Migration 006: let bulk flight writes skip per-row notifications
+-- Bulk ingest and batch updates set aeroway.bulk_flight_write = 'on' (SET
+-- LOCAL) and publish one {"op": "RESYNC"} notification when they commit, so
+-- a 50k-row schedule load does not send 50k notifications to every worker.
+
+CREATE OR REPLACE FUNCTION notify_flights_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_flight VARCHAR(20);
+BEGIN
+    IF current_setting('aeroway.bulk_flight_write', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        changed_flight := OLD.flight_number;
+    ELSIF TG_OP <> 'TRUNCATE' THEN
+        changed_flight := NEW.flight_number;
+    END IF;
+
+    PERFORM pg_notify(
+        'flights_changed',
+        json_build_object('op', TG_OP, 'flight_number', changed_flight)::text
+    );
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
@@ -0,0 +1,34 @@
+-- AeroWay Migration 007: per-table data versions for conditional GETs
+-- Every statement that changes flights, services or spaces bumps the table's
+-- version in the same transaction, so API workers can answer If-None-Match
+-- with one primary-key read instead of re-running the list query. The bump
+-- is transactional (a row update, not a sequence): a version is only visible
+-- together with the data it describes.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (table_name) VALUES ('flights'), ('services'), ('spaces')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS flights_data_version ON flights;
+CREATE TRIGGER flights_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON flights
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS services_data_version ON services;
+CREATE TRIGGER services_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON services
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS spaces_data_version ON spaces;
+CREATE TRIGGER spaces_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON spaces
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
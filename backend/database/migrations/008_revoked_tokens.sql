@@ -0,0 +1,26 @@
+-- AeroWay Migration 008: server-side token revocation
+-- Logout records the token's jti until the token would have expired anyway.
+-- API workers keep the revoked JTIs in memory and learn about new ones on the
+-- tokens_revoked channel (see database/token_revocations.py), so checking a
+-- token costs no query.
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+CREATE OR REPLACE FUNCTION notify_token_revoked()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('tokens_revoked', NEW.jti);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS revoked_tokens_notify ON revoked_tokens;
+CREATE TRIGGER revoked_tokens_notify AFTER INSERT ON revoked_tokens
+    FOR EACH ROW EXECUTE FUNCTION notify_token_revoked();
@@ -0,0 +1,11 @@
+-- AeroWay Migration 009: one account per ticket number
+-- Ticket validation used to check for another owner and then update, which
+-- two concurrent validations of the same ticket could both pass. The unique
+-- index makes the update itself fail instead (NULLs do not conflict).
+-- Resolve existing duplicates before applying:
+--   SELECT ticket_number FROM users GROUP BY ticket_number HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_ticket_number_unique ON users(ticket_number);
+
+-- Replaced by the unique index
+DROP INDEX IF EXISTS idx_users_ticket_number;
@@ -0,0 +1,12 @@
+-- AeroWay Migration 010: login rate limit buckets shared by all workers
+-- Only used with LOGIN_RATE_LIMIT_BACKEND=postgres (see rate_limit.py). Rows
+-- are throwaway counters, so the table is unlogged and is emptied after a
+-- crash.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS login_rate_buckets (
+    bucket_key BYTEA PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+COMMENT ON TABLE login_rate_buckets IS 'Login attempt token buckets per client IP and per email';
@@ -0,0 +1,11 @@
+-- AeroWay Migration 011: stop versioning flights in data_versions
+-- The per-statement bump updated one data_versions row, whose lock is held
+-- until commit, so every concurrent flight writer (ingest, batch updates,
+-- single updates) queued behind the others. The flights ETag is now a digest
+-- of the board each worker loads after a flights_changed notification (see
+-- database/flight_cache.py), which takes no lock. services and spaces, which
+-- change rarely, keep their counters.
+
+DROP TRIGGER IF EXISTS flights_data_version ON flights;
+
+DELETE FROM data_versions WHERE table_name = 'flights';
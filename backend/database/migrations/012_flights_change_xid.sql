@@ -0,0 +1,30 @@
+-- AeroWay Migration 012: commit-ordered cursor for the flight changes feed
+-- The feed used an (updated_at, id) cursor with a 2 second settle window, but
+-- updated_at is the writer's transaction start: a longer transaction (bulk
+-- ingest, batch update) could commit rows behind a cursor already handed
+-- out, and rows with a NULL updated_at were never returned.
+--
+-- Every write now stamps the row with its transaction ID. The feed only
+-- returns rows whose transaction ID is below the oldest transaction still
+-- running (pg_snapshot_xmin), all of which have committed, and no later
+-- commit can add rows below that bound. A long transaction delays the feed
+-- instead of being skipped.
+
+ALTER TABLE flights ADD COLUMN IF NOT EXISTS change_xid BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION stamp_flight_change_xid()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS flights_change_xid ON flights;
+CREATE TRIGGER flights_change_xid BEFORE INSERT OR UPDATE ON flights
+    FOR EACH ROW EXECUTE FUNCTION stamp_flight_change_xid();
+
+CREATE INDEX IF NOT EXISTS idx_flights_change_xid_id ON flights(change_xid, id);
+
+-- Replaced by idx_flights_change_xid_id
+DROP INDEX IF EXISTS idx_flights_updated_at_id;
@@ -0,0 +1,10 @@
+-- AeroWay Migration 013: chat messages always have a timestamp
+-- Chat history pages are ordered by (timestamp, id). A nullable timestamp
+-- needs a separate read of the NULL tail per page; NOT NULL keeps each page
+-- a single range scan of idx_messages_session_timestamp_id or
+-- idx_messages_user_timestamp_id (backward for newest first).
+
+-- Rows written without one sort as the oldest messages
+UPDATE messages SET timestamp = to_timestamp(0) WHERE timestamp IS NULL;
+
+ALTER TABLE messages ALTER COLUMN timestamp SET NOT NULL;
@@ -0,0 +1,299 @@
+"""
+Keyset (cursor) pagination helpers
+
+Pages are ordered by an optional timestamp column plus `id` as a tie-breaker,
+and the next page starts strictly after the last row of the previous one. The
+position is carried in an opaque cursor, so a deep page costs the same as the
+first one (no OFFSET scan).
+
+NULL sort values are always ordered last, in both directions. They are read
+as a separate range (`column IS NULL`, by id) once the non-NULL values run
+out, so both parts are plain index ranges on (column, id), scanned forward
+or backward. Pass nullable=False for NOT NULL columns to skip the NULL part.
+"""
+import json
+import base64
+from datetime import datetime
+from uuid import UUID
+from typing import Optional, List, Dict, Any, Tuple, Union, Sequence
+
+from .db_client import _compile, _columns_sql, execute_query
+
+
+def encode_cursor(row: Dict[str, Any], order_column: Optional[str] = None) -> str:
+    """
+    Build the cursor pointing just after a row
+
+    Args:
+        row: Last row of the current page
+        order_column: Timestamp column the page is ordered by, if any
+
+    Returns:
+        str: Opaque URL-safe cursor
+    """
+    payload = {"id": str(row["id"])}
+    if order_column:
+        value = row[order_column]
+        payload["v"] = value.isoformat() if value is not None else None
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Opaque cursor
+
+    Returns:
+        dict: {"id": UUID} plus {"v": datetime or None} for ordered pages
+
+    Raises:
+        ValueError: If the cursor is malformed or its timestamp is naive
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        after = {"id": UUID(payload["id"])}
+        if "v" in payload:
+            value = datetime.fromisoformat(payload["v"]) if payload["v"] is not None else None
+            # Order columns are timestamptz: a naive value cannot be compared
+            if value is not None and value.utcoffset() is None:
+                raise ValueError("Invalid cursor: timestamp has no time zone")
+            after["v"] = value
+        return after
+    except (TypeError, KeyError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+
+def encode_change_cursor(row: Dict[str, Any]) -> str:
+    """
+    Build the changes feed cursor pointing just after a row
+
+    Args:
+        row: Last row returned, with its change_xid
+
+    Returns:
+        str: Opaque URL-safe cursor
+    """
+    payload = {"x": row["change_xid"], "id": str(row["id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_change_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_change_cursor
+
+    Args:
+        cursor: Opaque cursor
+
+    Returns:
+        dict: {"x": transaction ID, "id": UUID}
+
+    Raises:
+        ValueError: If the cursor is malformed (including page cursors)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        xid = payload["x"]
+        if not isinstance(xid, int) or isinstance(xid, bool):
+            raise TypeError("x must be an integer")
+        return {"x": xid, "id": UUID(payload["id"])}
+    except (TypeError, KeyError, AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+
+def order_clause(order_column: Optional[str] = None, descending: bool = False) -> str:
+    """
+    Render the ORDER BY list matching keyset_clause
+
+    No NULLS placement is given, so the order is the one an index on
+    (order_column, id) yields in either direction; rows with a NULL
+    order_column must be filtered out (or read separately, as select_keyset
+    does).
+    """
+    direction = "DESC" if descending else "ASC"
+    if order_column is None:
+        return f"id {direction}"
+    return f"{order_column} {direction}, id {direction}"
+
+
+def keyset_clause(
+    after: Dict[str, Any],
+    order_column: Optional[str] = None,
+    descending: bool = False,
+    first_param: int = 1
+) -> Tuple[str, List[Any]]:
+    """
+    Build the WHERE condition selecting rows after a cursor position
+
+    The condition is an index range on (order_column, id). It never matches
+    a NULL order_column, except for a cursor already inside the NULL tail.
+
+    Args:
+        after: Decoded cursor
+        order_column: Timestamp column the page is ordered by, if any
+        descending: Whether the page is ordered newest first
+        first_param: Number of the first $n placeholder to use
+
+    Returns:
+        tuple: (SQL condition, parameters)
+    """
+    op = "<" if descending else ">"
+    if order_column is None:
+        return f"id {op} ${first_param}", [after["id"]]
+
+    if after.get("v") is None:
+        # Already inside the NULL tail, which is ordered by id only
+        return f"({order_column} IS NULL AND id {op} ${first_param})", [after["id"]]
+
+    return f"({order_column}, id) {op} (${first_param}, ${first_param + 1})", [after["v"], after["id"]]
+
+
+def split_page(
+    rows: List[Dict[str, Any]],
+    limit: int,
+    order_column: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Split limit + 1 fetched rows into a page and the cursor of the next page
+
+    Args:
+        rows: Rows fetched with a LIMIT of limit + 1
+        limit: Page size
+        order_column: Timestamp column the page is ordered by, if any
+
+    Returns:
+        tuple: (page rows, next cursor or None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1], order_column)
+
+
+async def _select_range(
+    table: str,
+    where: Optional[Dict[str, Any]],
+    order_column: Optional[str],
+    descending: bool,
+    limit: int,
+    after: Optional[Dict[str, Any]],
+    columns: Union[str, Sequence[str]],
+    part: str
+) -> List[Any]:
+    """
+    Select one index range of a keyset page
+
+    part is "all" (no NULLs to care about), "values" (order_column IS NOT
+    NULL) or "nulls" (the NULL tail, ordered by id).
+    """
+    where_keys = tuple(where) if where else ()
+    values = list(where.values()) if where else []
+
+    # Cursor shape: none, inside the NULL tail, or at a value
+    after_shape = None if after is None else ("null" if order_column and after.get("v") is None else "value")
+    condition, cursor_values = (None, [])
+    if after is not None:
+        condition, cursor_values = keyset_clause(
+            after, None if part == "nulls" else order_column, descending, len(where_keys) + 1
+        )
+    values.extend(cursor_values)
+    values.append(limit)
+
+    def build() -> str:
+        conditions = [f"{key} = ${i}" for i, key in enumerate(where_keys, 1)]
+        if part == "values":
+            conditions.append(f"{order_column} IS NOT NULL")
+        elif part == "nulls":
+            conditions.append(f"{order_column} IS NULL")
+        if condition:
+            conditions.append(condition)
+        query = f"SELECT {_columns_sql(columns)} FROM {table}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        order_by = order_clause(None if part == "nulls" else order_column, descending)
+        return f"{query} ORDER BY {order_by} LIMIT ${len(values)}"
+
+    column_key = columns if isinstance(columns, str) else tuple(columns)
+    query = _compile(
+        ("keyset", table, column_key, where_keys, order_column, descending, after_shape, part),
+        build
+    )
+
+    return await execute_query(query, *values, fetch_all=True, prepared=True, replica=True)
+
+
+async def select_keyset(
+    table: str,
+    where: Optional[Dict[str, Any]] = None,
+    order_column: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 50,
+    after: Optional[Dict[str, Any]] = None,
+    columns: Union[str, Sequence[str]] = "*",
+    records: bool = False,
+    nullable: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Select rows in keyset order, starting after a cursor position
+
+    Args:
+        table: Table name
+        where: Dictionary of column:value pairs for WHERE clause
+        order_column: Timestamp column to order by (id is always the tie-breaker)
+        descending: Order newest first
+        limit: LIMIT value
+        after: Decoded cursor, or None for the first page
+        columns: Columns to select (default: *)
+        records: Return the asyncpg Records as-is instead of dictionaries
+            (for rows that go straight to a row encoder)
+        nullable: Whether order_column can be NULL (False for NOT NULL
+            columns, so a page is always a single query)
+
+    Returns:
+        List of rows as dictionaries (or Records)
+    """
+    if order_column is None or not nullable:
+        rows = list(await _select_range(table, where, order_column, descending, limit, after, columns, "all"))
+    else:
+        rows = []
+        in_tail = after is not None and after.get("v") is None
+        if not in_tail:
+            rows = list(await _select_range(table, where, order_column, descending, limit, after, columns, "values"))
+        if len(rows) < limit:
+            # The values ran out: continue into the NULL tail
+            tail_after = after if in_tail else None
+            rows.extend(await _select_range(
+                table, where, order_column, descending, limit - len(rows), tail_after, columns, "nulls"
+            ))
+    if records:
+        return rows
+    return [dict(row) for row in rows]
+
+
+async def select_page(
+    table: str,
+    where: Optional[Dict[str, Any]] = None,
+    order_column: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 50,
+    after: Optional[Dict[str, Any]] = None,
+    columns: Union[str, Sequence[str]] = "*",
+    records: bool = False,
+    nullable: bool = True
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Select one page of rows in keyset order
+
+    Args:
+        Same as select_keyset; limit is the page size
+
+    Returns:
+        tuple: (page rows, next cursor or None on the last page)
+    """
+    rows = await select_keyset(table, where, order_column, descending, limit + 1, after, columns, records, nullable)
+    return split_page(rows, limit, order_column)
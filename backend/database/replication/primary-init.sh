@@ -0,0 +1,11 @@
+#!/bin/sh
+# Runs once when the primary's data directory is initialized
+# (docker-compose.replicas.yml): allow the replica to stream WAL.
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+    CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD '${REPLICATION_PASSWORD:-replicator}';
+    SELECT pg_create_physical_replication_slot('replica1');
+EOSQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,16 @@
+#!/bin/sh
+# Streaming replica (docker-compose.replicas.yml): clone the primary on first
+# start, then run as a hot standby.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    echo "Cloning primary into $PGDATA"
+    until pg_isready -h postgres -U postgres; do
+        sleep 1
+    done
+    PGPASSWORD="${REPLICATION_PASSWORD:-replicator}" pg_basebackup \
+        -h postgres -U replicator -D "$PGDATA" -S replica1 -X stream -R
+    chmod 0700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on
@@ -0,0 +1,112 @@
+"""
+Ticket to flight resolution
+
+Tickets used to be matched with `flight_number ILIKE '%ticket%'`, which no
+index can serve. The match is now made once, when the ticket is validated,
+and stored in `ticket_flights` so later lookups are primary-key reads.
+
+A ticket whose flight is not scheduled yet would pay the ILIKE scan on every
+lookup, so misses are remembered per worker for TICKET_MISS_TTL_SECONDS, and
+forgotten as soon as a flight is added.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+
+from .db_client import execute_query, insert_on_conflict, add_warm_statement
+from .flight_cache import add_flight_change_listener
+
+# Load environment variables
+load_dotenv()
+
+TICKET_MISS_TTL_SECONDS = float(os.getenv("TICKET_MISS_TTL_SECONDS", "60"))
+TICKET_MISS_CACHE_SIZE = 10000
+
+_RESOLVE_QUERY = """
+    SELECT f.* FROM ticket_flights t
+    JOIN flights f ON f.id = t.flight_id
+    WHERE t.ticket_number = $1
+"""
+
+_MATCH_QUERY = "SELECT * FROM flights WHERE flight_number ILIKE $1 LIMIT 1"
+
+# Every "my flight" and Meet & Greet request resolves a ticket
+add_warm_statement(_RESOLVE_QUERY)
+
+# ticket number -> monotonic time the miss is forgotten
+_misses: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _is_known_miss(ticket_number: str) -> bool:
+    expires_at = _misses.get(ticket_number)
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        del _misses[ticket_number]
+        return False
+    return True
+
+
+def _remember_miss(ticket_number: str):
+    _misses[ticket_number] = time.monotonic() + TICKET_MISS_TTL_SECONDS
+    _misses.move_to_end(ticket_number)
+    while len(_misses) > TICKET_MISS_CACHE_SIZE:
+        _misses.popitem(last=False)
+
+
+def _on_flights_changed(op: str, flight_number: Optional[str]):
+    # A new flight (or a bulk load) may be the one a missed ticket waits for
+    if op in ("INSERT", "RESYNC", "TRUNCATE"):
+        _misses.clear()
+
+
+add_flight_change_listener(_on_flights_changed)
+
+
+async def link_ticket_flight(ticket_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Match a ticket to its flight and store the mapping
+
+    Args:
+        ticket_number: Ticket number
+
+    Returns:
+        Matched flight as dictionary, or None if no flight matches yet
+    """
+    flight = await execute_query(_MATCH_QUERY, f"%{ticket_number}%", fetch_one=True, prepared=True)
+    if not flight:
+        _remember_miss(ticket_number)
+        return None
+    _misses.pop(ticket_number, None)
+
+    await insert_on_conflict(
+        "ticket_flights",
+        data={"ticket_number": ticket_number, "flight_id": flight["id"]},
+        conflict="ticket_number",
+        update_columns=["flight_id"],
+        returning="ticket_number"
+    )
+    return dict(flight)
+
+
+async def resolve_ticket_flight(ticket_number: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the flight for a ticket number
+
+    Uses the stored mapping; tickets validated before their flight was
+    scheduled are matched (and linked) on first lookup.
+
+    Args:
+        ticket_number: Ticket number
+
+    Returns:
+        Flight as dictionary or None
+    """
+    flight = await execute_query(_RESOLVE_QUERY, ticket_number, fetch_one=True, prepared=True)
+    if flight:
+        return dict(flight)
+    if TICKET_MISS_TTL_SECONDS > 0 and _is_known_miss(ticket_number):
+        return None
+    return await link_ticket_flight(ticket_number)
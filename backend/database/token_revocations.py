@@ -0,0 +1,189 @@
+"""
+In-memory snapshot of revoked tokens
+
+Logout stores the token's JWT ID in `revoked_tokens` until the token would
+have expired (see migrations/008_revoked_tokens.sql). Each worker keeps the
+unexpired JTIs in a set, so decode_token checks revocation with one lookup and
+no query. An insert trigger publishes new JTIs on the `tokens_revoked`
+channel; the worker's shared LISTEN connection adds them to the set as soon as
+they are committed, and the snapshot is reloaded periodically (and after the
+listener reconnects) in case a notification was missed. Expired rows are
+deleted every TOKEN_REVOCATION_PRUNE_SECONDS or so; the interval is jittered
+so the workers do not all run the DELETE at once.
+"""
+import os
+import random
+import asyncio
+import asyncpg
+from datetime import datetime
+from typing import Optional, Set
+from dotenv import load_dotenv
+
+from .db_client import add_channel_listener, remove_channel_listener, execute_query, execute_raw
+
+# Load environment variables
+load_dotenv()
+
+TOKENS_CHANNEL = "tokens_revoked"
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "60"))
+TOKEN_REVOCATION_PRUNE_SECONDS = float(os.getenv("TOKEN_REVOCATION_PRUNE_SECONDS", "3600"))
+
+_REVOKE_QUERY = """
+    INSERT INTO revoked_tokens (jti, user_id, expires_at)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (jti) DO NOTHING
+"""
+_SNAPSHOT_QUERY = "SELECT jti FROM revoked_tokens WHERE expires_at > NOW()"
+_PRUNE_QUERY = "DELETE FROM revoked_tokens WHERE expires_at <= NOW()"
+
+_revoked: Set[str] = set()
+_listening = False
+_refresh_task: Optional[asyncio.Task] = None
+_prune_task: Optional[asyncio.Task] = None
+# Cleared when the migration has not been applied
+_available = True
+_stats = {"revoked": 0, "notifications": 0, "refreshes": 0, "pruned": 0}
+
+
+def is_token_revoked(jti: Optional[str]) -> bool:
+    """
+    Check a JWT ID against the revocation snapshot (no query)
+
+    Args:
+        jti: JWT ID claim, or None for tokens issued without one
+
+    Returns:
+        bool: True if the token was revoked
+    """
+    return jti is not None and jti in _revoked
+
+
+def _disable():
+    global _available
+    print("revoked_tokens table missing (migration 008), token revocation disabled")
+    _available = False
+
+
+async def revoke_token(jti: str, user_id: Optional[str], expires_at: datetime) -> bool:
+    """
+    Revoke a token on every worker
+
+    Args:
+        jti: JWT ID claim of the token
+        user_id: Owner of the token
+        expires_at: Token expiry; the revocation is forgotten after it
+
+    Returns:
+        bool: True if the token was revoked, False if revocation is
+        unavailable (migration 008 not applied)
+    """
+    if not _available:
+        return False
+    try:
+        await execute_query(_REVOKE_QUERY, jti, user_id, expires_at)
+    except asyncpg.UndefinedTableError:
+        _disable()
+        return False
+    # Effective here at once; other workers follow on NOTIFY
+    _revoked.add(jti)
+    _stats["revoked"] += 1
+    return True
+
+
+async def _load_snapshot():
+    """Replace the in-memory set with the unexpired revocations"""
+    global _revoked
+    if not _available:
+        return
+    before = set(_revoked)
+    try:
+        rows = await execute_raw(_SNAPSHOT_QUERY, primary=True)
+    except asyncpg.UndefinedTableError:
+        _disable()
+        return
+    # Keep revocations that arrived while the snapshot was loading
+    _revoked = {row["jti"] for row in rows} | (_revoked - before)
+    _stats["refreshes"] += 1
+
+
+async def _refresh_periodically():
+    """Reload the snapshot in case a notification was missed"""
+    while True:
+        await asyncio.sleep(TOKEN_REVOCATION_REFRESH_SECONDS)
+        try:
+            await _load_snapshot()
+        except Exception as e:
+            print(f"Revoked token refresh failed: {e}")
+
+
+async def _prune_periodically():
+    """Delete expired revocations; the snapshot query already skips them"""
+    while _available:
+        await asyncio.sleep(TOKEN_REVOCATION_PRUNE_SECONDS * random.uniform(0.5, 1.5))
+        try:
+            await execute_query(_PRUNE_QUERY)
+            _stats["pruned"] += 1
+        except asyncpg.UndefinedTableError:
+            _disable()
+        except Exception as e:
+            print(f"Revoked token pruning failed: {e}")
+
+
+def _on_token_revoked(connection, pid, channel, payload):
+    """LISTEN callback fired for every committed revocation"""
+    _revoked.add(payload)
+    _stats["notifications"] += 1
+
+
+async def _on_listener_connected():
+    global _listening
+    _listening = True
+    # Revocations committed before LISTEN took effect are in the snapshot
+    await _load_snapshot()
+
+
+def _on_listener_disconnected():
+    global _listening
+    _listening = False
+
+
+async def start_token_revocations():
+    """Load revoked tokens and listen for new ones (called on application startup)"""
+    global _refresh_task, _prune_task
+    await add_channel_listener(
+        TOKENS_CHANNEL,
+        _on_token_revoked,
+        on_connect=_on_listener_connected,
+        on_disconnect=_on_listener_disconnected
+    )
+    if not _listening:
+        print(f"Token revocation listener unavailable, refreshing every {TOKEN_REVOCATION_REFRESH_SECONDS:g}s")
+    _refresh_task = asyncio.create_task(_refresh_periodically())
+    _prune_task = asyncio.create_task(_prune_periodically())
+
+
+async def stop_token_revocations():
+    """Stop listening for revocations (called on application shutdown)"""
+    global _refresh_task, _prune_task, _listening
+    for task in (_refresh_task, _prune_task):
+        if task is not None:
+            task.cancel()
+    _refresh_task = _prune_task = None
+    await remove_channel_listener(TOKENS_CHANNEL)
+    _listening = False
+
+
+def get_token_revocation_stats() -> dict:
+    """
+    Get token revocation counters
+
+    Returns:
+        dict: Revocations made by this worker, notifications received,
+        snapshot reloads, prune runs, and the number of revoked tokens held
+    """
+    return {
+        **_stats,
+        "size": len(_revoked),
+        "listening": _listening,
+        "available": _available
+    }
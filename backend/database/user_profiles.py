@@ -0,0 +1,187 @@
+"""
+Per-worker cache of user profiles
+
+/api/auth/me, "my flight" and Meet & Greet look up the current user on every
+request, although profiles rarely change. Profiles are cached per worker by
+user id, without `password_hash` (it is never selected), and callers take
+the columns they need:
+
+    user = await get_user_profile(user_id, ["prenom", "nom", "ticket_number"])
+
+Every path that updates a user must call invalidate_user_profile() after its
+write. That drops the entry here and publishes the id on the
+`user_profiles_changed` channel, so the other workers drop it too. If the
+LISTEN connection is down, those notifications could be missed, so reads go
+to the database until it reconnects. Entries also expire after
+USER_PROFILE_CACHE_TTL_SECONDS.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Sequence, Tuple
+from dotenv import load_dotenv
+
+from .db_client import add_channel_listener, remove_channel_listener, execute_query, select
+
+# Load environment variables
+load_dotenv()
+
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+USER_PROFILE_CACHE_TTL_SECONDS = float(os.getenv("USER_PROFILE_CACHE_TTL_SECONDS", "300"))
+PROFILES_CHANNEL = "user_profiles_changed"
+
+# Every users column except password_hash
+PROFILE_COLUMNS = (
+    "id",
+    "email",
+    "nom",
+    "prenom",
+    "telephone",
+    "num_identite",
+    "date_naissance",
+    "lieu_naissance",
+    "ville",
+    "pays",
+    "role",
+    "ticket_number",
+    "created_at",
+    "updated_at"
+)
+
+_NOTIFY_QUERY = "SELECT pg_notify($1, $2)"
+
+# user id -> (expiry as time.monotonic() seconds, profile)
+_profiles: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# Bumped on every invalidation, so a load racing with one is not cached
+_generation = 0
+
+# Whether invalidations from other workers are being received
+_listening = False
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0, "evictions": 0}
+
+
+def _project(profile: Dict[str, Any], columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Copy the requested columns so callers cannot modify the cached row"""
+    if columns is None:
+        return dict(profile)
+    return {column: profile[column] for column in columns}
+
+
+async def get_user_profile(user_id: str, columns: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get a user's profile, from the cache when possible
+
+    Args:
+        user_id: User ID
+        columns: Columns to return (default: every column in PROFILE_COLUMNS)
+
+    Returns:
+        Profile as dictionary, or None if the user does not exist
+
+    Raises:
+        ValueError: If a column is not a profile column
+    """
+    wanted = PROFILE_COLUMNS if columns is None else tuple(columns)
+    unknown = set(wanted) - set(PROFILE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Not a profile column: {', '.join(sorted(unknown))}")
+
+    if USER_PROFILE_CACHE_SIZE <= 0 or not _listening:
+        # Without the listener another worker's update could go unnoticed
+        _stats["bypassed"] += 1
+        return await select("users", columns=wanted, where={"id": user_id}, fetch_one=True, primary=True)
+
+    entry = _profiles.get(user_id)
+    if entry is not None:
+        expires_at, profile = entry
+        if expires_at > time.monotonic():
+            _profiles.move_to_end(user_id)
+            _stats["hits"] += 1
+            return _project(profile, columns)
+        del _profiles[user_id]
+
+    _stats["misses"] += 1
+    generation = _generation
+    # The primary, so a profile updated a moment ago is not cached stale
+    profile = await select("users", columns=PROFILE_COLUMNS, where={"id": user_id}, fetch_one=True, primary=True)
+    if profile is None:
+        return None
+    if generation == _generation:
+        _profiles[user_id] = (time.monotonic() + USER_PROFILE_CACHE_TTL_SECONDS, profile)
+        _profiles.move_to_end(user_id)
+        while len(_profiles) > USER_PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+            _stats["evictions"] += 1
+    return _project(profile, columns)
+
+
+def _drop_profile(user_id: str):
+    global _generation
+    _generation += 1
+    _profiles.pop(user_id, None)
+    _stats["invalidations"] += 1
+
+
+async def invalidate_user_profile(user_id: str):
+    """
+    Drop a user's cached profile on every worker (call after updating the user)
+
+    Args:
+        user_id: User ID
+    """
+    _drop_profile(str(user_id))
+    await execute_query(_NOTIFY_QUERY, PROFILES_CHANNEL, str(user_id))
+
+
+def _on_profile_changed(connection, pid, channel, payload):
+    """LISTEN callback fired for every invalidation, this worker's included"""
+    _drop_profile(payload)
+
+
+async def _on_listener_connected():
+    global _listening
+    # Invalidations may have been missed while disconnected
+    _profiles.clear()
+    _listening = True
+
+
+def _on_listener_disconnected():
+    """Stop serving cached profiles until the listener reconnects"""
+    global _listening
+    _listening = False
+
+
+async def start_user_profiles():
+    """Start listening for profile invalidations (called on application startup)"""
+    if USER_PROFILE_CACHE_SIZE <= 0:
+        return
+    await add_channel_listener(
+        PROFILES_CHANNEL,
+        _on_profile_changed,
+        on_connect=_on_listener_connected,
+        on_disconnect=_on_listener_disconnected
+    )
+
+
+async def stop_user_profiles():
+    """Stop listening for profile invalidations (called on application shutdown)"""
+    global _listening
+    await remove_channel_listener(PROFILES_CHANNEL)
+    _listening = False
+    _profiles.clear()
+
+
+def get_user_profile_stats() -> dict:
+    """
+    Get user profile cache counters
+
+    Returns:
+        dict: Hits, misses, reads that bypassed the cache, invalidations,
+        evictions and current size
+    """
+    return {
+        **_stats,
+        "size": len(_profiles),
+        "max_size": USER_PROFILE_CACHE_SIZE,
+        "listening": _listening
+    }
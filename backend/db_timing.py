@@ -0,0 +1,54 @@
+"""
+Per-request database timing headers
+
+DBTimingMiddleware starts query accounting (see database/db_client.py) for
+every HTTP request and reports it on the response:
+
+    X-DB-Time: 4.21
+    X-DB-Queries: 5
+    Server-Timing: db;dur=4.21;desc="5 queries", db-wait;dur=0.03
+
+Browsers show Server-Timing in the network panel, so an endpoint issuing one
+query per item (N+1) stands out by its query count. Work done after the
+response has started (streamed bodies) is not included.
+"""
+import os
+from dotenv import load_dotenv
+
+from database import begin_query_usage, end_query_usage
+
+# Load environment variables
+load_dotenv()
+
+DB_TIMING_HEADERS = os.getenv("DB_TIMING_HEADERS", "False") == "True"
+
+
+class DBTimingMiddleware:
+    """ASGI middleware adding database time and query count headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_TIMING_HEADERS:
+            await self.app(scope, receive, send)
+            return
+
+        usage, token = begin_query_usage()
+
+        async def timing_send(message):
+            if message["type"] == "http.response.start":
+                db_ms = f"{usage.seconds * 1000:.2f}"
+                wait_ms = f"{usage.wait_seconds * 1000:.2f}"
+                server_timing = f'db;dur={db_ms};desc="{usage.queries} queries", db-wait;dur={wait_ms}'
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-db-time", db_ms.encode()),
+                    (b"x-db-queries", str(usage.queries).encode()),
+                    (b"server-timing", server_timing.encode())
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timing_send)
+        finally:
+            end_query_usage(token)
@@ -0,0 +1,170 @@
+"""
+Database deadlines and client disconnects
+
+Routes bound their database work with a dependency:
+
+    @router.get("/reports", dependencies=[Depends(db_deadline(10))])
+
+Kiosk-facing reads (flight board, search, services, spaces) use
+kiosk_deadline, bounded by KIOSK_DB_DEADLINE_SECONDS.
+
+Pool acquires and queries then only get the time left (see the query
+deadlines in database/db_client.py), and a route that runs out answers
+504 Gateway Timeout instead of holding a connection for DB_COMMAND_TIMEOUT.
+
+DisconnectMiddleware runs each request in a task of its own and cancels it
+when the client goes away before the response has started; asyncpg cancels
+the in-flight query on the server and the connection returns to the pool.
+It only listens for the disconnect once the app has read the request body,
+so uploads still stream through the server's flow control.
+"""
+import os
+import asyncio
+from typing import Optional
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+from database import QueryDeadlineExceeded, set_query_deadline, reset_query_deadline
+
+# Load environment variables
+load_dotenv()
+
+# Kiosks give up after 5 seconds; leave time to render an error
+KIOSK_DB_DEADLINE_SECONDS = float(os.getenv("KIOSK_DB_DEADLINE_SECONDS", "4"))
+# Deadline for requests whose route sets none (0: DB_COMMAND_TIMEOUT only)
+DB_REQUEST_DEADLINE_SECONDS = float(os.getenv("DB_REQUEST_DEADLINE_SECONDS", "0"))
+DB_CANCEL_ON_DISCONNECT = os.getenv("DB_CANCEL_ON_DISCONNECT", "True") == "True"
+
+_stats = {"deadline_exceeded": 0, "cancelled_on_disconnect": 0}
+
+
+def db_deadline(seconds: float):
+    """
+    Build a route dependency bounding the request's database work
+
+    Args:
+        seconds: Time allowed for all of the route's queries, pool waits included
+
+    Returns:
+        Dependency for `dependencies=[Depends(...)]`
+    """
+    async def apply_deadline():
+        token = set_query_deadline(seconds)
+        try:
+            yield
+        except HTTPException as e:
+            # Handlers wrap failures in a 500; report the deadline instead
+            if isinstance(e.__context__, QueryDeadlineExceeded):
+                _stats["deadline_exceeded"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail="Database deadline exceeded"
+                ) from e
+            raise
+        finally:
+            reset_query_deadline(token)
+
+    return apply_deadline
+
+
+kiosk_deadline = db_deadline(KIOSK_DB_DEADLINE_SECONDS)
+
+
+def _has_body(scope) -> bool:
+    """Whether the request announces a body (Content-Length or chunked)"""
+    for name, value in scope.get("headers", ()):
+        if name == b"content-length":
+            return value.strip() != b"0"
+        if name == b"transfer-encoding":
+            return True
+    return False
+
+
+class DisconnectMiddleware:
+    """ASGI middleware cancelling requests whose client disconnected"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_CANCEL_ON_DISCONNECT:
+            await self.app(scope, receive, send)
+            return
+
+        token = set_query_deadline(DB_REQUEST_DEADLINE_SECONDS or None)
+        # Filled by the watcher only once the request body has been read, so
+        # it holds the final request message and the disconnect at most
+        messages: "asyncio.Queue[dict]" = asyncio.Queue()
+        disconnected = False
+        response_started = False
+        watcher: Optional[asyncio.Task] = None
+
+        async def app_receive():
+            nonlocal disconnected
+            if watcher is not None:
+                if disconnected and messages.empty():
+                    return {"type": "http.disconnect"}
+                return await messages.get()
+            # Body chunks go straight to the app, keeping the server's flow
+            # control (uploads are spooled, not buffered here)
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected = True
+            elif not message.get("more_body", False):
+                start_watching()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def watch():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    # Once the response has started the app handles it
+                    # (streaming responses watch for it themselves)
+                    if not response_started and not handler.done():
+                        _stats["cancelled_on_disconnect"] += 1
+                        handler.cancel()
+                    return
+
+        def start_watching():
+            nonlocal watcher
+            if watcher is None:
+                watcher = asyncio.create_task(watch())
+
+        # The request runs in its own task (with a copy of this context) so it
+        # can be cancelled without cancelling the server's task
+        handler = asyncio.create_task(self.app(scope, app_receive, tracking_send))
+        if not _has_body(scope):
+            # Nothing to read but the empty request message: watch right away
+            start_watching()
+        try:
+            await asyncio.wait([handler])
+        except asyncio.CancelledError:
+            handler.cancel()
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            reset_query_deadline(token)
+        if not handler.cancelled():
+            # Re-raise anything the app raised
+            handler.result()
+
+
+def get_deadline_stats() -> dict:
+    """
+    Get deadline counters
+
+    Returns:
+        dict: Routes answered 504 after their deadline, and requests
+        cancelled because the client disconnected
+    """
+    return dict(_stats)
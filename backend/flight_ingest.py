@@ -0,0 +1,181 @@
+"""
+Bulk flight schedule ingest
+
+Validates CSV or NDJSON rows against FlightCreate, streams the valid ones
+into a temporary staging table with COPY, and upserts them into `flights` in
+a single statement. The whole load is one transaction and publishes a single
+RESYNC notification instead of one per row.
+
+Usage (from backend/):
+    python -m flight_ingest schedule.csv
+    python -m flight_ingest schedule.ndjson --format ndjson
+"""
+import csv
+import json
+import asyncio
+import argparse
+from typing import Iterable, Iterator, List, Tuple, Optional
+from pydantic import ValidationError
+
+from models import FlightCreate, FlightIngestError, FlightIngestResult
+from database import init_db, close_db, transaction, invalidate_flights_cache
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+FLIGHT_COLUMNS = list(FlightCreate.model_fields)
+STAGING_COLUMNS = ["line"] + FLIGHT_COLUMNS
+
+STAGING_SQL = f"""
+    CREATE TEMP TABLE flight_staging ON COMMIT DROP AS
+        SELECT 0 AS line, {', '.join(FLIGHT_COLUMNS)} FROM flights WITH NO DATA
+"""
+
+# Last row wins when a flight number appears more than once in the upload
+UPSERT_SQL = f"""
+    INSERT INTO flights ({', '.join(FLIGHT_COLUMNS)}, created_at, updated_at)
+    SELECT DISTINCT ON (flight_number) {', '.join(FLIGHT_COLUMNS)}, NOW(), NOW()
+    FROM flight_staging
+    ORDER BY flight_number, line DESC
+    ON CONFLICT (flight_number) DO UPDATE SET
+        {', '.join(f"{column} = EXCLUDED.{column}" for column in FLIGHT_COLUMNS if column != "flight_number")},
+        updated_at = NOW()
+    RETURNING (xmax = 0) AS inserted
+"""
+
+# Bulk writes (this ingest, batch updates) switch off the per-row trigger
+# notifications for their transaction and publish one RESYNC at the end
+BULK_WRITE_SQL = "SET LOCAL aeroway.bulk_flight_write = 'on'"
+RESYNC_SQL = "SELECT pg_notify('flights_changed', $1)"
+RESYNC_PAYLOAD = json.dumps({"op": "RESYNC", "flight_number": None})
+
+ParsedRow = Tuple[int, Optional[FlightCreate], List[str]]
+
+
+def _validate(line: int, data) -> ParsedRow:
+    if not isinstance(data, dict):
+        return line, None, ["row must be an object"]
+    try:
+        return line, FlightCreate(**data), []
+    except ValidationError as e:
+        return line, None, [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in e.errors()
+        ]
+
+
+def parse_flight_rows(lines: Iterable[str], fmt: str = "csv") -> Iterator[ParsedRow]:
+    """
+    Parse and validate uploaded flight rows
+
+    Args:
+        lines: Text lines of the upload (CSV with a header row, or NDJSON)
+        fmt: "csv" or "ndjson"
+
+    Yields:
+        tuple: (line number, FlightCreate or None, validation errors)
+    """
+    if fmt == "ndjson":
+        for line, text in enumerate(lines, 1):
+            if not text.strip():
+                continue
+            try:
+                data = json.loads(text)
+            except ValueError as e:
+                yield line, None, [f"invalid JSON: {e}"]
+                continue
+            yield _validate(line, data)
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Empty CSV cells mean "not set"
+        data = {key: (value if value != "" else None) for key, value in row.items() if key}
+        yield _validate(reader.line_num, data)
+
+
+def _next_batch(rows: Iterator[ParsedRow]) -> List[ParsedRow]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            break
+    return batch
+
+
+async def ingest_flights(lines: Iterable[str], fmt: str = "csv") -> FlightIngestResult:
+    """
+    Load a flight schedule, inserting new flights and updating existing ones
+
+    Parsing runs on a worker thread one batch at a time, interleaved with
+    COPY of the previous batch into the staging table.
+
+    Args:
+        lines: Text lines of the upload
+        fmt: "csv" or "ndjson"
+
+    Returns:
+        FlightIngestResult: Counts and per-row validation errors
+    """
+    result = FlightIngestResult()
+    rows = parse_flight_rows(lines, fmt)
+    loop = asyncio.get_running_loop()
+
+    async with transaction() as conn:
+        await conn.execute(BULK_WRITE_SQL)
+        await conn.execute(STAGING_SQL)
+
+        while True:
+            batch = await loop.run_in_executor(None, _next_batch, rows)
+            if not batch:
+                break
+
+            records = []
+            for line, flight, errors in batch:
+                result.received += 1
+                if errors:
+                    result.rejected += 1
+                    if len(result.errors) < MAX_REPORTED_ERRORS:
+                        result.errors.append(FlightIngestError(line=line, errors=errors))
+                    continue
+                values = flight.model_dump()
+                records.append((line, *(values[column] for column in FLIGHT_COLUMNS)))
+
+            if records:
+                await conn.copy_records_to_table(
+                    "flight_staging", records=records, columns=STAGING_COLUMNS
+                )
+
+        outcome = await conn.fetch(UPSERT_SQL)
+        result.inserted = sum(1 for row in outcome if row["inserted"])
+        result.updated = len(outcome) - result.inserted
+
+        await conn.execute(RESYNC_SQL, RESYNC_PAYLOAD)
+
+    invalidate_flights_cache()
+    return result
+
+
+async def _main(path: str, fmt: str):
+    await init_db()
+    try:
+        with open(path, encoding="utf-8", newline="") as upload:
+            result = await ingest_flights(upload, fmt)
+    finally:
+        await close_db()
+
+    print(f"Received: {result.received}")
+    print(f"Inserted: {result.inserted}")
+    print(f"Updated:  {result.updated}")
+    print(f"Rejected: {result.rejected}")
+    for error in result.errors:
+        print(f"  line {error.line}: {'; '.join(error.errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load a flight schedule")
+    parser.add_argument("path", help="CSV (with header) or NDJSON file of flights")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    asyncio.run(_main(args.path, fmt))
@@ -0,0 +1,236 @@
+"""
+Live flight board stream (Server-Sent Events)
+
+One broadcaster per worker is fed by the flight cache's LISTEN connection
+(database/flight_cache.py), so subscribers never hold a database connection.
+Each change is fetched and encoded once, then the same bytes are queued for
+every subscriber. Subscriber queues are bounded: a client that falls that far
+behind is disconnected and is expected to reconnect for a fresh snapshot.
+Pending changes are bounded too; past CHANGES_QUEUE_SIZE they collapse into
+one RESYNC (a fresh snapshot for everyone).
+"""
+import os
+import json
+import asyncio
+from typing import Optional, Set, Tuple, List
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+from models import FlightResponse
+from database import (
+    get_cached_flights,
+    get_cached_flight,
+    get_flight_board_version,
+    add_flight_change_listener,
+    remove_flight_change_listener
+)
+
+# Load environment variables
+load_dotenv()
+
+FLIGHT_STREAM_MAX_SUBSCRIBERS = int(os.getenv("FLIGHT_STREAM_MAX_SUBSCRIBERS", "10000"))
+FLIGHT_STREAM_QUEUE_SIZE = int(os.getenv("FLIGHT_STREAM_QUEUE_SIZE", "64"))
+FLIGHT_STREAM_KEEPALIVE_SECONDS = float(os.getenv("FLIGHT_STREAM_KEEPALIVE_SECONDS", "15"))
+# Flights read per query while building a snapshot
+SNAPSHOT_PAGE_SIZE = 1000
+CHANGES_QUEUE_SIZE = 1024
+
+KEEPALIVE_EVENT = b": keepalive\n\n"
+
+
+class Subscriber:
+    """A connected stream client and its bounded event queue"""
+    __slots__ = ("queue",)
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=FLIGHT_STREAM_QUEUE_SIZE)
+
+
+_subscribers: Set[Subscriber] = set()
+_changes: Optional[asyncio.Queue] = None
+_publisher: Optional[asyncio.Task] = None
+_snapshot: Optional[Tuple[int, bytes]] = None
+_stats = {"published": 0, "dropped": 0, "rejected": 0}
+
+
+def _event(name: str, data: bytes) -> bytes:
+    """Frame a Server-Sent Event"""
+    return b"event: " + name.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def _encode_flight(flight: dict) -> bytes:
+    return FlightResponse(**flight).model_dump_json().encode()
+
+
+async def snapshot_event() -> bytes:
+    """
+    Get the full board as a snapshot event, encoded once per board version
+
+    The board is read in pages of SNAPSHOT_PAGE_SIZE flights (from memory
+    when the flight cache is active), so no flight is left out.
+
+    Returns:
+        bytes: SSE frame with all flights
+    """
+    global _snapshot
+    version = get_flight_board_version()
+    if version is not None and _snapshot is not None and _snapshot[0] == version:
+        return _snapshot[1]
+
+    encoded: List[bytes] = []
+    after = None
+    while True:
+        page = await get_cached_flights(limit=SNAPSHOT_PAGE_SIZE, after=after)
+        encoded.extend(_encode_flight(flight) for flight in page)
+        if len(page) < SNAPSHOT_PAGE_SIZE:
+            break
+        last = page[-1]
+        after = {"v": last["departure_time"], "id": last["id"]}
+    event = _event("snapshot", b"[" + b",".join(encoded) + b"]")
+    if version is not None and version == get_flight_board_version():
+        _snapshot = (version, event)
+    return event
+
+
+def _broadcast(event: bytes):
+    """Queue an event for every subscriber, dropping those that are full"""
+    for subscriber in list(_subscribers):
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            _drop(subscriber)
+    _stats["published"] += 1
+
+
+def _drop(subscriber: Subscriber):
+    """Disconnect a subscriber that cannot keep up"""
+    _subscribers.discard(subscriber)
+    _stats["dropped"] += 1
+    # Replace the backlog with the end-of-stream marker
+    while not subscriber.queue.empty():
+        subscriber.queue.get_nowait()
+    subscriber.queue.put_nowait(None)
+
+
+def _queue_change(op: str, flight_number: Optional[str]):
+    """Hand a change to the publisher, coalescing into RESYNC when it lags"""
+    try:
+        _changes.put_nowait((op, flight_number))
+    except asyncio.QueueFull:
+        while not _changes.empty():
+            _changes.get_nowait()
+        _changes.put_nowait(("RESYNC", None))
+
+
+def _on_flight_change(op: str, flight_number: Optional[str]):
+    """Flight cache listener callback; hands the change to the publisher"""
+    if _changes is not None and _subscribers:
+        _queue_change(op, flight_number)
+
+
+async def _publish_changes():
+    """Turn committed flight changes into events, in commit order"""
+    while True:
+        batch: List[Tuple[str, Optional[str]]] = [await _changes.get()]
+        while not _changes.empty():
+            batch.append(_changes.get_nowait())
+
+        try:
+            if any(op in ("TRUNCATE", "RESYNC") for op, _ in batch):
+                _broadcast(await snapshot_event())
+                continue
+
+            for op, flight_number in batch:
+                flight = None
+                if op != "DELETE":
+                    flight = await get_cached_flight(flight_number)
+                if flight is None:
+                    data = json.dumps({"flight_number": flight_number}).encode()
+                    _broadcast(_event("delete", data))
+                else:
+                    _broadcast(_event("update", _encode_flight(flight)))
+        except Exception as e:
+            print(f"Flight stream publish failed, sending resync: {e}")
+            _queue_change("RESYNC", None)
+            await asyncio.sleep(1)
+
+
+def start_flight_stream():
+    """Start the broadcaster (called on application startup)"""
+    global _changes, _publisher
+    if _publisher is None:
+        _changes = asyncio.Queue(maxsize=CHANGES_QUEUE_SIZE)
+        _publisher = asyncio.get_running_loop().create_task(_publish_changes())
+        add_flight_change_listener(_on_flight_change)
+
+
+async def stop_flight_stream():
+    """Stop the broadcaster and end all streams (called on application shutdown)"""
+    global _publisher
+    remove_flight_change_listener(_on_flight_change)
+    if _publisher is not None:
+        _publisher.cancel()
+        _publisher = None
+    for subscriber in list(_subscribers):
+        _subscribers.discard(subscriber)
+        subscriber.queue.put_nowait(None)
+
+
+def check_capacity():
+    """
+    Refuse a new stream client when the worker is full
+
+    Checked before the response starts; the client is only registered once
+    the stream runs (stream_events), so a stream that never starts leaves
+    nothing behind.
+
+    Raises:
+        HTTPException: 503 if the worker already serves the maximum number of streams
+    """
+    if len(_subscribers) >= FLIGHT_STREAM_MAX_SUBSCRIBERS:
+        _stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live board subscribers, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+
+
+async def stream_events():
+    """
+    Generate the SSE byte stream for one client
+
+    Registers the client, sends a snapshot of the board, then update/delete
+    events as flights change, with a keepalive comment while idle.
+
+    Yields:
+        bytes: SSE frames
+    """
+    subscriber = Subscriber()
+    # Registered before the snapshot is taken, so no change falls in between
+    _subscribers.add(subscriber)
+    try:
+        yield await snapshot_event()
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), FLIGHT_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_EVENT
+                continue
+            if event is None:
+                break
+            yield event
+    finally:
+        _subscribers.discard(subscriber)
+
+
+def get_flight_stream_stats() -> dict:
+    """
+    Get broadcaster counters
+
+    Returns:
+        dict: Subscriber count and published/dropped/rejected counters
+    """
+    return {**_stats, "subscribers": len(_subscribers)}
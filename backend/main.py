@@ -2,9 +2,9 @@
 AeroWay Backend - FastAPI Application
 Main entry point for the AeroWay airport navigation system backend
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 import os
 from dotenv import load_dotenv
 
@@ -12,7 +12,25 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import database
-from database import init_db, close_db
+from database import (
+    init_db,
+    close_db,
+    start_flight_cache,
+    stop_flight_cache,
+    start_token_revocations,
+    stop_token_revocations,
+    start_user_profiles,
+    stop_user_profiles,
+    QueryDeadlineExceeded
+)
+from password_hasher import init_password_hasher, close_password_hasher
+from rate_limit import start_rate_limiter, stop_rate_limiter
+from flight_stream import start_flight_stream, stop_flight_stream
+from serialization import dumps
+from compression import CompressionMiddleware, EncodedBody, encoded_response
+from db_timing import DBTimingMiddleware
+from deadlines import DisconnectMiddleware
+from metrics import MetricsMiddleware, init_metrics, render_metrics, METRICS_ENABLED, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # Import routers
 from routers import (
@@ -28,9 +46,19 @@ app = FastAPI(
     description="Backend API for AeroWay Airport Navigation System",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Cancel requests (and their queries) when the client disconnects (see deadlines.py)
+app.add_middleware(DisconnectMiddleware)
+
+# Report per-request DB time and query count (see db_timing.py)
+app.add_middleware(DBTimingMiddleware)
+
+# Compress responses for clients that accept it (see compression.py)
+app.add_middleware(CompressionMiddleware)
+
 # Configure CORS
 origins = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
 
@@ -40,8 +68,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-DB-Time", "X-DB-Queries", "Server-Timing"],
 )
 
+# Outermost, so request latency includes CORS and compression
+app.add_middleware(MetricsMiddleware)
+
 
 # Root endpoint
 @app.get("/")
@@ -77,51 +109,80 @@ async def health_check():
     }
 
 
+# Metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics for this worker
+
+    Returns:
+        Response: Metrics in the Prometheus text format
+
+    Raises:
+        HTTPException: 404 if metrics are disabled
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+# API info payload (static, encoded once)
+API_INFO = {
+    "message": "AeroWay API",
+    "version": "1.0.0",
+    "endpoints": {
+        "auth": {
+            "register": "POST /api/auth/register",
+            "login": "POST /api/auth/login",
+            "validate_ticket": "POST /api/auth/validate-ticket",
+            "me": "GET /api/auth/me",
+            "logout": "POST /api/auth/logout"
+        },
+        "flights": {
+            "list": "GET /api/flights",
+            "get_by_number": "GET /api/flights/{flight_number}",
+            "changes": "GET /api/flights/changes?since={cursor}",
+            "stream": "GET /api/flights/stream (Server-Sent Events)",
+            "my_flight": "GET /api/flights/user/my-flight",
+            "search_arrivals": "GET /api/flights/arrivals/search",
+            "bulk_load": "POST /api/flights/bulk",
+            "batch_update": "PATCH /api/flights"
+        },
+        "chatbot": {
+            "send_message": "POST /api/chatbot",
+            "history": "GET /api/chatbot/history/{session_id}",
+            "user_history": "GET /api/chatbot/user-history"
+        },
+        "services": {
+            "list": "GET /api/services",
+            "by_category": "GET /api/services/{category}",
+            "spaces": "GET /api/spaces"
+        },
+        "meet_greet": {
+            "generate": "POST /api/meet-greet/generate",
+            "track": "POST /api/meet-greet/track",
+            "track_by_code": "GET /api/meet-greet/track/{tracking_code}",
+            "update": "PATCH /api/meet-greet/{tracking_code}",
+            "deactivate": "DELETE /api/meet-greet/{tracking_code}"
+        }
+    }
+}
+API_INFO_BODY = EncodedBody(dumps(API_INFO))
+
+
 # API info endpoint
 @app.get("/api")
-async def api_info():
+async def api_info(request: Request):
     """
     API information endpoint
 
+    Args:
+        request: Incoming request (for Accept-Encoding)
+
     Returns:
-        dict: API endpoints and information
+        Response: API endpoints and information (pre-encoded JSON)
     """
-    return {
-        "message": "AeroWay API",
-        "version": "1.0.0",
-        "endpoints": {
-            "auth": {
-                "register": "POST /api/auth/register",
-                "login": "POST /api/auth/login",
-                "validate_ticket": "POST /api/auth/validate-ticket",
-                "me": "GET /api/auth/me",
-                "logout": "POST /api/auth/logout"
-            },
-            "flights": {
-                "list": "GET /api/flights",
-                "get_by_number": "GET /api/flights/{flight_number}",
-                "my_flight": "GET /api/flights/user/my-flight",
-                "search_arrivals": "GET /api/flights/arrivals/search"
-            },
-            "chatbot": {
-                "send_message": "POST /api/chatbot",
-                "history": "GET /api/chatbot/history/{session_id}",
-                "user_history": "GET /api/chatbot/user-history"
-            },
-            "services": {
-                "list": "GET /api/services",
-                "by_category": "GET /api/services/{category}",
-                "spaces": "GET /api/spaces"
-            },
-            "meet_greet": {
-                "generate": "POST /api/meet-greet/generate",
-                "track": "POST /api/meet-greet/track",
-                "track_by_code": "GET /api/meet-greet/track/{tracking_code}",
-                "update": "PATCH /api/meet-greet/{tracking_code}",
-                "deactivate": "DELETE /api/meet-greet/{tracking_code}"
-            }
-        }
-    }
+    return encoded_response(request, API_INFO_BODY)
 
 
 # Include routers
@@ -142,14 +203,37 @@ async def http_exception_handler(request, exc):
         exc: HTTP exception
 
     Returns:
-        JSONResponse: Error response
+        ORJSONResponse: Error response
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
             "error": exc.detail,
             "status_code": exc.status_code
+        },
+        headers=getattr(exc, "headers", None)
+    )
+
+
+@app.exception_handler(QueryDeadlineExceeded)
+async def query_deadline_exception_handler(request, exc):
+    """
+    Handler for database deadlines not reported by the route itself
+
+    Args:
+        request: Request object
+        exc: Deadline exception
+
+    Returns:
+        ORJSONResponse: 504 error response
+    """
+    return ORJSONResponse(
+        status_code=504,
+        content={
+            "success": False,
+            "error": "Database deadline exceeded",
+            "status_code": 504
         }
     )
 
@@ -164,9 +248,9 @@ async def general_exception_handler(request, exc):
         exc: Exception
 
     Returns:
-        JSONResponse: Error response
+        ORJSONResponse: Error response
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -191,10 +275,21 @@ async def startup_event():
     try:
         await init_db()
         print("Database connection pool initialized")
+        await start_flight_cache()
+        await start_token_revocations()
+        await start_user_profiles()
+        start_flight_stream()
     except Exception as e:
         print(f"Failed to initialize database: {e}")
         raise
 
+    init_metrics()
+
+    # Start the password hashing worker pool
+    init_password_hasher()
+    print("Password hashing worker pool started")
+    start_rate_limiter()
+
 
 # Shutdown event
 @app.on_event("shutdown")
@@ -206,11 +301,19 @@ async def shutdown_event():
 
     # Close database connection pool
     try:
+        await stop_flight_stream()
+        await stop_flight_cache()
+        await stop_token_revocations()
+        await stop_user_profiles()
         await close_db()
         print("Database connection pool closed")
     except Exception as e:
         print(f"Error closing database: {e}")
 
+    close_password_hasher()
+    print("Password hashing worker pool stopped")
+    stop_rate_limiter()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,298 @@
+"""
+Prometheus metrics
+
+Collects request latency by route template and status, in-flight requests,
+connection pool occupancy and acquire wait, per-query DB latency, and cache
+hit ratios, and renders them in the Prometheus text exposition format for
+GET /metrics. Counters live in this worker only; scrape every worker (or
+aggregate by instance label) to see the whole deployment.
+"""
+import os
+import time
+import bisect
+from typing import Dict, List, Sequence, Tuple
+from dotenv import load_dotenv
+
+from database import (
+    get_pool_stats,
+    get_replica_stats,
+    get_query_cache_stats,
+    get_flight_cache_stats,
+    add_acquire_observer,
+    add_query_observer,
+    get_token_revocation_stats,
+    get_user_profile_stats
+)
+from database.db_client import _WHITESPACE
+from serialization import get_payload_cache_stats
+from compression import get_compression_stats
+from password_hasher import get_password_hasher_stats
+from rate_limit import get_rate_limit_stats
+from flight_stream import get_flight_stream_stats
+from deadlines import get_deadline_stats
+from auth_utils import get_token_cache_stats
+
+# Load environment variables
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+# Distinct SQL texts tracked individually; the rest are reported as "other"
+METRICS_MAX_QUERY_TEMPLATES = int(os.getenv("METRICS_MAX_QUERY_TEMPLATES", "500"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+    __slots__ = ("name", "help", "labelnames", "buckets", "_series")
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        """Record one observation"""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def _simple(kind: str, name: str, help: str, samples: List[Tuple[Sequence[str], Sequence[str], float]]) -> List[str]:
+    """Render a gauge or counter from (label names, label values, value) samples"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for names, values, value in samples:
+        lines.append(f"{name}{_labels(names, values)} {value}")
+    return lines
+
+
+_request_latency = Histogram(
+    "aeroway_http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ("method", "route", "status"),
+    REQUEST_BUCKETS
+)
+_acquire_wait = Histogram(
+    "aeroway_db_pool_acquire_seconds",
+    "Time spent waiting for a pooled connection",
+    (),
+    DB_BUCKETS
+)
+_query_latency = Histogram(
+    "aeroway_db_query_duration_seconds",
+    "execute_query latency by SQL template",
+    ("query",),
+    DB_BUCKETS
+)
+_query_errors: Dict[str, int] = {}
+_query_labels: Dict[str, str] = {}
+_in_flight = 0
+
+
+def _query_label(query: str) -> str:
+    """Normalize SQL text into a bounded set of label values"""
+    label = _query_labels.get(query)
+    if label is None:
+        if len(_query_labels) >= METRICS_MAX_QUERY_TEMPLATES:
+            return "other"
+        label = _query_labels[query] = _WHITESPACE.sub(" ", query).strip()[:300]
+    return label
+
+
+def _observe_acquire(seconds: float):
+    _acquire_wait.observe((), seconds)
+
+
+def _observe_query(query: str, seconds: float, failed: bool):
+    label = _query_label(query)
+    _query_latency.observe((label,), seconds)
+    if failed:
+        _query_errors[label] = _query_errors.get(label, 0) + 1
+
+
+def init_metrics():
+    """Start collecting database metrics (called on application startup)"""
+    if METRICS_ENABLED:
+        add_acquire_observer(_observe_acquire)
+        add_query_observer(_observe_query)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def recording_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            _in_flight -= 1
+            # The router stores the matched route in the scope; unmatched
+            # paths share one label so scanners cannot blow up cardinality
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            _request_latency.observe(
+                (scope["method"], template, str(status_code)), time.perf_counter() - start
+            )
+
+
+def _cache_samples() -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) per cache"""
+    caches = {}
+    flight_cache = get_flight_cache_stats()
+    caches["flight_board"] = (flight_cache["hits"], flight_cache["misses"])
+    query_cache = get_query_cache_stats()
+    caches["sql_text"] = (query_cache["sql_hits"], query_cache["sql_misses"])
+    caches["prepared_statements"] = (query_cache["prepared_hits"], query_cache["prepared_misses"])
+    for name, stats in get_payload_cache_stats().items():
+        caches[f"payload_{name}"] = (stats["hits"], stats["misses"])
+    token_cache = get_token_cache_stats()
+    caches["auth_tokens"] = (token_cache["hits"], token_cache["misses"])
+    profiles = get_user_profile_stats()
+    caches["user_profiles"] = (profiles["hits"], profiles["misses"])
+    return caches
+
+
+def render_metrics() -> str:
+    """
+    Render all metrics in the Prometheus text format
+
+    Returns:
+        str: Exposition text
+    """
+    lines: List[str] = []
+    lines += _request_latency.render()
+    lines += _simple("gauge", "aeroway_http_requests_in_flight", "Requests being handled", [((), (), _in_flight)])
+
+    pool = get_pool_stats()
+    lines += _simple("gauge", "aeroway_db_pool_connections", "Connection pool occupancy", [
+        (("state",), ("open",), pool["size"]),
+        (("state",), ("idle",), pool["idle"]),
+        (("state",), ("busy",), pool["size"] - pool["idle"]),
+        (("state",), ("max",), pool["max_size"]),
+        (("state",), ("min",), pool["min_size"]),
+        (("state",), ("limit",), pool["limit"])
+    ])
+    replica_stats = get_replica_stats()
+    replicas = replica_stats["replicas"]
+    lines += _simple("gauge", "aeroway_db_replica_usable", "Replica serving reads (healthy and within max lag)", [
+        (("replica",), (replica["name"],), int(replica["usable"])) for replica in replicas
+    ])
+    lines += _simple("gauge", "aeroway_db_replica_lag_seconds", "Replica replay lag at the last health check", [
+        (("replica",), (replica["name"],), replica["lag"]) for replica in replicas if replica["lag"] is not None
+    ])
+    lines += _simple("counter", "aeroway_db_replica_eligible_reads_total", "Reads that may use a replica, by where they ran", [
+        (("target",), ("replica",), replica_stats["replica_reads"]),
+        (("target",), ("primary",), replica_stats["primary_reads"])
+    ])
+    lines += _simple("counter", "aeroway_db_replica_fallbacks_total", "Reads retried on the primary after a replica failed", [
+        ((), (), replica_stats["fallbacks"])
+    ])
+    lines += _acquire_wait.render()
+    lines += _query_latency.render()
+    lines += _simple("counter", "aeroway_db_query_errors_total", "Failed execute_query calls by SQL template", [
+        (("query",), (label,), count) for label, count in _query_errors.items()
+    ])
+
+    caches = _cache_samples()
+    token_cache = get_token_cache_stats()
+    lines += _simple("counter", "aeroway_cache_hits_total", "Cache hits", [
+        (("cache",), (name,), hits) for name, (hits, _) in caches.items()
+    ])
+    lines += _simple("counter", "aeroway_cache_misses_total", "Cache misses", [
+        (("cache",), (name,), misses) for name, (_, misses) in caches.items()
+    ])
+    lines += _simple("gauge", "aeroway_cache_hit_ratio", "Cache hits / lookups since start", [
+        (("cache",), (name,), hits / (hits + misses) if hits + misses else 0.0)
+        for name, (hits, misses) in caches.items()
+    ])
+
+    lines += _simple("gauge", "aeroway_auth_token_cache_entries", "Verified tokens cached", [
+        ((), (), token_cache["size"])
+    ])
+    revocations = get_token_revocation_stats()
+    lines += _simple("gauge", "aeroway_auth_revoked_tokens", "Unexpired revoked tokens held in memory", [
+        ((), (), revocations["size"])
+    ])
+
+    hasher = get_password_hasher_stats()
+    lines += _simple("gauge", "aeroway_password_hash_in_flight", "Password hashing calls running or queued", [
+        ((), (), hasher["in_flight"])
+    ])
+    lines += _simple("counter", "aeroway_password_hash_rejected_total", "Password hashing calls rejected (503)", [
+        (("operation",), (operation,), stats["rejected"]) for operation, stats in hasher["operations"].items()
+    ])
+
+    rate_limit = get_rate_limit_stats()
+    lines += _simple("counter", "aeroway_login_rate_limited_total", "Login attempts rejected (429) by bucket", [
+        (("bucket",), ("ip",), rate_limit["rejected_ip"]),
+        (("bucket",), ("email",), rate_limit["rejected_email"])
+    ])
+
+    stream = get_flight_stream_stats()
+    lines += _simple("gauge", "aeroway_flight_stream_subscribers", "Connected live board clients", [
+        ((), (), stream["subscribers"])
+    ])
+
+    deadlines = get_deadline_stats()
+    lines += _simple("counter", "aeroway_db_deadline_exceeded_total", "Requests answered 504 after their DB deadline", [
+        ((), (), deadlines["deadline_exceeded"])
+    ])
+    lines += _simple("counter", "aeroway_requests_cancelled_on_disconnect_total", "Requests cancelled because the client went away", [
+        ((), (), deadlines["cancelled_on_disconnect"])
+    ])
+
+    compression = get_compression_stats()
+    lines += _simple("counter", "aeroway_compression_bytes_total", "Bytes before and after per-request compression", [
+        (("stage",), ("in",), compression["bytes_in"]),
+        (("stage",), ("out",), compression["bytes_out"])
+    ])
+
+    return "\n".join(lines) + "\n"
@@ -16,8 +16,13 @@ from .flight import (
     FlightBase,
     FlightCreate,
     FlightUpdate,
+    FlightBatchUpdateItem,
+    FlightBatchUpdateResult,
     FlightResponse,
-    FlightSearch
+    FlightSearch,
+    FlightChanges,
+    FlightIngestError,
+    FlightIngestResult
 )
 from .schemas import (
     MessageSender,
@@ -63,8 +68,13 @@ __all__ = [
     "FlightBase",
     "FlightCreate",
     "FlightUpdate",
+    "FlightBatchUpdateItem",
+    "FlightBatchUpdateResult",
     "FlightResponse",
     "FlightSearch",
+    "FlightChanges",
+    "FlightIngestError",
+    "FlightIngestResult",
     # Chat models
     "MessageSender",
     "ChatMessageCreate",
@@ -2,7 +2,7 @@
 Flight models and schemas
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Union
+from typing import Optional, Union, List
 from datetime import datetime
 from enum import Enum
 from uuid import UUID
@@ -53,6 +53,11 @@ class FlightUpdate(BaseModel):
     baggage_claim: Optional[str] = Field(None, max_length=50)
 
 
+class FlightBatchUpdateItem(FlightUpdate):
+    """One entry of a batch flight update"""
+    flight_number: str = Field(..., min_length=3, max_length=20)
+
+
 class FlightResponse(FlightBase):
     """Flight response model"""
     id: Union[str, UUID]
@@ -77,3 +82,31 @@ class FlightSearch(BaseModel):
     destination: Optional[str] = None
     date: Optional[datetime] = None
     status: Optional[FlightStatus] = None
+
+
+class FlightChanges(BaseModel):
+    """Flights changed since a delta feed cursor"""
+    flights: List[FlightResponse]
+    cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class FlightIngestError(BaseModel):
+    """Validation errors for one row of a bulk flight upload"""
+    line: int
+    errors: List[str]
+
+
+class FlightIngestResult(BaseModel):
+    """Bulk flight upload summary"""
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[FlightIngestError] = []
+
+
+class FlightBatchUpdateResult(BaseModel):
+    """Batch flight update outcome"""
+    updated: List[FlightResponse]
+    not_found: List[str] = []
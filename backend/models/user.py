@@ -93,3 +93,5 @@ class TokenData(BaseModel):
     """Token payload data"""
     user_id: Optional[str] = None
     email: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
@@ -0,0 +1,52 @@
+"""
+Cursor pagination utilities for list endpoints
+
+List endpoints accept an opaque `cursor` query parameter and return the
+cursor of the next page in the `X-Next-Cursor` response header (absent on
+the last page), so response bodies keep their existing shape.
+"""
+from typing import Optional, Dict, Any
+from fastapi import HTTPException, Query, Response, status
+
+from database.pagination import decode_cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def get_page_cursor(
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
+) -> Optional[Dict[str, Any]]:
+    """
+    Decode the cursor query parameter
+
+    Args:
+        cursor: Opaque cursor string
+
+    Returns:
+        Optional[dict]: Decoded cursor, or None for the first page
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """
+    Expose the next page cursor on the response
+
+    Args:
+        response: Outgoing response
+        next_cursor: Cursor of the next page, or None on the last page
+    """
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,160 @@
+"""
+Async password hashing service
+
+bcrypt is deliberately slow (~200ms per call), so hashing and verification
+are run on a dedicated worker pool instead of the event loop. The number of
+calls waiting for a worker is bounded; when the pool is saturated callers
+get a 503 so that login surges cannot starve the rest of the API.
+"""
+import os
+import time
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict, Any, Callable
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+from auth_utils import verify_password, get_password_hash
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = os.getenv("PASSWORD_HASH_RETRY_AFTER", "1")
+
+# Worker pool and bookkeeping
+_executor: Optional[Executor] = None
+_in_flight = 0
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _new_stats() -> Dict[str, float]:
+    return {
+        "calls": 0,
+        "rejected": 0,
+        "errors": 0,
+        "total_seconds": 0.0,
+        "max_seconds": 0.0,
+        "last_seconds": 0.0
+    }
+
+
+def init_password_hasher() -> Executor:
+    """Create the password hashing worker pool"""
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash"
+            )
+    return _executor
+
+
+def close_password_hasher():
+    """Shut down the password hashing worker pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _run(operation: str, func: Callable, *args) -> Any:
+    """
+    Run a hashing function on the worker pool
+
+    Args:
+        operation: Operation name used for metrics ("hash" or "verify")
+        func: Blocking function to run
+        *args: Function arguments
+
+    Returns:
+        Function result
+
+    Raises:
+        HTTPException: 503 if the pool and its queue are full
+    """
+    global _in_flight
+    stats = _stats.setdefault(operation, _new_stats())
+
+    if _in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+        stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry shortly",
+            headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER}
+        )
+
+    executor = init_password_hasher()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    _in_flight += 1
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except Exception:
+        stats["errors"] += 1
+        raise
+    finally:
+        _in_flight -= 1
+        elapsed = time.perf_counter() - start
+        stats["calls"] += 1
+        stats["total_seconds"] += elapsed
+        stats["last_seconds"] = elapsed
+        if elapsed > stats["max_seconds"]:
+            stats["max_seconds"] = elapsed
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password without blocking the event loop
+
+    Args:
+        password: Plain text password
+
+    Returns:
+        str: Hashed password
+    """
+    return await _run("hash", get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password without blocking the event loop
+
+    Args:
+        plain_password: Plain text password
+        hashed_password: Hashed password
+
+    Returns:
+        bool: True if password matches, False otherwise
+    """
+    return await _run("verify", verify_password, plain_password, hashed_password)
+
+
+def get_password_hasher_stats() -> Dict[str, Any]:
+    """
+    Get worker pool configuration and per-operation latency metrics
+
+    Returns:
+        dict: Pool settings, current load and latency statistics
+    """
+    operations = {}
+    for operation, stats in _stats.items():
+        calls = stats["calls"]
+        operations[operation] = {
+            **stats,
+            "avg_seconds": stats["total_seconds"] / calls if calls else 0.0
+        }
+
+    return {
+        "executor": PASSWORD_HASH_EXECUTOR,
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        "in_flight": _in_flight,
+        "operations": operations
+    }
@@ -0,0 +1,279 @@
+"""
+Login rate limiting
+
+Every login attempt costs a user lookup and a bcrypt verification (~200ms of
+CPU), so attempts are metered with token buckets before either runs:
+
+- per client IP: every attempt takes a token (credential stuffing from one
+  host);
+- per email and client IP: only failed attempts take a token (password
+  guessing against one account from one host). Failures from one address
+  cannot lock the account out for users elsewhere;
+- per email: only failed attempts take a token, with a larger budget
+  (password guessing against one account spread over many addresses).
+
+Email tokens are reserved before the lookup and bcrypt run, so concurrent
+attempts cannot all pass on the same token, and refunded when the login
+succeeds (record_login_success). Buckets refill continuously up to their
+burst size, and an empty bucket answers 429 with Retry-After.
+
+Buckets live in a bounded per-worker LRU keyed by a short digest, so emails
+and addresses are not kept in memory. With several workers each one allows
+the full rate; LOGIN_RATE_LIMIT_BACKEND=postgres also meters attempts that
+pass the local buckets against shared ones (migrations/010_login_rate_buckets.sql).
+If the shared buckets cannot be reached the local ones still apply.
+"""
+import os
+import math
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from dotenv import load_dotenv
+
+from database import execute_query
+
+# Load environment variables
+load_dotenv()
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "True") == "True"
+# Kiosks behind one NAT share an address, so the per-IP budget is generous
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "30"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))
+LOGIN_EMAIL_BURST = float(os.getenv("LOGIN_EMAIL_BURST", "5"))
+LOGIN_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "1"))
+# Failures per email from all addresses together
+LOGIN_ACCOUNT_BURST = float(os.getenv("LOGIN_ACCOUNT_BURST", "20"))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "5"))
+# Buckets kept per worker; the least recently used (likely full) go first
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "100000"))
+# "local" (per worker) or "postgres" (shared by all workers)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "local")
+# Use the last X-Forwarded-For entry (set by our proxy) as the client IP
+LOGIN_RATE_LIMIT_TRUST_FORWARDED = os.getenv("LOGIN_RATE_LIMIT_TRUST_FORWARDED", "False") == "True"
+
+if LOGIN_RATE_LIMIT_BACKEND not in ("local", "postgres"):
+    raise ValueError(f"LOGIN_RATE_LIMIT_BACKEND must be local or postgres, not {LOGIN_RATE_LIMIT_BACKEND!r}")
+
+PRUNE_INTERVAL_SECONDS = 600
+
+# Rejected attempts also take a token, down to -1, so clients that keep
+# retrying stay throttled until they back off
+_TAKE_QUERY = """
+    INSERT INTO login_rate_buckets AS b (bucket_key, tokens, updated_at)
+    VALUES ($1, $3::float8 - 1, clock_timestamp())
+    ON CONFLICT (bucket_key) DO UPDATE SET
+        tokens = GREATEST(LEAST(
+            $3::float8,
+            b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at)::float8 * $2::float8
+        ) - 1, -1),
+        updated_at = clock_timestamp()
+    RETURNING tokens
+"""
+_REFUND_QUERY = """
+    UPDATE login_rate_buckets SET
+        tokens = LEAST(
+            $3::float8,
+            tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated_at)::float8 * $2::float8 + 1
+        ),
+        updated_at = clock_timestamp()
+    WHERE bucket_key = $1
+    RETURNING tokens
+"""
+_PRUNE_QUERY = """
+    DELETE FROM login_rate_buckets
+    WHERE updated_at < clock_timestamp() - make_interval(secs => $1)
+"""
+
+# digest -> (tokens, monotonic time of last update)
+_buckets: "OrderedDict[bytes, Tuple[float, float]]" = OrderedDict()
+_prune_task: Optional[asyncio.Task] = None
+_shared_available = True
+_stats = {
+    "allowed": 0,
+    "refunded": 0,
+    "rejected_ip": 0,
+    "rejected_email": 0,
+    "rejected_account": 0,
+    "shared_errors": 0
+}
+
+
+def _bucket_key(kind: str, value: str) -> bytes:
+    return hashlib.blake2b(f"{kind}:{value}".encode(), digest_size=12).digest()
+
+
+def _retry_after(tokens: float, per_second: float) -> int:
+    """Seconds until a bucket holding `tokens` has one to spare"""
+    return max(1, math.ceil((1 - tokens) / per_second))
+
+
+def _peek_local(key: bytes, burst: float, per_second: float) -> float:
+    """Tokens currently in a per-worker bucket"""
+    entry = _buckets.get(key)
+    if entry is None:
+        return burst
+    tokens, updated = entry
+    return min(burst, tokens + (time.monotonic() - updated) * per_second)
+
+
+def _take_local(key: bytes, burst: float, per_second: float, count: float = 1) -> float:
+    """Take a token from (or, with count=-1, return one to) a per-worker bucket"""
+    now = time.monotonic()
+    tokens = min(max(_peek_local(key, burst, per_second) - count, -1.0), burst)
+    _buckets[key] = (tokens, now)
+    _buckets.move_to_end(key)
+    while len(_buckets) > LOGIN_RATE_LIMIT_MAX_KEYS:
+        _buckets.popitem(last=False)
+    return tokens
+
+
+async def _shared(query: str, key: bytes, burst: float, per_second: float) -> Optional[float]:
+    """Take from or refund to a shared bucket; None if the backend is unavailable"""
+    global _shared_available
+    try:
+        row = await execute_query(query, key, per_second, burst, fetch_one=True, prepared=True)
+    except Exception as e:
+        _stats["shared_errors"] += 1
+        if _shared_available:
+            print(f"Shared login rate limit unavailable, using per-worker buckets: {e}")
+            _shared_available = False
+        return None
+    if not _shared_available:
+        print("Shared login rate limit available again")
+        _shared_available = True
+    # No row yet: the bucket is full
+    return row["tokens"] if row else burst
+
+
+def _client_ip(request: Request) -> str:
+    if LOGIN_RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(kind: str, tokens: float, per_second: float):
+    _stats[f"rejected_{kind}"] += 1
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, please retry later",
+        headers={"Retry-After": str(_retry_after(tokens, per_second))}
+    )
+
+
+def _ip_bucket(request: Request) -> Tuple[bytes, float, float]:
+    return _bucket_key("ip", _client_ip(request)), LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60
+
+
+def _email_bucket(request: Request, email: str) -> Tuple[bytes, float, float]:
+    key = _bucket_key("email", f"{email.strip().lower()} {_client_ip(request)}")
+    return key, LOGIN_EMAIL_BURST, LOGIN_EMAIL_PER_MINUTE / 60
+
+
+def _account_bucket(email: str) -> Tuple[bytes, float, float]:
+    return _bucket_key("account", email.strip().lower()), LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_PER_MINUTE / 60
+
+
+async def check_login_rate(request: Request, email: str):
+    """
+    Meter a login attempt by client IP, and reserve the email's failure budget
+
+    Call before looking up the user, so throttled attempts cost no query and
+    no bcrypt work. Every attempt is charged as a failure until
+    record_login_success() refunds the email tokens.
+
+    Args:
+        request: Incoming request (for the client IP)
+        email: Email the attempt is for
+
+    Raises:
+        HTTPException: 429 with Retry-After if a bucket is empty
+    """
+    if not LOGIN_RATE_LIMIT_ENABLED:
+        return
+
+    buckets = (
+        ("ip", *_ip_bucket(request)),
+        ("account", *_account_bucket(email)),
+        ("email", *_email_bucket(request, email))
+    )
+
+    for kind, key, burst, per_second in buckets:
+        tokens = _take_local(key, burst, per_second)
+        if tokens < 0:
+            _reject(kind, tokens, per_second)
+
+    if LOGIN_RATE_LIMIT_BACKEND == "postgres":
+        for kind, key, burst, per_second in buckets:
+            tokens = await _shared(_TAKE_QUERY, key, burst, per_second)
+            if tokens is not None and tokens < 0:
+                _reject(kind, tokens, per_second)
+
+    _stats["allowed"] += 1
+
+
+async def record_login_success(request: Request, email: str):
+    """
+    Refund the email tokens reserved by check_login_rate for a login that succeeded
+
+    Args:
+        request: Incoming request (for the client IP)
+        email: Email the attempt was for
+    """
+    if not LOGIN_RATE_LIMIT_ENABLED:
+        return
+    for key, burst, per_second in (_account_bucket(email), _email_bucket(request, email)):
+        _take_local(key, burst, per_second, count=-1)
+        if LOGIN_RATE_LIMIT_BACKEND == "postgres":
+            await _shared(_REFUND_QUERY, key, burst, per_second)
+    _stats["refunded"] += 1
+
+
+async def _prune_periodically():
+    """Delete shared buckets that have refilled completely"""
+    full_after = max(
+        LOGIN_IP_BURST / LOGIN_IP_PER_MINUTE,
+        LOGIN_EMAIL_BURST / LOGIN_EMAIL_PER_MINUTE,
+        LOGIN_ACCOUNT_BURST / LOGIN_ACCOUNT_PER_MINUTE
+    ) * 60
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+        try:
+            await execute_query(_PRUNE_QUERY, full_after)
+        except Exception as e:
+            print(f"Login rate bucket pruning failed: {e}")
+
+
+def start_rate_limiter():
+    """Start pruning shared buckets (called on application startup)"""
+    global _prune_task
+    if LOGIN_RATE_LIMIT_ENABLED and LOGIN_RATE_LIMIT_BACKEND == "postgres":
+        _prune_task = asyncio.create_task(_prune_periodically())
+
+
+def stop_rate_limiter():
+    """Stop pruning shared buckets (called on application shutdown)"""
+    global _prune_task
+    if _prune_task is not None:
+        _prune_task.cancel()
+        _prune_task = None
+
+
+def get_rate_limit_stats() -> dict:
+    """
+    Get login rate limit counters
+
+    Returns:
+        dict: Attempts allowed, successful logins refunded, attempts
+        rejected per bucket kind, shared backend errors, and per-worker
+        buckets held
+    """
+    return {
+        **_stats,
+        "buckets": len(_buckets),
+        "backend": LOGIN_RATE_LIMIT_BACKEND
+    }
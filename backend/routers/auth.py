@@ -1,8 +1,9 @@
 """
 Authentication router - handles user registration, login, and ticket validation
 """
-from fastapi import APIRouter, HTTPException, status, Depends
-from datetime import datetime
+import asyncpg
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from datetime import datetime, timezone
 from typing import Optional
 
 from models import (
@@ -14,13 +15,21 @@ from models import (
     SuccessResponse
 )
 from auth_utils import (
-    get_password_hash,
-    verify_password,
     create_user_token,
     get_current_user,
     TokenData
 )
-from database import select, insert, update, execute_raw
+from database import (
+    select,
+    insert_on_conflict,
+    update,
+    link_ticket_flight,
+    revoke_token,
+    get_user_profile,
+    invalidate_user_profile
+)
+from password_hasher import hash_password, check_password
+from rate_limit import check_login_rate, record_login_success
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -40,17 +49,8 @@ async def register_user(user_data: UserCreate):
         HTTPException: If email already exists or registration fails
     """
     try:
-        # Check if user already exists
-        existing_user = await select("users", where={"email": user_data.email}, fetch_one=True)
-
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-
         # Hash the password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
 
         # Prepare user data for insertion
         user_dict = user_data.model_dump(exclude={"password"})
@@ -58,13 +58,14 @@ async def register_user(user_data: UserCreate):
         user_dict["created_at"] = datetime.utcnow()
         user_dict["updated_at"] = datetime.utcnow()
 
-        # Insert user into database
-        created_user = await insert("users", data=user_dict, returning="*")
+        # Insert user into database; an existing email leaves the row as
+        # it is, so concurrent sign-ups cannot both succeed
+        created_user, created = await insert_on_conflict("users", data=user_dict, conflict="email")
 
-        if not created_user:
+        if not created:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create user"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
             )
 
         # Create JWT token
@@ -107,22 +108,26 @@ async def register_user(user_data: UserCreate):
 
 
 @router.post("/login", response_model=Token)
-async def login_user(credentials: UserLogin):
+async def login_user(credentials: UserLogin, request: Request):
     """
     Authenticate a user and return JWT token
 
     Args:
         credentials: User login credentials
+        request: Incoming request (for per-IP rate limiting)
 
     Returns:
         Token: JWT token with user information
 
     Raises:
-        HTTPException: If credentials are invalid
+        HTTPException: If credentials are invalid or attempts are throttled
     """
     try:
+        # Throttle before any database or bcrypt work
+        await check_login_rate(request, credentials.email)
+
         # Find user by email
-        user = await select("users", where={"email": credentials.email}, fetch_one=True)
+        user = await select("users", where={"email": credentials.email}, fetch_one=True, primary=True)
 
         if not user:
             raise HTTPException(
@@ -131,12 +136,15 @@ async def login_user(credentials: UserLogin):
             )
 
         # Verify password
-        if not verify_password(credentials.password, user["password_hash"]):
+        if not await check_password(credentials.password, user["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
 
+        # Only failed attempts keep their email tokens
+        await record_login_success(request, credentials.email)
+
         # Create JWT token
         access_token = create_user_token(
             user_id=user["id"],
@@ -195,27 +203,23 @@ async def validate_ticket(
         HTTPException: If ticket is invalid or already in use
     """
     try:
-        # Check if ticket is already associated with another user
-        existing_ticket = await select("users", where={"ticket_number": ticket_data.ticket_number}, fetch_one=True)
-
-        if existing_ticket:
-            # Check if it's the current user's ticket
-            if existing_ticket["id"] != current_user.user_id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Ticket number already in use"
-                )
-
-        # Update user with ticket number
-        updated_user = await update(
-            "users",
-            data={
-                "ticket_number": ticket_data.ticket_number,
-                "updated_at": datetime.utcnow()
-            },
-            where={"id": current_user.user_id},
-            returning="*"
-        )
+        # Update user with ticket number; the unique index on ticket_number
+        # rejects a ticket already associated with another user
+        try:
+            updated_user = await update(
+                "users",
+                data={
+                    "ticket_number": ticket_data.ticket_number,
+                    "updated_at": datetime.utcnow()
+                },
+                where={"id": current_user.user_id},
+                returning="id"
+            )
+        except asyncpg.UniqueViolationError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ticket number already in use"
+            )
 
         if not updated_user:
             raise HTTPException(
@@ -223,15 +227,13 @@ async def validate_ticket(
                 detail="Failed to validate ticket"
             )
 
-        # Try to find associated flight
-        flight = await execute_raw(
-            "SELECT * FROM flights WHERE flight_number ILIKE $1 LIMIT 1",
-            f"%{ticket_data.ticket_number}%"
-        )
+        await invalidate_user_profile(current_user.user_id)
+
+        # Find the associated flight and record the ticket -> flight mapping
+        flight = await link_ticket_flight(ticket_data.ticket_number)
 
         flight_info = None
         if flight:
-            flight = flight[0]
             flight_info = {
                 "flight_number": flight["flight_number"],
                 "destination": flight.get("destination"),
@@ -271,7 +273,7 @@ async def get_current_user_info(current_user: TokenData = Depends(get_current_us
         HTTPException: If user not found
     """
     try:
-        user = await select("users", where={"id": current_user.user_id}, fetch_one=True)
+        user = await get_user_profile(current_user.user_id)
 
         if not user:
             raise HTTPException(
@@ -308,15 +310,47 @@ async def get_current_user_info(current_user: TokenData = Depends(get_current_us
 @router.post("/logout", response_model=SuccessResponse)
 async def logout_user(current_user: TokenData = Depends(get_current_user)):
     """
-    Logout current user (client-side token removal)
+    Logout current user by revoking the token on the server
+
+    Tokens issued before revocation existed carry no JWT ID, and revocation
+    is unavailable until migration 008 is applied; those tokens can only be
+    removed from client storage.
 
     Args:
         current_user: Current authenticated user
 
     Returns:
         SuccessResponse: Success message
+
+    Raises:
+        HTTPException: If the revocation cannot be stored
     """
+    if current_user.jti is None or current_user.exp is None:
+        return SuccessResponse(
+            success=True,
+            message="Logged out successfully. Please remove the token from client storage."
+        )
+
+    try:
+        revoked = await revoke_token(
+            current_user.jti,
+            current_user.user_id,
+            datetime.fromtimestamp(current_user.exp, tz=timezone.utc)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Logout failed: {str(e)}"
+        )
+
+    if not revoked:
+        # Revocation is unavailable (migration 008 not applied)
+        return SuccessResponse(
+            success=True,
+            message="Logged out successfully. Please remove the token from client storage."
+        )
+
     return SuccessResponse(
         success=True,
-        message="Logged out successfully. Please remove the token from client storage."
+        message="Logged out successfully. The token has been revoked."
     )
@@ -13,7 +13,9 @@ from models import (
     MessageSender
 )
 from auth_utils import get_optional_current_user, TokenData
-from database import select, insert, update, delete, execute_raw
+from database import insert, update, delete, execute_raw, select_page
+from pagination import get_page_cursor, set_next_cursor
+from serialization import CHAT_MESSAGE_ENCODER, rows_response
 
 router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 
@@ -151,18 +153,20 @@ async def process_chatbot_message(
 async def get_chat_history(
     session_id: str,
     limit: int = 50,
+    after: Optional[dict] = Depends(get_page_cursor),
     current_user: Optional[TokenData] = Depends(get_optional_current_user)
 ):
     """
-    Get chat history for a session
+    Get chat history for a session, oldest first
 
     Args:
         session_id: Session ID
         limit: Maximum number of messages to return
+        after: Decoded pagination cursor
         current_user: Optional current user
 
     Returns:
-        List[ChatMessageResponse]: List of chat messages
+        Response: JSON list of chat messages (ChatMessageResponse), with X-Next-Cursor
 
     Raises:
         HTTPException: If retrieval fails
@@ -175,26 +179,18 @@ async def get_chat_history(
         if current_user:
             where["user_id"] = current_user.user_id
 
-        messages_data = await select(
+        messages_data, next_cursor = await select_page(
             "messages",
             where=where,
-            order_by="timestamp ASC",
-            limit=limit
+            order_column="timestamp",
+            nullable=False,
+            limit=limit,
+            after=after,
+            records=True
         )
-
-        messages = [
-            ChatMessageResponse(
-                id=msg["id"],
-                user_id=msg.get("user_id"),
-                session_id=msg["session_id"],
-                sender=msg["sender"],
-                message_text=msg["message_text"],
-                timestamp=msg["timestamp"]
-            )
-            for msg in messages_data
-        ]
-
-        return messages
+        response = rows_response(CHAT_MESSAGE_ENCODER, messages_data)
+        set_next_cursor(response, next_cursor)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -206,17 +202,19 @@ async def get_chat_history(
 @router.get("/user-history", response_model=List[ChatMessageResponse])
 async def get_user_chat_history(
     limit: int = 100,
+    after: Optional[dict] = Depends(get_page_cursor),
     current_user: TokenData = Depends(get_optional_current_user)
 ):
     """
-    Get all chat history for the current user
+    Get all chat history for the current user, newest first
 
     Args:
         limit: Maximum number of messages to return
+        after: Decoded pagination cursor
         current_user: Current authenticated user
 
     Returns:
-        List[ChatMessageResponse]: List of user's chat messages
+        Response: JSON list of the user's chat messages (ChatMessageResponse), with X-Next-Cursor
 
     Raises:
         HTTPException: If retrieval fails or user not authenticated
@@ -228,26 +226,19 @@ async def get_user_chat_history(
         )
 
     try:
-        messages_data = await select(
+        messages_data, next_cursor = await select_page(
             "messages",
             where={"user_id": current_user.user_id},
-            order_by="timestamp DESC",
-            limit=limit
+            order_column="timestamp",
+            nullable=False,
+            descending=True,
+            limit=limit,
+            after=after,
+            records=True
         )
-
-        messages = [
-            ChatMessageResponse(
-                id=msg["id"],
-                user_id=msg.get("user_id"),
-                session_id=msg["session_id"],
-                sender=msg["sender"],
-                message_text=msg["message_text"],
-                timestamp=msg["timestamp"]
-            )
-            for msg in messages_data
-        ]
-
-        return messages
+        response = rows_response(CHAT_MESSAGE_ENCODER, messages_data)
+        set_next_cursor(response, next_cursor)
+        return response
 
     except Exception as e:
         raise HTTPException(
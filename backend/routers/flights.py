@@ -1,45 +1,131 @@
 """
 Flights router - handles flight information and queries
 """
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
+from uuid import UUID
+import io
+import csv
+import tempfile
 
 from models import (
     FlightResponse,
     FlightCreate,
     FlightUpdate,
-    FlightStatus
+    FlightStatus,
+    FlightChanges,
+    FlightIngestResult,
+    FlightBatchUpdateItem,
+    FlightBatchUpdateResult
 )
 from auth_utils import get_optional_current_user, TokenData
-from database import select, insert, update, delete, execute_raw
+from database import (
+    insert_on_conflict,
+    update,
+    delete,
+    execute_raw,
+    execute_query,
+    transaction,
+    get_cached_flights,
+    get_cached_flight,
+    get_flight_board_version,
+    get_flight_data_version,
+    invalidate_flights_cache,
+    resolve_ticket_flight,
+    get_user_profile,
+    order_clause,
+    keyset_clause,
+    split_page,
+    encode_change_cursor,
+    decode_change_cursor
+)
+from pagination import get_page_cursor, set_next_cursor
+from conditional import make_etag, is_not_modified, not_modified, set_etag
+from serialization import FLIGHT_ENCODER, payload_cache, rows_response
+from compression import EncodedBody, encoded_response
+from flight_stream import check_capacity, stream_events
+from flight_ingest import ingest_flights, BULK_WRITE_SQL, RESYNC_SQL, RESYNC_PAYLOAD
+from deadlines import kiosk_deadline
 
 router = APIRouter(prefix="/api/flights", tags=["Flights"])
 
+# Uploads larger than this are spooled to disk while they are parsed
+BULK_UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Batch updates: one UPDATE joined against unnest()ed parameter arrays, so the
+# statement text (and its prepared plan) is the same for any batch size.
+# Fields left out of an update keep their value, as in update_flight.
+MAX_BATCH_UPDATE = 1000
+BATCH_UPDATE_COLUMNS = list(FlightUpdate.model_fields)
+_BATCH_TIMESTAMP_COLUMNS = {"departure_time", "arrival_time", "boarding_time"}
+BATCH_UPDATE_SQL = """
+    UPDATE flights f SET
+        {assignments},
+        updated_at = NOW()
+    FROM unnest({arrays}) AS u(flight_number, {columns})
+    WHERE f.flight_number = u.flight_number
+    RETURNING f.*
+""".format(
+    assignments=", ".join(f"{column} = COALESCE(u.{column}, f.{column})" for column in BATCH_UPDATE_COLUMNS),
+    arrays=", ".join(
+        f"${i}::{'timestamptz' if column in _BATCH_TIMESTAMP_COLUMNS else 'text'}[]"
+        for i, column in enumerate(["flight_number"] + BATCH_UPDATE_COLUMNS, 1)
+    ),
+    columns=", ".join(BATCH_UPDATE_COLUMNS)
+)
+
+# Encoded (and compressed) board pages for the current board version
+_board_payloads = payload_cache("flight_board")
+
+# Flights written by transactions that have all finished, after a cursor, in
+# commit-safe order (see migrations/012_flights_change_xid.sql)
+CHANGES_SQL = """
+    SELECT * FROM flights
+    WHERE change_xid < pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+      AND (change_xid, id) > ($1, $2)
+    ORDER BY change_xid ASC, id ASC
+    LIMIT $3
+"""
+# Cursor position before every row
+CHANGES_START = {"x": -1, "id": UUID(int=0)}
+
 
-@router.get("", response_model=List[FlightResponse])
+@router.get("", response_model=List[FlightResponse], dependencies=[Depends(kiosk_deadline)])
 async def get_all_flights(
+    request: Request,
     status_filter: Optional[FlightStatus] = Query(None, description="Filter by flight status"),
     terminal: Optional[str] = Query(None, description="Filter by terminal"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of results"),
+    after: Optional[dict] = Depends(get_page_cursor),
     current_user: Optional[TokenData] = Depends(get_optional_current_user)
 ):
     """
-    Get all flights with optional filtering
+    Get all flights with optional filtering, ordered by departure time
+
+    Answers If-None-Match with 304 while the flights table is unchanged.
 
     Args:
+        request: Incoming request (for If-None-Match)
         status_filter: Optional status filter
         terminal: Optional terminal filter
         limit: Maximum number of results
+        after: Decoded pagination cursor
         current_user: Optional current user
 
     Returns:
-        List[FlightResponse]: List of flights
+        Response: JSON list of flights (FlightResponse), with X-Next-Cursor
+        and ETag, or 304 Not Modified
 
     Raises:
         HTTPException: If query fails
     """
     try:
+        etag = make_etag("flights", await get_flight_data_version(), request)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
         # Build where clause
         where = {}
         if status_filter:
@@ -47,44 +133,114 @@ async def get_all_flights(
         if terminal:
             where["terminal"] = terminal
 
-        # Fetch flights with filters
-        flights_data = await select(
-            "flights",
-            where=where if where else None,
-            order_by="departure_time ASC",
-            limit=limit
+        # Pages already encoded for the current board version are sent as-is
+        version = get_flight_board_version()
+        page_key = (tuple(where.items()), limit, tuple(after.items()) if after else None)
+        payload = _board_payloads.get(version, page_key)
+
+        if payload is None:
+            # Fetch flights with filters (served from the in-process board cache)
+            flights_data = await get_cached_flights(
+                where=where if where else None,
+                limit=limit + 1,
+                after=after
+            )
+            flights_data, next_cursor = split_page(flights_data, limit, "departure_time")
+            payload = (EncodedBody(FLIGHT_ENCODER(flights_data)), next_cursor)
+            if version == get_flight_board_version():
+                _board_payloads.put(version, page_key, payload)
+
+        body, next_cursor = payload
+        response = encoded_response(request, body)
+        set_next_cursor(response, next_cursor)
+        set_etag(response, etag)
+        return response
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch flights: {str(e)}"
         )
 
-        flights = [
-            FlightResponse(
-                id=flight["id"],
-                flight_number=flight["flight_number"],
-                airline=flight["airline"],
-                origin=flight.get("origin"),
-                destination=flight.get("destination"),
-                departure_time=flight.get("departure_time"),
-                arrival_time=flight.get("arrival_time"),
-                gate=flight.get("gate"),
-                terminal=flight.get("terminal"),
-                status=flight["status"],
-                boarding_time=flight.get("boarding_time"),
-                baggage_claim=flight.get("baggage_claim"),
-                created_at=flight["created_at"],
-                updated_at=flight.get("updated_at")
+
+@router.get("/changes", response_model=FlightChanges)
+async def get_flight_changes(
+    since: Optional[str] = Query(None, description="Cursor returned by the previous poll; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of flights per response")
+):
+    """
+    Get flights modified since a cursor (delta feed for display screens)
+
+    Rows are returned in the order their transactions wrote them, together
+    with the cursor for the next poll; a row is only returned once every
+    transaction that started before its own has finished, so no committed
+    change is ever behind the cursor. When has_more is true the client
+    should poll again right away. Deleted flights are not reported.
+
+    Args:
+        since: Cursor returned by the previous poll
+        limit: Maximum number of flights per response
+
+    Returns:
+        FlightChanges: Changed flights and the next cursor
+
+    Raises:
+        HTTPException: If the cursor is invalid or the query fails
+    """
+    after = CHANGES_START
+    if since:
+        try:
+            after = decode_change_cursor(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
             )
-            for flight in flights_data
-        ]
 
-        return flights
+    try:
+        rows = await execute_query(CHANGES_SQL, after["x"], after["id"], limit + 1, fetch_all=True, prepared=True)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return FlightChanges(
+            flights=[FlightResponse(**dict(row)) for row in rows],
+            cursor=encode_change_cursor(rows[-1]) if rows else since,
+            has_more=has_more
+        )
 
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch flights: {str(e)}"
+            detail=f"Failed to fetch flight changes: {str(e)}"
         )
 
 
-@router.get("/{flight_number}", response_model=FlightResponse)
+@router.get("/stream")
+async def stream_flights():
+    """
+    Live flight board stream (Server-Sent Events)
+
+    Sends a `snapshot` event with the whole board, then `update` and `delete`
+    events as flights change. A new `snapshot` is sent whenever changes may
+    have been missed. Clients that fall too far behind are disconnected and
+    should reconnect.
+
+    Returns:
+        StreamingResponse: text/event-stream
+
+    Raises:
+        HTTPException: 503 if this worker has too many subscribers
+    """
+    check_capacity()
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{flight_number}", response_model=FlightResponse, dependencies=[Depends(kiosk_deadline)])
 async def get_flight_by_number(
     flight_number: str,
     current_user: Optional[TokenData] = Depends(get_optional_current_user)
@@ -103,11 +259,7 @@ async def get_flight_by_number(
         HTTPException: If flight not found
     """
     try:
-        flight = await select(
-            "flights",
-            where={"flight_number": flight_number.upper()},
-            fetch_one=True
-        )
+        flight = await get_cached_flight(flight_number.upper())
 
         if not flight:
             raise HTTPException(
@@ -163,12 +315,7 @@ async def get_user_flight(current_user: TokenData = Depends(get_optional_current
 
     try:
         # Get user's ticket number
-        user = await select(
-            "users",
-            columns=["ticket_number"],
-            where={"id": current_user.user_id},
-            fetch_one=True
-        )
+        user = await get_user_profile(current_user.user_id, ["ticket_number"])
 
         if not user or not user.get("ticket_number"):
             raise HTTPException(
@@ -178,20 +325,15 @@ async def get_user_flight(current_user: TokenData = Depends(get_optional_current
 
         ticket_number = user["ticket_number"]
 
-        # Find flight by ticket number (assuming ticket number contains flight number)
-        flights = await execute_raw(
-            "SELECT * FROM flights WHERE flight_number ILIKE $1",
-            f"%{ticket_number}%"
-        )
+        # Find flight linked to the ticket number
+        flight = await resolve_ticket_flight(ticket_number)
 
-        if not flights:
+        if not flight:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Flight not found for your ticket"
             )
 
-        flight = flights[0]
-
         return FlightResponse(
             id=flight["id"],
             flight_number=flight["flight_number"],
@@ -218,68 +360,85 @@ async def get_user_flight(current_user: TokenData = Depends(get_optional_current
         )
 
 
-@router.get("/arrivals/search", response_model=List[FlightResponse])
+@router.get("/arrivals/search", response_model=List[FlightResponse], dependencies=[Depends(kiosk_deadline)])
 async def search_arrivals(
     origin: Optional[str] = Query(None, description="Search by origin city"),
     flight_number: Optional[str] = Query(None, description="Search by flight number"),
-    limit: int = Query(20, ge=1, le=100, description="Maximum number of results")
+    mode: str = Query(
+        "contains",
+        pattern="^(contains|fuzzy)$",
+        description="contains: substring match by arrival time; fuzzy: ranked by similarity"
+    ),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    after: Optional[dict] = Depends(get_page_cursor)
 ):
     """
     Search for arrival flights
 
+    Both modes are served by the trigram indexes on origin and flight_number.
+    Fuzzy mode tolerates typos and partial words (type-ahead) and returns the
+    closest matches first.
+
+    Contains mode is paginated by arrival time with a cursor; fuzzy mode
+    returns the best matches only.
+
     Args:
         origin: Origin city to filter by
         flight_number: Flight number to search for
+        mode: Search mode ("contains" or "fuzzy")
         limit: Maximum number of results
+        after: Decoded pagination cursor
 
     Returns:
-        List[FlightResponse]: List of matching arrival flights
+        Response: JSON list of matching arrival flights (FlightResponse)
 
     Raises:
         HTTPException: If search fails
     """
+    if after is not None and mode == "fuzzy":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor pagination is not available for fuzzy search"
+        )
+
     try:
-        # Build query with ILIKE filters
+        # Build query with trigram-indexable filters
         conditions = ["arrival_time IS NOT NULL"]
+        scores = []
         params = []
-        param_count = 1
 
-        if origin:
-            conditions.append(f"origin ILIKE ${param_count}")
-            params.append(f"%{origin}%")
-            param_count += 1
+        for column, term in (("origin", origin), ("flight_number", flight_number)):
+            if not term:
+                continue
+            if mode == "fuzzy":
+                params.append(term)
+                conditions.append(f"${len(params)} <% {column}")
+                scores.append(f"word_similarity(${len(params)}, {column})")
+            else:
+                params.append(f"%{term}%")
+                conditions.append(f"{column} ILIKE ${len(params)}")
+
+        if after is not None:
+            condition, cursor_params = keyset_clause(
+                after, "arrival_time", first_param=len(params) + 1
+            )
+            conditions.append(condition)
+            params.extend(cursor_params)
 
-        if flight_number:
-            conditions.append(f"flight_number ILIKE ${param_count}")
-            params.append(f"%{flight_number}%")
-            param_count += 1
+        order_by = order_clause("arrival_time")
+        if scores:
+            order_by = f"{' + '.join(scores)} DESC, {order_by}"
 
+        params.append(limit + 1)
         where_clause = " AND ".join(conditions)
-        query = f"SELECT * FROM flights WHERE {where_clause} ORDER BY arrival_time ASC LIMIT {limit}"
+        query = f"SELECT * FROM flights WHERE {where_clause} ORDER BY {order_by} LIMIT ${len(params)}"
 
         flights_data = await execute_raw(query, *params)
-
-        flights = [
-            FlightResponse(
-                id=flight["id"],
-                flight_number=flight["flight_number"],
-                airline=flight["airline"],
-                origin=flight.get("origin"),
-                destination=flight.get("destination"),
-                departure_time=flight.get("departure_time"),
-                arrival_time=flight.get("arrival_time"),
-                gate=flight.get("gate"),
-                terminal=flight.get("terminal"),
-                status=flight["status"],
-                boarding_time=flight.get("boarding_time"),
-                baggage_claim=flight.get("baggage_claim"),
-                created_at=flight["created_at"],
-                updated_at=flight.get("updated_at")
-            )
-            for flight in flights_data
-        ]
-
-        return flights
+        flights_data, next_cursor = split_page(flights_data, limit, "arrival_time")
+        response = rows_response(FLIGHT_ENCODER, flights_data)
+        if not scores:
+            set_next_cursor(response, next_cursor)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -303,33 +462,22 @@ async def create_flight(flight_data: FlightCreate):
         HTTPException: If creation fails
     """
     try:
-        # Check if flight already exists
-        existing_flight = await select(
-            "flights",
-            where={"flight_number": flight_data.flight_number},
-            fetch_one=True
-        )
-
-        if existing_flight:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Flight number already exists"
-            )
-
         # Prepare flight data
         flight_dict = flight_data.model_dump()
         flight_dict["created_at"] = datetime.utcnow()
         flight_dict["updated_at"] = datetime.utcnow()
 
-        # Insert flight
-        flight = await insert("flights", data=flight_dict, returning="*")
+        # Insert flight; an existing flight number leaves the row as it is
+        flight, created = await insert_on_conflict("flights", data=flight_dict, conflict="flight_number")
 
-        if not flight:
+        if not created:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to create flight"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Flight number already exists"
             )
 
+        invalidate_flights_cache(flight["flight_number"])
+
         return FlightResponse(**flight)
 
     except HTTPException:
@@ -368,6 +516,7 @@ async def update_flight(flight_number: str, flight_data: FlightUpdate):
             where={"flight_number": flight_number.upper()},
             returning="*"
         )
+        invalidate_flights_cache(flight_number.upper())
 
         if not flight:
             raise HTTPException(
@@ -384,3 +533,126 @@ async def update_flight(flight_number: str, flight_data: FlightUpdate):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update flight: {str(e)}"
         )
+
+
+@router.patch("", response_model=FlightBatchUpdateResult)
+async def batch_update_flights(updates: List[FlightBatchUpdateItem]):
+    """
+    Update many flights in one statement (Admin only - add authentication later)
+
+    Meant for ops feeds sending bursts of status and gate changes. All
+    updates are applied atomically; when a flight appears more than once,
+    later entries override earlier ones field by field. Workers are told
+    with a single RESYNC notification rather than one per row.
+
+    Args:
+        updates: Flight updates, each with its flight number
+
+    Returns:
+        FlightBatchUpdateResult: Updated flights and unknown flight numbers
+
+    Raises:
+        HTTPException: If the batch is too large or the update fails
+    """
+    if len(updates) > MAX_BATCH_UPDATE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_UPDATE} updates per batch"
+        )
+
+    try:
+        # Merge updates per flight (exclude None values, as in update_flight)
+        merged = {}
+        for item in updates:
+            changes = merged.setdefault(item.flight_number.upper(), {})
+            changes.update(
+                (k, getattr(v, "value", v))  # enums travel as their text value
+                for k, v in item.model_dump(exclude={"flight_number"}).items()
+                if v is not None
+            )
+
+        flight_numbers = list(merged)
+        arrays = [flight_numbers] + [
+            [merged[number].get(column) for number in flight_numbers]
+            for column in BATCH_UPDATE_COLUMNS
+        ]
+
+        rows = []
+        if merged:
+            async with transaction() as conn:
+                await conn.execute(BULK_WRITE_SQL)
+                rows = await conn.fetch(BATCH_UPDATE_SQL, *arrays)
+                await conn.execute(RESYNC_SQL, RESYNC_PAYLOAD)
+            invalidate_flights_cache()
+
+        updated = [FlightResponse(**dict(row)) for row in rows]
+        found = {flight.flight_number for flight in updated}
+
+        return FlightBatchUpdateResult(
+            updated=updated,
+            not_found=[number for number in flight_numbers if number not in found]
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update flights: {str(e)}"
+        )
+
+
+@router.post("/bulk", response_model=FlightIngestResult)
+async def bulk_ingest_flights(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(csv|ndjson)$",
+        description="Upload format; defaults to the Content-Type (text/csv or application/x-ndjson)"
+    )
+):
+    """
+    Bulk load a flight schedule (Admin only - add authentication later)
+
+    The request body is a CSV file with a header row, or NDJSON with one
+    flight per line, using the FlightCreate fields. New flights are inserted
+    and existing flight numbers are updated; invalid rows are skipped and
+    reported with their line number.
+
+    Args:
+        request: Request carrying the upload body
+        format: Upload format
+
+    Returns:
+        FlightIngestResult: Counts and per-row validation errors
+
+    Raises:
+        HTTPException: If the upload is not valid UTF-8 or CSV, or the load fails
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = format or ("ndjson" if "json" in content_type else "csv")
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=BULK_UPLOAD_SPOOL_BYTES) as spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+
+            lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+            return await ingest_flights(lines, fmt)
+
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload is not valid UTF-8: {str(e)}"
+        )
+    except csv.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Malformed CSV upload: {str(e)}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load flights: {str(e)}"
+        )
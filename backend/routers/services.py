@@ -1,11 +1,12 @@
 """
 Services router - handles services, spaces, and meet & greet functionality
 """
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from typing import List, Optional, Hashable
 from datetime import datetime, timedelta
 import random
 import string
+import time
 
 from models import (
     ServiceResponse,
@@ -20,34 +21,72 @@ from models import (
     SuccessResponse
 )
 from auth_utils import get_current_user, get_optional_current_user, TokenData
-from database import select, insert, update, delete, execute_raw
+from database import (
+    select,
+    insert,
+    update,
+    delete,
+    resolve_ticket_flight,
+    get_user_profile,
+    select_page,
+    get_data_version
+)
+from pagination import get_page_cursor, set_next_cursor
+from conditional import make_etag, is_not_modified, not_modified, set_etag
+from serialization import SERVICE_ENCODER, SPACE_ENCODER, payload_cache, rows_response
+from compression import EncodedBody, encoded_response
+from deadlines import kiosk_deadline
 
 router = APIRouter(prefix="/api", tags=["Services"])
 
+# Encoded (and compressed) services catalog pages are reused until the services data version
+# changes, or for this many seconds on a database without data versions
+SERVICES_CATALOG_TTL_SECONDS = 60
+_catalog_payloads = payload_cache("services_catalog")
+
+
+def _catalog_version(data_version: Optional[int]) -> Hashable:
+    """Version the encoded catalog pages are cached under"""
+    if data_version is not None:
+        return data_version
+    return ("ttl", int(time.monotonic() // SERVICES_CATALOG_TTL_SECONDS))
+
 
 # ============ Services Endpoints ============
 
-@router.get("/services", response_model=List[ServiceResponse])
+@router.get("/services", response_model=List[ServiceResponse], dependencies=[Depends(kiosk_deadline)])
 async def get_all_services(
+    request: Request,
     category: Optional[ServiceCategory] = Query(None, description="Filter by category"),
     terminal: Optional[str] = Query(None, description="Filter by terminal"),
-    limit: int = Query(50, ge=1, le=100, description="Maximum number of results")
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of results"),
+    after: Optional[dict] = Depends(get_page_cursor)
 ):
     """
     Get all airport services with optional filtering
 
+    Answers If-None-Match with 304 while the services table is unchanged.
+
     Args:
+        request: Incoming request (for If-None-Match)
         category: Optional category filter
         terminal: Optional terminal filter
         limit: Maximum number of results
+        after: Decoded pagination cursor
 
     Returns:
-        List[ServiceResponse]: List of services
+        Response: JSON list of services (ServiceResponse), with X-Next-Cursor
+        and ETag, or 304 Not Modified
 
     Raises:
         HTTPException: If query fails
     """
     try:
+        data_version = await get_data_version("services")
+        etag = make_etag("services", data_version, request)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
         # Build where clause
         where = {}
         if category:
@@ -55,28 +94,26 @@ async def get_all_services(
         if terminal:
             where["terminal"] = terminal
 
-        services_data = await select(
-            "services",
-            where=where if where else None,
-            limit=limit
-        )
-
-        services = [
-            ServiceResponse(
-                id=service["id"],
-                name=service["name"],
-                category=service["category"],
-                location=service["location"],
-                terminal=service.get("terminal"),
-                description=service.get("description"),
-                opening_hours=service.get("opening_hours"),
-                image_url=service.get("image_url"),
-                created_at=service["created_at"]
+        version = _catalog_version(data_version)
+        page_key = ("list", tuple(where.items()), limit, tuple(after.items()) if after else None)
+        payload = _catalog_payloads.get(version, page_key)
+
+        if payload is None:
+            services_data, next_cursor = await select_page(
+                "services",
+                where=where if where else None,
+                limit=limit,
+                after=after,
+                records=True
             )
-            for service in services_data
-        ]
+            payload = (EncodedBody(SERVICE_ENCODER(services_data)), next_cursor)
+            _catalog_payloads.put(version, page_key, payload)
 
-        return services
+        body, next_cursor = payload
+        response = encoded_response(request, body)
+        set_next_cursor(response, next_cursor)
+        set_etag(response, etag)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -85,42 +122,42 @@ async def get_all_services(
         )
 
 
-@router.get("/services/{category}", response_model=List[ServiceResponse])
-async def get_services_by_category(category: ServiceCategory):
+@router.get("/services/{category}", response_model=List[ServiceResponse], dependencies=[Depends(kiosk_deadline)])
+async def get_services_by_category(category: ServiceCategory, request: Request):
     """
     Get services by category (shops, restaurants, cafes, lounges, etc.)
 
     Args:
         category: Service category
+        request: Incoming request (for If-None-Match)
 
     Returns:
-        List[ServiceResponse]: List of services in the category
+        Response: JSON list of services in the category (ServiceResponse)
+        with ETag, or 304 Not Modified
 
     Raises:
         HTTPException: If query fails
     """
     try:
-        services_data = await select(
-            "services",
-            where={"category": category.value}
-        )
-
-        services = [
-            ServiceResponse(
-                id=service["id"],
-                name=service["name"],
-                category=service["category"],
-                location=service["location"],
-                terminal=service.get("terminal"),
-                description=service.get("description"),
-                opening_hours=service.get("opening_hours"),
-                image_url=service.get("image_url"),
-                created_at=service["created_at"]
+        data_version = await get_data_version("services")
+        etag = make_etag(f"services-{category.value}", data_version, request)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
+        version = _catalog_version(data_version)
+        body = _catalog_payloads.get(version, ("category", category.value))
+
+        if body is None:
+            services_data = await select(
+                "services",
+                where={"category": category.value}
             )
-            for service in services_data
-        ]
+            body = EncodedBody(SERVICE_ENCODER(services_data))
+            _catalog_payloads.put(version, ("category", category.value), body)
 
-        return services
+        response = encoded_response(request, body)
+        set_etag(response, etag)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -131,27 +168,38 @@ async def get_services_by_category(category: ServiceCategory):
 
 # ============ Spaces Endpoints ============
 
-@router.get("/spaces", response_model=List[SpaceResponse])
+@router.get("/spaces", response_model=List[SpaceResponse], dependencies=[Depends(kiosk_deadline)])
 async def get_all_spaces(
+    request: Request,
     category: Optional[SpaceCategory] = Query(None, description="Filter by category"),
     terminal: Optional[str] = Query(None, description="Filter by terminal"),
-    limit: int = Query(50, ge=1, le=100, description="Maximum number of results")
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of results"),
+    after: Optional[dict] = Depends(get_page_cursor)
 ):
     """
     Get all airport spaces with optional filtering
 
+    Answers If-None-Match with 304 while the spaces table is unchanged.
+
     Args:
+        request: Incoming request (for If-None-Match)
         category: Optional category filter
         terminal: Optional terminal filter
         limit: Maximum number of results
+        after: Decoded pagination cursor
 
     Returns:
-        List[SpaceResponse]: List of spaces
+        Response: JSON list of spaces (SpaceResponse), with X-Next-Cursor
+        and ETag, or 304 Not Modified
 
     Raises:
         HTTPException: If query fails
     """
     try:
+        etag = make_etag("spaces", await get_data_version("spaces"), request)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
         # Build where clause
         where = {}
         if category:
@@ -159,29 +207,17 @@ async def get_all_spaces(
         if terminal:
             where["terminal"] = terminal
 
-        spaces_data = await select(
+        spaces_data, next_cursor = await select_page(
             "spaces",
             where=where if where else None,
-            limit=limit
+            limit=limit,
+            after=after,
+            records=True
         )
-
-        spaces = [
-            SpaceResponse(
-                id=space["id"],
-                name=space["name"],
-                category=space["category"],
-                location=space["location"],
-                terminal=space.get("terminal"),
-                description=space.get("description"),
-                opening_hours=space.get("opening_hours"),
-                image_url=space.get("image_url"),
-                coordinates=space.get("coordinates"),
-                created_at=space["created_at"]
-            )
-            for space in spaces_data
-        ]
-
-        return spaces
+        response = rows_response(SPACE_ENCODER, spaces_data)
+        set_next_cursor(response, next_cursor)
+        set_etag(response, etag)
+        return response
 
     except Exception as e:
         raise HTTPException(
@@ -220,11 +256,7 @@ async def generate_meet_greet_code(
     """
     try:
         # Get user information
-        user = await select(
-            "users",
-            where={"id": current_user.user_id},
-            fetch_one=True
-        )
+        user = await get_user_profile(current_user.user_id, ["prenom", "nom", "ticket_number"])
 
         if not user:
             raise HTTPException(
@@ -237,13 +269,10 @@ async def generate_meet_greet_code(
         # Try to find user's flight if they have a ticket
         flight_id = None
         if user.get("ticket_number"):
-            flights = await execute_raw(
-                "SELECT id FROM flights WHERE flight_number ILIKE $1",
-                f"%{user['ticket_number']}%"
-            )
+            flight = await resolve_ticket_flight(user["ticket_number"])
 
-            if flights:
-                flight_id = flights[0]["id"]
+            if flight:
+                flight_id = flight["id"]
 
         # Check if user already has an active Meet & Greet code
         existing_code = await select(
@@ -252,7 +281,8 @@ async def generate_meet_greet_code(
                 "passenger_id": current_user.user_id,
                 "status": MeetGreetStatus.ACTIVE.value
             },
-            fetch_one=True
+            fetch_one=True,
+            primary=True
         )
 
         if existing_code:
@@ -271,7 +301,8 @@ async def generate_meet_greet_code(
                 "meet_greet",
                 columns=["id"],
                 where={"tracking_code": tracking_code},
-                fetch_one=True
+                fetch_one=True,
+                primary=True
             )
 
             if not check_result:
@@ -329,7 +360,8 @@ async def track_passenger(tracking_data: TrackingCodeValidate):
         tracking_info = await select(
             "meet_greet",
             where={"tracking_code": tracking_data.tracking_code.upper()},
-            fetch_one=True
+            fetch_one=True,
+            primary=True
         )
 
         if not tracking_info:
@@ -407,7 +439,8 @@ async def update_passenger_location(
         tracking_info = await select(
             "meet_greet",
             where={"tracking_code": tracking_code.upper()},
-            fetch_one=True
+            fetch_one=True,
+            primary=True
         )
 
         if not tracking_info:
@@ -474,7 +507,8 @@ async def deactivate_meet_greet(
         tracking_info = await select(
             "meet_greet",
             where={"tracking_code": tracking_code.upper()},
-            fetch_one=True
+            fetch_one=True,
+            primary=True
         )
 
         if not tracking_info:
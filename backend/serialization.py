@@ -0,0 +1,266 @@
+"""
+Fast JSON encoding of database rows for list endpoints
+
+List handlers used to turn every asyncpg Record into a dict, build a response
+model field by field, and let FastAPI validate and serialize the result again
+through `response_model`. Rows coming from the database already satisfy the
+table constraints, so the hot list endpoints instead encode rows (Records or
+dicts) straight to JSON bytes with an encoder generated once per response
+model, and return them as a ready-made Response.
+
+The encoder picks the model's columns out of each row in field order and
+hands the page to orjson, which writes datetimes natively. asyncpg returns
+UUIDs as its own uuid.UUID subclass, which orjson does not recognise, so
+those go through `_default`. The output matches what FastAPI produces for the same model: same field order,
+UUIDs as strings, datetimes in ISO 8601 with "Z" for UTC.
+
+Endpoints whose payload only changes with a known data version (the flight
+board, the services catalog) keep the encoded bytes in a PayloadCache and
+serve them again without touching the rows.
+"""
+import json
+import uuid
+import typing
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Sequence, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from models import FlightResponse, ServiceResponse, SpaceResponse, ChatMessageResponse
+
+RowEncoder = Callable[[Iterable[Any]], bytes]
+
+# Same datetime format as pydantic ("Z" for UTC)
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    """Encode values orjson has no native support for"""
+    # asyncpg.pgproto.pgproto.UUID subclasses uuid.UUID; orjson only
+    # serializes the exact uuid.UUID type
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a value to JSON bytes
+
+    Args:
+        content: JSON-compatible value (UUIDs and datetimes allowed)
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    return orjson.dumps(content, default=_default, option=JSON_OPTIONS)
+
+
+def _json(value: Any) -> Any:
+    # json/jsonb columns are decoded by the pool's codec (db_client.py), but
+    # come back as JSON text from connections set up without it
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _is_json_field(annotation: Any) -> bool:
+    """Whether a model field holds a JSON document (dict or list)"""
+    args = typing.get_args(annotation) or (annotation,)
+    return any(typing.get_origin(arg) in (dict, list) or arg in (dict, list) for arg in args)
+
+
+def compile_row_encoder(fields: Sequence[str], json_fields: Sequence[str] = ()) -> RowEncoder:
+    """
+    Generate a function encoding rows to a JSON array
+
+    Rows must carry every listed column (SELECT * rows do).
+
+    Args:
+        fields: Column names in output order
+        json_fields: Columns holding json/jsonb documents
+
+    Returns:
+        Callable: encode(rows) -> bytes, for asyncpg Records or dicts
+    """
+    items = ", ".join(
+        f"{name!r}: _json(row[{name!r}])" if name in json_fields else f"{name!r}: row[{name!r}]"
+        for name in fields
+    )
+    source = (
+        f"def encode(rows):\n"
+        f"    return _dumps([{{{items}}} for row in rows], default=_default, option=_options)\n"
+    )
+
+    namespace = {"_dumps": orjson.dumps, "_default": _default, "_options": JSON_OPTIONS, "_json": _json}
+    exec(compile(source, f"<row encoder {','.join(fields)}>", "exec"), namespace)
+    return namespace["encode"]
+
+
+def compile_model_encoder(model: Type[BaseModel]) -> RowEncoder:
+    """
+    Generate a row encoder producing the JSON of a list of response models
+
+    Args:
+        model: Response model whose fields map to table columns
+
+    Returns:
+        Callable: encode(rows) -> bytes
+    """
+    return compile_row_encoder(
+        list(model.model_fields),
+        [name for name, field in model.model_fields.items() if _is_json_field(field.annotation)]
+    )
+
+
+FLIGHT_ENCODER = compile_model_encoder(FlightResponse)
+SERVICE_ENCODER = compile_model_encoder(ServiceResponse)
+SPACE_ENCODER = compile_model_encoder(SpaceResponse)
+CHAT_MESSAGE_ENCODER = compile_model_encoder(ChatMessageResponse)
+
+
+def encode_rows(encoder: RowEncoder, rows: Iterable[Any]) -> bytes:
+    """
+    Encode rows to a JSON array
+
+    Args:
+        encoder: Row encoder
+        rows: asyncpg Records or dicts
+
+    Returns:
+        bytes: UTF-8 JSON array
+    """
+    return encoder(rows)
+
+
+def rows_response(
+    encoder: RowEncoder,
+    rows: Iterable[Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Build a JSON response from rows without model validation
+
+    Args:
+        encoder: Row encoder
+        rows: asyncpg Records or dicts
+        headers: Optional extra response headers
+
+    Returns:
+        Response: application/json response
+    """
+    return json_response(encoder(rows), headers)
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Wrap an already encoded JSON body in a response
+
+    Args:
+        body: UTF-8 JSON
+        headers: Optional extra response headers
+
+    Returns:
+        Response: application/json response
+    """
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class PayloadCache:
+    """
+    Encoded response bodies for the current version of some data
+
+    Entries are keyed by request shape (filters, page size, cursor) and all
+    dropped at once when the version changes. The least recently used entry
+    is evicted past max_entries.
+    """
+
+    def __init__(self, name: str, max_entries: int = 256):
+        self.name = name
+        self.max_entries = max_entries
+        self._version: Optional[Hashable] = None
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: Optional[Hashable], key: Hashable) -> Optional[Any]:
+        """
+        Look up a payload
+
+        Args:
+            version: Current data version (None disables caching)
+            key: Request shape
+
+        Returns:
+            The cached payload, or None
+        """
+        if version is None or version != self._version or key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, version: Optional[Hashable], key: Hashable, payload: Any):
+        """
+        Store a payload built for a data version
+
+        Args:
+            version: Data version the payload was built from (None: not stored)
+            key: Request shape
+            payload: Encoded body (and anything sent along with it)
+        """
+        if version is None:
+            return
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+        self._version = None
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses and current entry count
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_payload_caches: Dict[str, PayloadCache] = {}
+
+
+def payload_cache(name: str, max_entries: int = 256) -> PayloadCache:
+    """
+    Get (or create) the named payload cache
+
+    Args:
+        name: Cache name, as reported by get_payload_cache_stats()
+        max_entries: Entry limit when creating it
+
+    Returns:
+        PayloadCache: The cache
+    """
+    cache = _payload_caches.get(name)
+    if cache is None:
+        cache = _payload_caches[name] = PayloadCache(name, max_entries)
+    return cache
+
+
+def get_payload_cache_stats() -> Dict[str, dict]:
+    """
+    Get counters of every named payload cache
+
+    Returns:
+        dict: Cache name to hits, misses and entry count
+    """
+    return {name: cache.stats() for name, cache in _payload_caches.items()}
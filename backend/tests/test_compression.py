@@ -0,0 +1,145 @@
+"""
+Response compression: coding negotiation, the middleware and cached variants
+"""
+import gzip
+
+import orjson
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, EncodedBody, choose_encoding, encoded_response
+
+BIG = orjson.dumps([{"flight_number": f"AW{i}", "status": "On Time"} for i in range(200)])
+SMALL = b'{"ok": true}'
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("deflate, gzip;q=0.5", "gzip"),
+    ("*", compression.SUPPORTED_ENCODINGS[0]),
+    ("*, gzip;q=0", "br" if "br" in compression.SUPPORTED_ENCODINGS else None),
+    ("GZIP;q=abc", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    cached = EncodedBody(BIG)
+
+    @app.get("/big")
+    async def big():
+        return Response(BIG, media_type="application/json", headers={"ETag": '"big-1"'})
+
+    @app.get("/small")
+    async def small():
+        return Response(SMALL, media_type="application/json")
+
+    @app.get("/image")
+    async def image():
+        return Response(BIG, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            yield b"data: 1\n\n"
+            yield b"data: 2\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/cached")
+    async def cached_page(request: Request):
+        return encoded_response(request, cached)
+
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+def _get(client, path, accept_encoding="gzip"):
+    # Fetched raw, so the body is checked as it went over the wire
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_large_json_is_compressed(client):
+    response, body = _get(client, "/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(body))
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == BIG
+    # The compressed representation carries a weak tag
+    assert response.headers["etag"] == 'W/"big-1"'
+
+
+def test_client_without_gzip_gets_the_plain_body(client):
+    response, body = _get(client, "/big", accept_encoding="identity")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"big-1"'
+    assert body == BIG
+
+
+def test_small_body_is_sent_as_is(client):
+    response, body = _get(client, "/small")
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert body == SMALL
+
+
+def test_incompressible_type_is_sent_as_is(client):
+    response, body = _get(client, "/image")
+    assert "content-encoding" not in response.headers
+    assert body == BIG
+
+
+def test_event_stream_is_passed_through(client):
+    response, body = _get(client, "/stream")
+    assert "content-encoding" not in response.headers
+    assert body == b"data: 1\n\ndata: 2\n\n"
+
+
+def test_cached_body_is_not_compressed_twice(client):
+    response, body = _get(client, "/cached")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BIG
+    # One Vary header listing Accept-Encoding once
+    assert response.headers.get_list("vary") == ["Accept-Encoding"]
+
+
+def test_cached_variants_are_compressed_once(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding, precompress=False):
+        calls.append((encoding, precompress))
+        return compress(body, encoding, precompress)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+    cached = EncodedBody(BIG)
+
+    first, encoding = cached.for_client("gzip")
+    second, _ = cached.for_client("gzip")
+    plain, no_encoding = cached.for_client(None)
+
+    assert encoding == "gzip" and no_encoding is None
+    assert first is second
+    assert plain is BIG
+    assert calls == [("gzip", True)]
+
+
+def test_small_cached_body_is_never_compressed():
+    assert EncodedBody(SMALL).for_client("gzip") == (SMALL, None)
+
+
+def test_vary_is_merged_not_duplicated():
+    assert compression._vary_on_encoding([(b"vary", b"Origin")]) == [(b"vary", b"Origin, Accept-Encoding")]
+    assert compression._vary_on_encoding([(b"vary", b"accept-encoding")]) == [(b"vary", b"accept-encoding")]
+    assert compression._vary_on_encoding([(b"vary", b"*")]) == [(b"vary", b"*")]
+    assert compression._vary_on_encoding([]) == [(b"vary", b"Accept-Encoding")]
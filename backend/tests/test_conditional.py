@@ -0,0 +1,105 @@
+"""
+Conditional GET: ETags and 304 Not Modified
+"""
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from conditional import make_etag, is_not_modified, not_modified, set_etag
+
+
+def _request(query: bytes = b"", if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": query, "headers": headers})
+
+
+def test_etag_depends_on_version_and_query_only():
+    etag = make_etag("flights", 3, _request(b"terminal=1&limit=10"))
+    assert etag.startswith('"flights-3-') and etag.endswith('"')
+    # Parameter order does not matter
+    assert make_etag("flights", 3, _request(b"limit=10&terminal=1")) == etag
+    assert make_etag("flights", 4, _request(b"terminal=1&limit=10")) != etag
+    assert make_etag("flights", 3, _request(b"terminal=2&limit=10")) != etag
+    assert make_etag("flights", None, _request()) is None
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"flights-3-abc"', True),
+    ('W/"flights-3-abc"', True),
+    ('"flights-2-abc", W/"flights-3-abc"', True),
+    ("*", True),
+    ('"flights-2-abc"', False),
+])
+def test_if_none_match_uses_weak_comparison(header, matches):
+    assert is_not_modified(_request(if_none_match=header), '"flights-3-abc"') is matches
+
+
+def test_unknown_version_never_matches():
+    assert not is_not_modified(_request(if_none_match="*"), None)
+
+
+def test_not_modified_response():
+    response = not_modified('"flights-3-abc"')
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == '"flights-3-abc"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_compressed_representation_gets_a_weak_etag():
+    plain = Response(b"[]")
+    set_etag(plain, '"flights-3-abc"')
+    assert plain.headers["etag"] == '"flights-3-abc"'
+
+    encoded = Response(b"...", headers={"Content-Encoding": "gzip"})
+    set_etag(encoded, '"flights-3-abc"')
+    assert encoded.headers["etag"] == 'W/"flights-3-abc"'
+
+    untagged = Response(b"[]")
+    set_etag(untagged, None)
+    assert "etag" not in untagged.headers
+
+
+@pytest.fixture
+def board():
+    """A read endpoint following the routers' conditional GET pattern"""
+    state = {"version": 1, "renders": 0}
+    app = FastAPI()
+
+    @app.get("/board")
+    async def get_board(request: Request):
+        etag = make_etag("board", state["version"], request)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        state["renders"] += 1
+        response = Response(b'[{"flight_number": "AW1"}]', media_type="application/json")
+        set_etag(response, etag)
+        return response
+
+    return TestClient(app), state
+
+
+def test_unchanged_board_answers_304(board):
+    client, state = board
+    first = client.get("/board")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    second = client.get("/board", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert state["renders"] == 1
+
+
+def test_changed_board_is_sent_again(board):
+    client, state = board
+    etag = client.get("/board").headers["etag"]
+    state["version"] += 1
+
+    response = client.get("/board", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert state["renders"] == 2
@@ -0,0 +1,70 @@
+"""
+insert_on_conflict: the created flag for new and conflicting rows
+"""
+import asyncio
+
+import pytest
+
+from database import db_client
+
+
+class FakeUsers:
+    """A users table keyed by email that answers INSERT ... ON CONFLICT"""
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = []
+
+    async def __call__(self, query, *args, fetch_one=False, **kwargs):
+        self.queries.append(query)
+        assert fetch_one
+        email, name = args
+        existing = self.rows.get(email)
+        if existing is None:
+            row = {"email": email, "nom": name}
+            self.rows[email] = row
+            if "DO UPDATE" in query:
+                return {**row, "_created": True}
+            return dict(row)
+        if "DO NOTHING" in query:
+            return None
+        existing["nom"] = name
+        return {**existing, "_created": False}
+
+
+@pytest.fixture
+def users(monkeypatch):
+    table = FakeUsers()
+    monkeypatch.setattr(db_client, "execute_query", table)
+    return table
+
+
+def _insert(data, **kwargs):
+    return asyncio.run(db_client.insert_on_conflict("users", data, **kwargs))
+
+
+def test_new_row_is_created(users):
+    row, created = _insert({"email": "pax@example.com", "nom": "Pax"}, conflict="email")
+    assert created is True
+    assert row == {"email": "pax@example.com", "nom": "Pax"}
+    assert "ON CONFLICT (email) DO NOTHING" in users.queries[0]
+
+
+def test_conflict_leaves_the_row_and_reports_not_created(users):
+    _insert({"email": "pax@example.com", "nom": "Pax"}, conflict="email")
+    row, created = _insert({"email": "pax@example.com", "nom": "Other"}, conflict="email")
+    assert (row, created) == (None, False)
+    assert users.rows["pax@example.com"]["nom"] == "Pax"
+
+
+def test_upsert_reports_whether_the_row_was_inserted(users):
+    row, created = _insert({"email": "pax@example.com", "nom": "Pax"}, conflict=["email"], update_columns=["nom"])
+    assert created is True
+    assert row == {"email": "pax@example.com", "nom": "Pax"}
+
+    row, created = _insert({"email": "pax@example.com", "nom": "Renamed"}, conflict=["email"], update_columns=["nom"])
+    assert created is False
+    # The flag column is not part of the returned row
+    assert row == {"email": "pax@example.com", "nom": "Renamed"}
+    assert "DO UPDATE SET nom = EXCLUDED.nom" in users.queries[-1]
+    assert "(xmax = 0) AS _created" in users.queries[-1]
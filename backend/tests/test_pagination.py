@@ -0,0 +1,133 @@
+"""
+Keyset cursors: round-trips, NULL tails and malformed cursors
+"""
+import json
+import asyncio
+import base64
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import pagination
+from database import pagination as keyset
+from database import flight_cache
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _flights(count: int, nulls: int):
+    """Flights with increasing departure times, then `nulls` without one"""
+    flights = []
+    for i in range(count + nulls):
+        departure = BASE + timedelta(minutes=i // 2) if i < count else None
+        flights.append({"id": uuid.UUID(int=i + 1), "flight_number": f"AW{i}", "departure_time": departure})
+    return flights
+
+
+def test_cursor_round_trip_with_value():
+    row = {"id": uuid.uuid4(), "departure_time": BASE}
+    after = keyset.decode_cursor(keyset.encode_cursor(row, "departure_time"))
+    assert after == {"id": row["id"], "v": BASE}
+
+
+def test_cursor_round_trip_in_null_tail():
+    row = {"id": uuid.uuid4(), "departure_time": None}
+    after = keyset.decode_cursor(keyset.encode_cursor(row, "departure_time"))
+    assert after == {"id": row["id"], "v": None}
+
+
+def test_cursor_round_trip_by_id_only():
+    row = {"id": uuid.uuid4()}
+    assert keyset.decode_cursor(keyset.encode_cursor(row)) == {"id": row["id"]}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    _raw_cursor({"v": None}),
+    _raw_cursor({"id": "nope"}),
+    _raw_cursor({"id": str(uuid.uuid4()), "v": "yesterday"}),
+    _raw_cursor({"id": str(uuid.uuid4()), "v": "2024-01-01T00:00:00"}),
+    _raw_cursor(["id"]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        keyset.decode_cursor(cursor)
+    with pytest.raises(HTTPException) as error:
+        pagination.get_page_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_keyset_clause_is_a_plain_range():
+    after = {"id": uuid.uuid4(), "v": BASE}
+    condition, params = keyset.keyset_clause(after, "timestamp", descending=True, first_param=2)
+    assert condition == "(timestamp, id) < ($2, $3)"
+    assert params == [BASE, after["id"]]
+    assert keyset.order_clause("timestamp", descending=True) == "timestamp DESC, id DESC"
+
+
+class FakeTable:
+    """Answers the keyset queries select_keyset sends, from a list of rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def __call__(self, query, *args, **kwargs):
+        self.queries.append(query)
+        limit = args[-1]
+        if "departure_time IS NULL" in query:
+            rows = sorted((r for r in self.rows if r["departure_time"] is None), key=lambda r: r["id"])
+            if "id >" in query:
+                rows = [r for r in rows if r["id"] > args[0]]
+        else:
+            rows = sorted(
+                (r for r in self.rows if r["departure_time"] is not None),
+                key=lambda r: (r["departure_time"], r["id"])
+            )
+            if "(departure_time, id) >" in query:
+                rows = [r for r in rows if (r["departure_time"], r["id"]) > (args[0], args[1])]
+        return rows[:limit]
+
+
+def _page_through(fetch_page, limit):
+    seen, after = [], None
+    while True:
+        rows, cursor = asyncio.run(fetch_page(limit, after))
+        seen.extend(row["flight_number"] for row in rows)
+        if cursor is None:
+            return seen
+        after = keyset.decode_cursor(cursor)
+
+
+def test_pages_continue_into_the_null_tail(monkeypatch):
+    rows = _flights(7, 4)
+    table = FakeTable(rows)
+    monkeypatch.setattr(keyset, "execute_query", table)
+
+    async def fetch_page(limit, after):
+        return await keyset.select_page("flights", order_column="departure_time", limit=limit, after=after)
+
+    assert _page_through(fetch_page, 3) == [row["flight_number"] for row in rows]
+    # Every query is a single index range: no OR over the NULL tail
+    assert not any(" OR " in query for query in table.queries)
+
+
+def test_cached_board_pages_match_the_database_order(monkeypatch):
+    rows = _flights(7, 4)
+    monkeypatch.setattr(flight_cache, "_flights", sorted(rows, key=flight_cache._board_key))
+    monkeypatch.setattr(flight_cache, "_loaded", True)
+    monkeypatch.setattr(flight_cache, "_listening", True)
+    monkeypatch.setattr(flight_cache, "_dirty", set())
+    monkeypatch.setattr(flight_cache, "_load_task", None)
+
+    async def fetch_page(limit, after):
+        page = await flight_cache.get_cached_flights(limit=limit + 1, after=after)
+        return keyset.split_page(page, limit, "departure_time")
+
+    assert _page_through(fetch_page, 3) == [row["flight_number"] for row in rows]
@@ -0,0 +1,108 @@
+"""
+Login rate limit buckets
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import rate_limit
+
+
+class FakeClient:
+    def __init__(self, host):
+        self.host = host
+
+
+class FakeRequest:
+    def __init__(self, ip="10.0.0.1"):
+        self.headers = {}
+        self.client = FakeClient(ip)
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Per-worker buckets with a clock that only moves when told to"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_BACKEND", "local")
+    rate_limit._buckets.clear()
+    yield now
+    rate_limit._buckets.clear()
+
+
+def _attempt(request, email, succeeded=False):
+    """Run a login attempt; returns the Retry-After of a 429, else None"""
+    try:
+        asyncio.run(rate_limit.check_login_rate(request, email))
+    except HTTPException as e:
+        assert e.status_code == 429
+        return int(e.headers["Retry-After"])
+    if succeeded:
+        asyncio.run(rate_limit.record_login_success(request, email))
+    return None
+
+
+def test_successful_logins_keep_their_email_tokens():
+    request = FakeRequest()
+    for _ in range(int(rate_limit.LOGIN_IP_BURST)):
+        assert _attempt(request, "pax@example.com", succeeded=True) is None
+
+
+def test_failures_lock_out_the_email_from_one_address():
+    request = FakeRequest()
+    for _ in range(int(rate_limit.LOGIN_EMAIL_BURST)):
+        assert _attempt(request, "pax@example.com") is None
+    retry_after = _attempt(request, "pax@example.com")
+    assert retry_after == 2 * 60 / rate_limit.LOGIN_EMAIL_PER_MINUTE
+    # Same address, other account: only the IP bucket is shared
+    assert _attempt(request, "other@example.com") is None
+    # Same account, other address
+    assert _attempt(FakeRequest("10.0.0.2"), "pax@example.com") is None
+
+
+def test_email_bucket_refills_over_time(clock):
+    request = FakeRequest()
+    for _ in range(int(rate_limit.LOGIN_EMAIL_BURST)):
+        _attempt(request, "pax@example.com")
+    assert _attempt(request, "pax@example.com") is not None
+    # Rejected attempts drained the bucket to -1: two tokens to refill
+    clock[0] += 2 * 60 / rate_limit.LOGIN_EMAIL_PER_MINUTE
+    assert _attempt(request, "pax@example.com") is None
+
+
+def test_failures_spread_over_addresses_hit_the_account_bucket():
+    allowed = 0
+    for i in range(100):
+        request = FakeRequest(f"10.1.0.{i}")
+        if _attempt(request, "pax@example.com") is not None:
+            break
+        allowed += 1
+    assert allowed == rate_limit.LOGIN_ACCOUNT_BURST
+    assert rate_limit.get_rate_limit_stats()["rejected_account"] >= 1
+
+
+def test_ip_bucket_meters_every_attempt():
+    request = FakeRequest()
+    for i in range(int(rate_limit.LOGIN_IP_BURST)):
+        assert _attempt(request, f"pax{i}@example.com", succeeded=True) is None
+    assert _attempt(request, "late@example.com") is not None
+
+
+def test_email_tokens_are_reserved_before_the_result_is_known():
+    request = FakeRequest()
+    key, burst, per_second = rate_limit._email_bucket(request, "Pax@Example.com ")
+
+    asyncio.run(rate_limit.check_login_rate(request, "pax@example.com"))
+    assert rate_limit._peek_local(key, burst, per_second) == burst - 1
+
+    asyncio.run(rate_limit.record_login_success(request, "pax@example.com"))
+    assert rate_limit._peek_local(key, burst, per_second) == burst
+
+
+def test_bucket_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_MAX_KEYS", 10)
+    for i in range(20):
+        _attempt(FakeRequest(f"10.2.0.{i}"), f"pax{i}@example.com")
+    assert len(rate_limit._buckets) == 10
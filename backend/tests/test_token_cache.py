@@ -0,0 +1,113 @@
+"""
+Verified token cache: hits, expiry and revocation
+"""
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import auth_utils
+
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch):
+    """An empty cache, a clock that can be moved forward and no revocations"""
+    offset = [0.0]
+    real_time = time.time
+    monkeypatch.setattr(auth_utils.time, "time", lambda: real_time() + offset[0])
+    monkeypatch.setattr(auth_utils, "TOKEN_CACHE_SIZE", 100)
+    monkeypatch.setattr(auth_utils, "TOKEN_CACHE_TTL_SECONDS", 300.0)
+    monkeypatch.setattr(auth_utils, "is_token_revoked", lambda jti: False)
+    auth_utils._token_cache.clear()
+    for key in auth_utils._token_cache_stats:
+        auth_utils._token_cache_stats[key] = 0
+    yield offset
+    auth_utils._token_cache.clear()
+
+
+def _count_verifications(monkeypatch):
+    calls = []
+    decode = auth_utils.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_utils.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_second_decode_is_served_from_the_cache(monkeypatch):
+    verifications = _count_verifications(monkeypatch)
+    token = auth_utils.create_user_token("user-1", "pax@example.com")
+
+    first = auth_utils.decode_token(token)
+    second = auth_utils.decode_token(token)
+
+    assert first == second
+    assert first.user_id == "user-1"
+    assert first.jti is not None
+    assert len(verifications) == 1
+    stats = auth_utils.get_token_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, token_cache):
+    verifications = _count_verifications(monkeypatch)
+    token = auth_utils.create_user_token("user-1", "pax@example.com")
+    auth_utils.decode_token(token)
+
+    token_cache[0] = auth_utils.TOKEN_CACHE_TTL_SECONDS + 1
+    auth_utils.decode_token(token)
+
+    assert len(verifications) == 2
+    assert auth_utils.get_token_cache_stats()["expired"] == 1
+
+
+def test_entries_never_outlive_the_token():
+    token = auth_utils.create_access_token(
+        {"sub": "user-1", "email": "pax@example.com"},
+        expires_delta=timedelta(seconds=10)
+    )
+    token_data = auth_utils.decode_token(token)
+
+    expires_at, _ = auth_utils._token_cache[auth_utils._token_digest(token)]
+    assert expires_at == token_data.exp
+
+
+def test_revoked_token_is_rejected_on_a_cache_hit(monkeypatch):
+    token = auth_utils.create_user_token("user-1", "pax@example.com")
+    token_data = auth_utils.decode_token(token)
+    revoked = {token_data.jti}
+    monkeypatch.setattr(auth_utils, "is_token_revoked", lambda jti: jti in revoked)
+
+    with pytest.raises(HTTPException) as error:
+        auth_utils.decode_token(token)
+    assert error.value.status_code == 401
+    assert len(auth_utils._token_cache) == 0
+    assert auth_utils.get_token_cache_stats()["purged"] == 1
+
+    # Not cached again on the next attempt
+    with pytest.raises(HTTPException):
+        auth_utils.decode_token(token)
+    assert len(auth_utils._token_cache) == 0
+
+
+def test_invalid_tokens_are_not_cached():
+    with pytest.raises(HTTPException):
+        auth_utils.decode_token("not.a.token")
+    assert len(auth_utils._token_cache) == 0
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(auth_utils, "TOKEN_CACHE_SIZE", 2)
+    tokens = [auth_utils.create_user_token(f"user-{i}", "pax@example.com") for i in range(3)]
+    auth_utils.decode_token(tokens[0])
+    auth_utils.decode_token(tokens[1])
+    auth_utils.decode_token(tokens[0])
+    auth_utils.decode_token(tokens[2])
+
+    assert auth_utils._token_digest(tokens[0]) in auth_utils._token_cache
+    assert auth_utils._token_digest(tokens[1]) not in auth_utils._token_cache
+    assert auth_utils.get_token_cache_stats()["evictions"] == 1